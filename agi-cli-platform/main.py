@@ -9,9 +9,11 @@ import os
 from pathlib import Path
 
 # Add src directory to Python path
-src_path = Path(__file__).parent / "src"
-sys.path.insert(0, str(src_path))
+src_path = str(Path(__file__).parent / "src")
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
 
+# cli defers its heavy subsystems until a command actually runs
 from cli import main
 
 if __name__ == "__main__":
@@ -7,11 +7,13 @@ Usage:
     python run_tests.py --live             # Run all tests including live API tests
     python run_tests.py --coverage         # Run tests with detailed coverage report
     python run_tests.py --fast             # Run only fast tests
+    python run_tests.py --no-parallel      # Run in a single process even if pytest-xdist is installed
 """
 
 import sys
 import subprocess
 import argparse
+import importlib.util
 import os
 
 
@@ -23,6 +25,14 @@ def run_pytest(args_list):
     return result.returncode
 
 
+def exec_pytest(args_list):
+    """Replace this process with pytest so it owns the terminal and exit code"""
+    cmd = ['python', '-m', 'pytest'] + args_list
+    print(f"Running: {' '.join(cmd)}", flush=True)
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    os.execvp(cmd[0], cmd)
+
+
 def main():
     parser = argparse.ArgumentParser(description='Test runner for CLI tool')
     parser.add_argument('--live', action='store_true',
@@ -37,6 +47,10 @@ def main():
                         help='Run tests matching pattern')
     parser.add_argument('--file', '-f',
                         help='Run specific test file')
+    parser.add_argument('--parallel', '-p', metavar='N',
+                        help='Number of pytest-xdist workers (default: auto)')
+    parser.add_argument('--no-parallel', action='store_true',
+                        help='Run tests in a single process')
     
     args = parser.parse_args()
     
@@ -68,6 +82,11 @@ def main():
     if args.verbose:
         pytest_args.append('-v')
     
+    # Parallel workers; loadfile keeps each test file on a single worker
+    parallel = not args.no_parallel and importlib.util.find_spec('xdist') is not None
+    if parallel:
+        pytest_args.extend(['-n', args.parallel or 'auto', '--dist=loadfile'])
+    
     # Check for API keys if running live tests
     if args.live:
         api_key = os.getenv('GEMINI_API_KEY') or os.getenv('GOOGLE_API_KEY')
@@ -90,8 +109,19 @@ def main():
     if args.fast:
         print("⚡ Running fast tests only")
     
+    if parallel:
+        print(f"🔀 Running with {args.parallel or 'auto'} pytest-xdist workers")
+    elif args.parallel:
+        print("⚠️  pytest-xdist is not installed; running in a single process")
+    
     print()
     
+    # os.exec* on Windows spawns a child and exits, so keep waiting there
+    if os.name != 'nt':
+        if args.coverage:
+            print("📊 Coverage report will be generated in htmlcov/")
+        exec_pytest(pytest_args)
+    
     exit_code = run_pytest(pytest_args)
     
     print()
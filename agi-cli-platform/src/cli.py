@@ -5,46 +5,113 @@ Main CLI interface using Click framework
 import click
 import os
 import sys
+from functools import cached_property
 from pathlib import Path
 from typing import Optional
 
-from config import ConfigManager
-from llm_integration import LLMIntegration
-from code_generator import CodeGenerator
-from command_manager import CommandManager
-from plugin_system import PluginSystem
-from history import HistoryManager
 from logger import setup_logger
 
-# Try to import enhanced components
-try:
-    from multi_provider_llm import MultiProviderLLM
-    MULTI_PROVIDER_AVAILABLE = True
-except ImportError:
-    MULTI_PROVIDER_AVAILABLE = False
-
 # Setup logging
 logger = setup_logger(__name__)
 
+def _create_llm_integration(config_manager):
+    """Create the multi-provider LLM integration, falling back to the basic one"""
+    try:
+        from multi_provider_llm import MultiProviderLLM
+    except ImportError:
+        from llm_integration import LLMIntegration
+        logger.info("Using basic LLM integration")
+        return LLMIntegration(config_manager)
+    
+    logger.info("Using multi-provider LLM integration")
+    return MultiProviderLLM(config_manager)
+
+# Commands that report on or need every plugin loaded
+PLUGIN_COMMANDS = frozenset({'status', 'list-plugins'})
+
 class CLIContext:
     """Context object to share state between commands"""
     def __init__(self):
+        from config import ConfigManager
+        
         self.config_manager = ConfigManager()
+        self._config_loaded = False
+    
+    def load_config(self, config_path: Optional[str] = None):
+        """Load the given or default configuration, once per invocation"""
+        if self._config_loaded:
+            return
         
-        # Use multi-provider LLM if available, otherwise fall back to basic
-        if MULTI_PROVIDER_AVAILABLE:
-            self.llm_integration = MultiProviderLLM(self.config_manager)
-            logger.info("Using multi-provider LLM integration")
+        if config_path:
+            self.config_manager.load_config(config_path)
         else:
-            self.llm_integration = LLMIntegration(self.config_manager)
-            logger.info("Using basic LLM integration")
+            self.config_manager.load_default_config()
+        self._config_loaded = True
+    
+    # Subsystems are imported and built on first use, so commands only pay
+    # for what they touch and `--help` never loads them
+    
+    @cached_property
+    def llm_integration(self):
+        """LLM integration, multi-provider if available"""
+        return _create_llm_integration(self.config_manager)
+    
+    @cached_property
+    def code_generator(self):
+        """Code generator backed by the LLM integration"""
+        from code_generator import CodeGenerator
+        return CodeGenerator(self.config_manager, self.llm_integration)
+    
+    @cached_property
+    def command_manager(self):
+        """Manager for saved dynamic commands"""
+        from command_manager import CommandManager
+        return CommandManager(self.config_manager)
+    
+    @cached_property
+    def plugin_system(self):
+        """Plugin loader"""
+        from plugin_system import PluginSystem
+        return PluginSystem(self.config_manager)
+    
+    @cached_property
+    def history_manager(self):
+        """Command history and backups"""
+        from history import HistoryManager
+        return HistoryManager(self.config_manager)
+
+def _echo_lines(lines):
+    """Emit display lines with a single write"""
+    click.echo("\n".join(lines))
+
+def _cli_context(ctx) -> CLIContext:
+    """Get the shared context, loading configuration on first use"""
+    cli_ctx = ctx.ensure_object(CLIContext)
+    cli_ctx.load_config(ctx.params.get('config'))
+    return cli_ctx
+
+class LazyGroup(click.Group):
+    """Group that imports saved dynamic commands only when they are invoked"""
+    
+    def list_commands(self, ctx):
+        builtin = super().list_commands(ctx)
+        saved = _cli_context(ctx).command_manager.command_registry
+        return sorted(set(builtin) | set(saved))
+    
+    def get_command(self, ctx, cmd_name):
+        command = super().get_command(ctx, cmd_name)
+        if command is not None:
+            return command
         
-        self.code_generator = CodeGenerator(self.config_manager, self.llm_integration)
-        self.command_manager = CommandManager(self.config_manager)
-        self.plugin_system = PluginSystem(self.config_manager)
-        self.history_manager = HistoryManager(self.config_manager)
+        return _cli_context(ctx).command_manager.load_single_command(cmd_name)
+    
+    def format_commands(self, ctx, formatter):
+        # Help text needs every saved command, so import them in one parallel batch
+        command_manager = _cli_context(ctx).command_manager
+        command_manager.load_commands(list(command_manager.command_registry))
+        super().format_commands(ctx, formatter)
 
-@click.group()
+@click.group(cls=LazyGroup)
 @click.option('--config', '-c', type=click.Path(exists=True), 
               help='Path to configuration file')
 @click.option('--verbose', '-v', is_flag=True, help='Enable verbose output')
@@ -52,54 +119,93 @@ class CLIContext:
 def cli(ctx, config: Optional[str], verbose: bool):
     """Self-Evolving CLI Tool - A foundation for AGI platform development"""
     
-    # Initialize context
-    ctx.ensure_object(CLIContext)
-    cli_ctx = ctx.obj
-    
-    # Load configuration
-    if config:
-        cli_ctx.config_manager.load_config(config)
-    else:
-        cli_ctx.config_manager.load_default_config()
+    # Initialize context and load configuration
+    cli_ctx = _cli_context(ctx)
     
     # Set verbose mode
     if verbose:
         cli_ctx.config_manager.set_verbose(True)
     
-    # Load existing plugins and commands
-    cli_ctx.plugin_system.load_plugins()
-    cli_ctx.command_manager.load_dynamic_commands(cli)
+    # Load existing plugins only for commands that use them; saved
+    # commands are imported by LazyGroup when invoked
+    if ctx.invoked_subcommand in PLUGIN_COMMANDS:
+        cli_ctx.plugin_system.load_plugins()
     
     logger.info("CLI initialized successfully")
 
+async def _evolve_batch(cli_ctx, descriptions, max_concurrency: int):
+    """Generate and validate code for many descriptions concurrently"""
+    import asyncio
+    
+    semaphore = asyncio.Semaphore(max_concurrency)
+    code_generator = cli_ctx.code_generator
+    
+    async def evolve_one(description: str):
+        async with semaphore:
+            generated_code = await code_generator.agenerate_command(description)
+            if not generated_code:
+                return description, None, False
+            return description, generated_code, await code_generator.avalidate_code(generated_code)
+    
+    return await asyncio.gather(*(evolve_one(description) for description in descriptions))
+
 @cli.command()
-@click.argument('description')
+@click.argument('description', required=False)
 @click.option('--execute', '-e', is_flag=True, 
               help='Execute the generated command immediately')
 @click.option('--save', '-s', is_flag=True, 
               help='Save the generated command permanently')
+@click.option('--stream', is_flag=True,
+              help='Print the generated code as it arrives from the LLM')
+@click.option('--async-batch', type=click.Path(exists=True, dir_okay=False),
+              help='Evolve every description in a file (one per line) concurrently')
+@click.option('--max-concurrency', default=10, show_default=True,
+              help='Concurrent LLM requests in --async-batch mode')
 @click.pass_context
-def evolve(ctx, description: str, execute: bool, save: bool):
+def evolve(ctx, description: Optional[str], execute: bool, save: bool, stream: bool,
+           async_batch: Optional[str], max_concurrency: int):
     """Generate and integrate new functionality using LLM"""
     
     cli_ctx = ctx.obj
     
+    if async_batch:
+        _evolve_batch_command(cli_ctx, async_batch, execute, save, max_concurrency)
+        return
+    
+    if not description:
+        raise click.UsageError("Missing argument 'DESCRIPTION' (or use --async-batch)")
+    
     try:
         click.echo(f"🧠 Evolving: {description}")
         
         # Generate code using LLM
-        generated_code = cli_ctx.code_generator.generate_command(description)
+        on_chunk = (lambda chunk: click.echo(chunk, nl=False)) if stream else None
+        generated_code = cli_ctx.code_generator.generate_command(description, on_chunk=on_chunk)
+        if stream:
+            click.echo()
         
         if not generated_code:
             click.echo("❌ Failed to generate code", err=True)
             return
         
         click.echo("✅ Code generated successfully")
-        click.echo(f"Generated code preview:\n{generated_code[:200]}...")
+        if not stream:
+            click.echo(f"Generated code preview:\n{generated_code[:200]}...")
         
         if execute or save:
-            # Validate generated code
-            if not cli_ctx.code_generator.validate_code(generated_code):
+            # Saved code gets the full LLM-backed validation; code that is only
+            # executed (in the sandbox) gets the fast local checks
+            code_generator = cli_ctx.code_generator
+            advisory = None
+            if save:
+                valid = code_generator.validate_code_full(generated_code)
+            else:
+                valid = code_generator.validate_code_fast(generated_code)
+                if valid and code_generator.generation_config.get('background_llm_validation', False):
+                    advisory = code_generator.validate_with_llm_background(generated_code)
+            
+            if not valid:
+                code_generator.forget_generated(description)
                 click.echo("❌ Generated code failed validation", err=True)
                 return
             
@@ -118,11 +224,56 @@ def evolve(ctx, description: str, execute: bool, save: bool):
                     click.echo(f"🚀 Command executed successfully")
                 else:
                     click.echo("❌ Command execution failed", err=True)
+            
+            if advisory is not None and not advisory.result():
+                click.echo("⚠️ LLM validation flagged the executed code as unsafe", err=True)
         
     except Exception as e:
         logger.error(f"Evolution failed: {e}")
         click.echo(f"❌ Evolution failed: {e}", err=True)
 
+def _evolve_batch_command(cli_ctx, batch_file: str, execute: bool, save: bool, max_concurrency: int):
+    """Run evolve for every description in a batch file"""
+    import asyncio
+    
+    try:
+        with open(batch_file, encoding='utf-8') as f:
+            descriptions = [line.strip() for line in f if line.strip()]
+        
+        click.echo(f"🧠 Evolving {len(descriptions)} descriptions (up to {max_concurrency} at once)")
+        
+        results = asyncio.run(_evolve_batch(cli_ctx, descriptions, max_concurrency))
+        
+        # History and the command registry are not thread-safe; persist serially
+        for description, generated_code, valid in results:
+            if not generated_code:
+                click.echo(f"❌ {description}: failed to generate code", err=True)
+                continue
+            if not valid:
+                cli_ctx.code_generator.forget_generated(description)
+                click.echo(f"❌ {description}: generated code failed validation", err=True)
+                continue
+            
+            click.echo(f"✅ {description}")
+            if not (execute or save):
+                continue
+            
+            command_id = cli_ctx.history_manager.save_command(description, generated_code)
+            
+            if save:
+                cli_ctx.command_manager.save_command(command_id, generated_code)
+                click.echo(f"   💾 Command saved with ID: {command_id}")
+            
+            if execute:
+                if cli_ctx.code_generator.execute_code(generated_code):
+                    click.echo("   🚀 Command executed successfully")
+                else:
+                    click.echo("   ❌ Command execution failed", err=True)
+        
+    except Exception as e:
+        logger.error(f"Batch evolution failed: {e}")
+        click.echo(f"❌ Batch evolution failed: {e}", err=True)
+
 @cli.command()
 @click.pass_context
 def status(ctx):
@@ -131,14 +282,16 @@ def status(ctx):
     cli_ctx = ctx.obj
     config = cli_ctx.config_manager.config
     
-    click.echo("🔧 Self-Evolving CLI Tool Status")
-    click.echo("=" * 40)
-    click.echo(f"Version: {config.get('version', 'unknown')}")
-    click.echo(f"Config file: {cli_ctx.config_manager.config_path}")
-    click.echo(f"LLM provider: {config.get('llm', {}).get('provider', 'default')}")
-    click.echo(f"Loaded plugins: {len(cli_ctx.plugin_system.loaded_plugins)}")
-    click.echo(f"Dynamic commands: {len(cli_ctx.command_manager.dynamic_commands)}")
-    click.echo(f"Command history: {cli_ctx.history_manager.get_history_count()} entries")
+    _echo_lines([
+        "🔧 Self-Evolving CLI Tool Status",
+        "=" * 40,
+        f"Version: {config.get('version', 'unknown')}",
+        f"Config file: {cli_ctx.config_manager.config_path}",
+        f"LLM provider: {config.get('llm', {}).get('provider', 'default')}",
+        f"Loaded plugins: {len(cli_ctx.plugin_system.loaded_plugins)}",
+        f"Dynamic commands: {len(cli_ctx.command_manager.command_registry)}",
+        f"Command history: {cli_ctx.history_manager.get_history_count()} entries",
+    ])
 
 @cli.command()
 @click.pass_context
@@ -152,14 +305,31 @@ def history(ctx):
         click.echo("📜 No command history found")
         return
     
-    click.echo("📜 Command History")
-    click.echo("=" * 40)
+    lines = ["📜 Command History", "=" * 40]
     
     for entry in history_entries[-10:]:  # Show last 10 entries
-        click.echo(f"ID: {entry['id']}")
-        click.echo(f"Description: {entry['description']}")
-        click.echo(f"Created: {entry['timestamp']}")
-        click.echo("-" * 20)
+        lines.extend([
+            f"ID: {entry['id']}",
+            f"Description: {entry['description']}",
+            f"Created: {entry['timestamp']}",
+            "-" * 20,
+        ])
+    
+    _echo_lines(lines)
+
+@cli.command()
+@click.argument('output', type=click.Path(dir_okay=False))
+@click.option('--compact', is_flag=True, help='Write compact JSON instead of indented')
+@click.pass_context
+def export_history(ctx, output: str, compact: bool):
+    """Export command history as JSON for inspection"""
+    
+    cli_ctx = ctx.obj
+    
+    if cli_ctx.history_manager.export_history_json(output, pretty=not compact):
+        click.echo(f"📤 History exported to {output}")
+    else:
+        click.echo(f"❌ Failed to export history to {output}", err=True)
 
 @cli.command()
 @click.argument('command_id')
@@ -206,18 +376,20 @@ def list_plugins(ctx):
     
     loaded_plugins = cli_ctx.plugin_system.loaded_plugins
     
-    click.echo("🔌 Loaded Plugins")
-    click.echo("=" * 40)
+    lines = ["🔌 Loaded Plugins", "=" * 40]
     
     if not loaded_plugins:
-        click.echo("No plugins loaded")
-        return
+        lines.append("No plugins loaded")
     
     for plugin_name, plugin in loaded_plugins.items():
-        click.echo(f"Name: {plugin_name}")
-        click.echo(f"Description: {getattr(plugin, 'description', 'No description')}")
-        click.echo(f"Version: {getattr(plugin, 'version', 'unknown')}")
-        click.echo("-" * 20)
+        lines.extend([
+            f"Name: {plugin_name}",
+            f"Description: {getattr(plugin, 'description', 'No description')}",
+            f"Version: {getattr(plugin, 'version', 'unknown')}",
+            "-" * 20,
+        ])
+    
+    _echo_lines(lines)
 
 @cli.command()
 @click.argument('query')
@@ -242,6 +414,18 @@ def llm_query(ctx, query: str):
         logger.error(f"LLM query failed: {e}")
         click.echo(f"❌ LLM query failed: {e}", err=True)
 
+def _format_provider(name: str, model: str, is_available: bool, requests: int,
+                     errors: int, error_rate: float, avg_response_time: float) -> str:
+    """Render one provider's statistics block"""
+    status = "🟢 Available" if is_available else "🔴 Unavailable"
+    return "\n".join([
+        f"{name.upper()} ({model}) - {status}",
+        f"  Requests: {requests}",
+        f"  Errors: {errors} ({error_rate:.1%})",
+        f"  Avg Response Time: {avg_response_time:.2f}s",
+        "",
+    ])
+
 @cli.command()
 @click.pass_context
 def providers(ctx):
@@ -249,7 +433,7 @@ def providers(ctx):
     
     cli_ctx = ctx.obj
     
-    if not MULTI_PROVIDER_AVAILABLE or not hasattr(cli_ctx.llm_integration, 'get_provider_stats'):
+    if not hasattr(cli_ctx.llm_integration, 'get_provider_stats'):
         click.echo("📊 Provider statistics not available (using basic LLM integration)")
         return
     
@@ -257,18 +441,25 @@ def providers(ctx):
         stats = cli_ctx.llm_integration.get_provider_stats()
         available = cli_ctx.llm_integration.get_available_providers()
         
-        click.echo("📊 LLM Provider Statistics")
-        click.echo("=" * 40)
-        click.echo(f"Available providers: {', '.join(available)}")
-        click.echo()
+        lines = [
+            "📊 LLM Provider Statistics",
+            "=" * 40,
+            f"Available providers: {', '.join(available)}",
+            "",
+        ]
         
         for provider_name, provider_stats in stats.items():
-            status = "🟢 Available" if provider_name in available else "🔴 Unavailable"
-            click.echo(f"{provider_name.upper()} ({provider_stats['model']}) - {status}")
-            click.echo(f"  Requests: {provider_stats['requests']}")
-            click.echo(f"  Errors: {provider_stats['errors']} ({provider_stats['error_rate']:.1%})")
-            click.echo(f"  Avg Response Time: {provider_stats['avg_response_time']:.2f}s")
-            click.echo()
+            lines.append(_format_provider(
+                provider_name,
+                provider_stats['model'],
+                provider_name in available,
+                provider_stats['requests'],
+                provider_stats['errors'],
+                provider_stats['error_rate'],
+                provider_stats['avg_response_time'],
+            ))
+        
+        _echo_lines(lines)
     
     except Exception as e:
         logger.error(f"Failed to get provider stats: {e}")
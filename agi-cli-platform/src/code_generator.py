@@ -3,46 +3,268 @@ Code generation and execution pipeline
 """
 
 import ast
-import importlib.util
+import atexit
+import contextlib
+import hashlib
+import io
+import json
+import marshal
+import os
+import re
 import sys
-import tempfile
-import subprocess
-import traceback
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, Dict, Any
-import uuid
+from typing import Optional, Dict, Any, List, Tuple, Callable
 
 from logger import setup_logger
 
 logger = setup_logger(__name__)
 
+# Source substrings rejected by the security check
+RESTRICTED_PATTERNS = (
+    'os.system', 'subprocess.call', 'eval(', 'exec(',
+    '__import__', 'open(', 'file(', 'input(',
+    'raw_input(', 'execfile(', 'reload('
+)
+
+# All patterns as one alternation so the code is scanned in a single pass
+_RESTRICTED_RE = re.compile('|'.join(re.escape(pattern) for pattern in RESTRICTED_PATTERNS))
+
+class _UnsafeCode(Exception):
+    """Raised by _Guard on the first dangerous node"""
+
+class _Guard(ast.NodeVisitor):
+    """AST visitor that stops at the first dangerous call or restricted import"""
+    
+    DANGEROUS_CALLS = frozenset({'eval', 'exec', 'compile'})
+    
+    def __init__(self, restricted_modules):
+        self.restricted_modules = frozenset(restricted_modules)
+    
+    def visit_Call(self, node: ast.Call):
+        if isinstance(node.func, ast.Name) and node.func.id in self.DANGEROUS_CALLS:
+            raise _UnsafeCode(f"Dangerous function: {node.func.id}")
+        self.generic_visit(node)
+    
+    def visit_Import(self, node: ast.Import):
+        for alias in node.names:
+            if alias.name in self.restricted_modules:
+                raise _UnsafeCode(f"Restricted import: {alias.name}")
+    
+    def visit_ImportFrom(self, node: ast.ImportFrom):
+        if node.module in self.restricted_modules:
+            raise _UnsafeCode(f"Restricted import from: {node.module}")
+
+def _preload_common_imports():
+    """Worker initializer: import common modules once and run from the temp dir"""
+    import collections, datetime, json, math, pathlib, random, re, string  # noqa: F401
+    import tempfile
+    os.chdir(tempfile.gettempdir())
+
+def _exec_script(code_bytes: bytes) -> Tuple[bool, str, str]:
+    """Run a marshalled code object inside the worker, capturing its output"""
+    import traceback
+    stdout, stderr = io.StringIO(), io.StringIO()
+    success = True
+    
+    with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+        try:
+            exec(marshal.loads(code_bytes), {'__name__': '__main__'})
+        except SystemExit as e:
+            success = e.code in (None, 0)
+        except BaseException:
+            traceback.print_exc()
+            success = False
+    
+    return success, stdout.getvalue(), stderr.getvalue()
+
+class SandboxWorker:
+    """Long-lived forkserver worker that runs generated scripts without a cold start"""
+    
+    def __init__(self):
+        self._pool = None
+    
+    @staticmethod
+    def is_supported() -> bool:
+        """Whether the platform provides the forkserver start method"""
+        import multiprocessing
+        return 'forkserver' in multiprocessing.get_all_start_methods()
+    
+    def run(self, code: str, timeout: float) -> Tuple[bool, str, str]:
+        """Run code in the worker; raises multiprocessing.TimeoutError on timeout"""
+        import multiprocessing
+        
+        if self._pool is None:
+            context = multiprocessing.get_context('forkserver')
+            self._pool = context.Pool(1, initializer=_preload_common_imports)
+            atexit.register(self.close)
+        
+        # Compile here so the worker skips parsing; both sides run the same
+        # interpreter, so the marshal format matches
+        code_bytes = marshal.dumps(compile(code, "<generated>", "exec"))
+        
+        try:
+            return self._pool.apply_async(_exec_script, (code_bytes,)).get(timeout=timeout)
+        except multiprocessing.TimeoutError:
+            # The worker is stuck in the script; replace it on the next run
+            self.close()
+            raise
+    
+    def close(self):
+        """Stop the worker process"""
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool = None
+
+class CodeCache:
+    """Persistent content-hash -> generated code cache backed by SQLite"""
+    
+    def __init__(self, db_path: Path, max_entries: int = 500, ttl_seconds: Optional[float] = None):
+        import sqlite3
+        
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        # Generation may run on worker threads (agenerate_command); access is
+        # serialized by the lock instead
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS code_cache "
+            "(hash BLOB PRIMARY KEY, code TEXT NOT NULL, ts REAL NOT NULL, hits INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._conn.commit()
+    
+    def get(self, key: bytes) -> Optional[str]:
+        """Return cached code for a key, or None if missing or expired"""
+        with self._lock:
+            row = self._conn.execute("SELECT code, ts FROM code_cache WHERE hash = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            
+            code, ts = row
+            if self.ttl_seconds is not None and time.time() - ts > self.ttl_seconds:
+                self._conn.execute("DELETE FROM code_cache WHERE hash = ?", (key,))
+                self._conn.commit()
+                return None
+            
+            self._conn.execute("UPDATE code_cache SET hits = hits + 1 WHERE hash = ?", (key,))
+            self._conn.commit()
+            return code
+    
+    def put(self, key: bytes, code: str):
+        """Store code for a key, evicting the least frequently used entries"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO code_cache (hash, code, ts, hits) VALUES (?, ?, ?, 0)",
+                (key, code, time.time())
+            )
+            overflow = self._conn.execute("SELECT COUNT(*) FROM code_cache").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM code_cache WHERE hash IN "
+                    "(SELECT hash FROM code_cache ORDER BY hits ASC, ts ASC LIMIT ?)",
+                    (overflow,)
+                )
+            self._conn.commit()
+    
+    def delete(self, key: bytes):
+        """Drop a cached entry"""
+        with self._lock:
+            self._conn.execute("DELETE FROM code_cache WHERE hash = ?", (key,))
+            self._conn.commit()
+    
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
+
 class CodeGenerator:
     """Handles code generation, validation, and execution"""
     
     def __init__(self, config_manager, llm_integration):
         self.config_manager = config_manager
         self.llm_integration = llm_integration
-        self.generation_config = config_manager.get('code_generation', {})
-        self.security_config = config_manager.get('security', {})
+        self.reload_config()
+        
+        # Validation results keyed by a content hash, evicted least recently used
+        self._validation_cache: OrderedDict = OrderedDict()
+        self._validation_cache_size = self.generation_config.get('validation_cache_size', 128)
+        
+        # Opt-in persistent interpreter for sandboxed execution
+        self._sandbox_worker: Optional[SandboxWorker] = None
+        
+        # Runs advisory LLM validation off the hot path
+        self._background_executor: Optional[ThreadPoolExecutor] = None
+        
+        # Persistent cache of generated code, keyed on the description and the
+        # LLM settings so a provider or model change misses. Sampled output is
+        # meant to differ between runs, so by default it is only on at
+        # temperature 0 (cache_enabled overrides)
+        self._code_cache: Optional[CodeCache] = None
+        cache_enabled = self.generation_config.get(
+            'cache_enabled', config_manager.get('llm', {}).get('temperature', 0.7) == 0)
+        if cache_enabled:
+            try:
+                generated_dir = Path(config_manager.get('paths.generated_dir', 'generated'))
+                ttl_hours = self.generation_config.get('cache_ttl_hours')
+                self._code_cache = CodeCache(
+                    generated_dir / "code_cache.sqlite3",
+                    max_entries=self.generation_config.get('cache_max_entries', 500),
+                    ttl_seconds=ttl_hours * 3600 if ttl_hours else None
+                )
+            except Exception as e:
+                logger.warning(f"Code cache unavailable: {e}")
+    
+    def reload_config(self):
+        """Re-read code generation and security settings"""
+        self.generation_config = self.config_manager.get('code_generation', {})
+        self.security_config = self.config_manager.get('security', {})
+        
+        # Values used on every validation or execution are hoisted; the on/off
+        # switches are still read from the config dicts per call
+        self._restricted_modules = frozenset(self.security_config.get('restricted_modules', []))
+        self._max_execution_time = self.security_config.get('max_execution_time', 60)
+        self._max_code_length = self.generation_config.get('max_code_length', 10000)
     
-    def generate_command(self, description: str) -> Optional[str]:
-        """Generate a new CLI command based on description"""
+    def generate_command(self, description: str,
+                         on_chunk: Optional[Callable[[str], None]] = None) -> Optional[str]:
+        """Generate a new CLI command based on description, streaming raw output to on_chunk if given"""
         try:
             logger.info(f"Generating command: {description}")
             
-            # Use LLM to generate code
-            generated_code = self.llm_integration.generate_code(description)
+            cache_key = self._generation_key(description) if self._code_cache else None
+            if cache_key is not None:
+                cached = self._code_cache.get(cache_key)
+                if cached is not None:
+                    logger.info("Using cached generated code")
+                    if on_chunk is not None:
+                        on_chunk(cached)
+                    return cached
+            
+            # Use LLM to generate code; on_chunk is only passed when streaming so
+            # integrations without it keep working
+            if on_chunk is None:
+                generated_code = self.llm_integration.generate_code(description)
+            else:
+                generated_code = self.llm_integration.generate_code(description, on_chunk=on_chunk)
             
             if not generated_code:
                 logger.error("Failed to generate code from LLM")
                 return None
             
             # Basic length check
-            max_length = self.generation_config.get('max_code_length', 10000)
-            if len(generated_code) > max_length:
-                logger.error(f"Generated code too long: {len(generated_code)} > {max_length}")
+            if len(generated_code) > self._max_code_length:
+                logger.error(f"Generated code too long: {len(generated_code)} > {self._max_code_length}")
                 return None
             
+            if cache_key is not None:
+                self._code_cache.put(cache_key, generated_code)
+            
             logger.info(f"Code generated successfully: {len(generated_code)} characters")
             return generated_code
             
@@ -50,22 +272,59 @@ class CodeGenerator:
             logger.error(f"Code generation failed: {e}")
             return None
     
-    def validate_code(self, code: str) -> bool:
-        """Validate generated code for safety and correctness"""
+    def forget_generated(self, description: str):
+        """Drop cached code for a description, e.g. after it failed validation"""
+        if self._code_cache is not None:
+            try:
+                self._code_cache.delete(self._generation_key(description))
+            except Exception as e:
+                logger.warning(f"Failed to drop cached code: {e}")
+    
+    def _generation_key(self, description: str) -> bytes:
+        """Cache key for generated code: LLM settings plus normalized description"""
+        llm_settings = json.dumps(self.config_manager.get('llm', {}), sort_keys=True, default=str)
+        return hashlib.blake2b(f"{llm_settings}:{description.strip().lower()}".encode('utf-8')).digest()
+    
+    def validate_code_fast(self, code: str) -> bool:
+        """Validate code with the local AST and security checks only"""
         try:
             if not self.generation_config.get('validation_enabled', True):
                 logger.warning("Code validation is disabled")
                 return True
             
-            # Step 1: AST parsing validation
-            if not self._validate_ast(code):
+            if not (self._validate_ast(code) and self._validate_security(code)):
                 return False
             
-            # Step 2: Security validation
-            if not self._validate_security(code):
+            logger.info("Fast code validation passed")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Code validation failed: {e}")
+            return False
+    
+    def validate_code_full(self, code: str) -> bool:
+        """Validate code with the local checks and the LLM"""
+        return self.validate_code(code)
+    
+    def validate_with_llm_background(self, code: str) -> Future:
+        """Start an advisory LLM validation; the returned future yields its verdict"""
+        if self._background_executor is None:
+            self._background_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="llm-validate")
+        return self._background_executor.submit(self._validate_with_llm, code)
+    
+    def validate_code(self, code: str) -> bool:
+        """Validate generated code for safety and correctness"""
+        try:
+            if not self.generation_config.get('validation_enabled', True):
+                logger.warning("Code validation is disabled")
+                return True
+            
+            # Step 1-2: AST parsing and security validation
+            if not self._validate_local(code):
                 return False
             
-            # Step 3: LLM-based validation (if available)
+            # Step 3: LLM-based validation (if available). Not cached: a failed
+            # call is indistinguishable from a verdict, so it is asked each time
             if not self._validate_with_llm(code):
                 return False
             
@@ -76,26 +335,87 @@ class CodeGenerator:
             logger.error(f"Code validation failed: {e}")
             return False
     
+    async def avalidate_code(self, code: str) -> bool:
+        """Async variant of validate_code; the LLM check is awaited"""
+        try:
+            if not self.generation_config.get('validation_enabled', True):
+                logger.warning("Code validation is disabled")
+                return True
+            
+            # Local checks are cheap CPU work; only the LLM call is awaited
+            result = self._validate_local(code) and await self._avalidate_with_llm(code)
+            if result:
+                logger.info("Code validation passed")
+            
+            return result
+            
+        except Exception as e:
+            logger.error(f"Code validation failed: {e}")
+            return False
+    
+    async def validate_many(self, codes: List[str], max_concurrency: int = 10) -> List[bool]:
+        """Validate several code snippets concurrently"""
+        import asyncio
+        
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def validate(code: str) -> bool:
+            async with semaphore:
+                return await self.avalidate_code(code)
+        
+        return await asyncio.gather(*(validate(code) for code in codes))
+    
+    async def agenerate_command(self, description: str) -> Optional[str]:
+        """Async variant of generate_command, run on a worker thread"""
+        import asyncio
+        
+        return await asyncio.to_thread(self.generate_command, description)
+    
+    def _validation_key(self, code: str) -> bytes:
+        """Content hash used to key cached validation results"""
+        return hashlib.blake2b(code.encode('utf-8'), digest_size=16).digest()
+    
+    def _get_cached_validation(self, key: bytes) -> Optional[bool]:
+        """Look up a cached validation result"""
+        cached = self._validation_cache.get(key)
+        if cached is not None:
+            self._validation_cache.move_to_end(key)
+            logger.debug("Using cached validation result")
+        return cached
+    
+    def _cache_validation(self, key: bytes, result: bool):
+        """Store a validation result, evicting the least recently used"""
+        self._validation_cache[key] = result
+        if len(self._validation_cache) > self._validation_cache_size:
+            self._validation_cache.popitem(last=False)
+    
+    def _validate_local(self, code: str) -> bool:
+        """Run the AST and security checks, caching the verdict by content"""
+        # Identical code (e.g. re-validating during improve loops) is only
+        # parsed and scanned once
+        key = self._validation_key(code)
+        cached = self._get_cached_validation(key)
+        if cached is not None:
+            return cached
+        
+        result = self._validate_ast(code) and self._validate_security(code)
+        self._cache_validation(key, result)
+        return result
+    
     def execute_code(self, code: str) -> bool:
         """Execute generated code in a controlled environment"""
         try:
             if not self.generation_config.get('safe_execution', True):
                 logger.warning("Safe execution is disabled")
             
-            # Create a temporary file for the code
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as temp_file:
-                temp_file.write(code)
-                temp_path = temp_file.name
-            
-            try:
-                # Execute in a subprocess for isolation
-                if self.security_config.get('sandbox_enabled', True):
-                    return self._execute_sandboxed(temp_path)
-                else:
-                    return self._execute_direct(code)
-            finally:
-                # Clean up temporary file
-                Path(temp_path).unlink(missing_ok=True)
+            # Execute in a subprocess for isolation
+            if self.security_config.get('sandbox_enabled', True):
+                if (self.security_config.get('persistent_worker', False) and
+                        SandboxWorker.is_supported()):
+                    return self._execute_in_worker(code)
+                return self._execute_sandboxed(code)
+            else:
+                return self._execute_direct(code)
                 
         except Exception as e:
             logger.error(f"Code execution failed: {e}")
@@ -104,35 +424,15 @@ class CodeGenerator:
     def _validate_ast(self, code: str) -> bool:
         """Validate code using AST parsing"""
         try:
-            tree = ast.parse(code)
-            
-            # Check for dangerous operations
-            dangerous_nodes = []
-            
-            for node in ast.walk(tree):
-                # Check for eval/exec calls
-                if isinstance(node, ast.Call):
-                    if isinstance(node.func, ast.Name):
-                        if node.func.id in ['eval', 'exec', 'compile']:
-                            dangerous_nodes.append(f"Dangerous function: {node.func.id}")
-                
-                # Check for dangerous imports
-                if isinstance(node, ast.Import):
-                    for alias in node.names:
-                        if alias.name in self.security_config.get('restricted_modules', []):
-                            dangerous_nodes.append(f"Restricted import: {alias.name}")
-                
-                if isinstance(node, ast.ImportFrom):
-                    if node.module in self.security_config.get('restricted_modules', []):
-                        dangerous_nodes.append(f"Restricted import from: {node.module}")
-            
-            if dangerous_nodes:
-                logger.error(f"AST validation failed: {dangerous_nodes}")
-                return False
+            tree = ast.parse(code, type_comments=False)
+            _Guard(self._restricted_modules).visit(tree)
             
             logger.debug("AST validation passed")
             return True
             
+        except _UnsafeCode as e:
+            logger.error(f"AST validation failed: {e}")
+            return False
         except SyntaxError as e:
             logger.error(f"Syntax error in generated code: {e}")
             return False
@@ -143,16 +443,10 @@ class CodeGenerator:
     def _validate_security(self, code: str) -> bool:
         """Basic security validation using string analysis"""
         try:
-            restricted_patterns = [
-                'os.system', 'subprocess.call', 'eval(', 'exec(',
-                '__import__', 'open(', 'file(', 'input(',
-                'raw_input(', 'execfile(', 'reload('
-            ]
-            
-            for pattern in restricted_patterns:
-                if pattern in code:
-                    logger.error(f"Security validation failed: found '{pattern}'")
-                    return False
+            match = _RESTRICTED_RE.search(code)
+            if match:
+                logger.error(f"Security validation failed: found '{match.group()}'")
+                return False
             
             logger.debug("Security validation passed")
             return True
@@ -170,17 +464,34 @@ class CodeGenerator:
             # If LLM validation fails, don't block execution
             return True
     
-    def _execute_sandboxed(self, script_path: str) -> bool:
+    async def _avalidate_with_llm(self, code: str) -> bool:
+        """Async variant of _validate_with_llm"""
+        import asyncio
+        
+        try:
+            avalidate = getattr(self.llm_integration, 'avalidate_code_with_llm', None)
+            if avalidate is None:
+                return await asyncio.to_thread(self.llm_integration.validate_code_with_llm, code)
+            return await avalidate(code)
+        except Exception as e:
+            logger.error(f"LLM validation error: {e}")
+            # If LLM validation fails, don't block execution
+            return True
+    
+    def _execute_sandboxed(self, code: str) -> bool:
         """Execute code in a sandboxed subprocess"""
+        import subprocess
+        import tempfile
+        
         try:
-            timeout = self.security_config.get('max_execution_time', 60)
-            
+            # Code is piped to an isolated interpreter's stdin; no script file
             result = subprocess.run(
-                [sys.executable, script_path],
+                [sys.executable, "-I", "-"],
+                input=code,
                 capture_output=True,
                 text=True,
-                timeout=timeout,
-                cwd=Path(script_path).parent
+                timeout=self._max_execution_time,
+                cwd=tempfile.gettempdir()
             )
             
             if result.returncode == 0:
@@ -199,8 +510,36 @@ class CodeGenerator:
             logger.error(f"Sandboxed execution error: {e}")
             return False
     
+    def _execute_in_worker(self, code: str) -> bool:
+        """Execute code in the persistent sandbox worker process"""
+        import multiprocessing
+        
+        try:
+            if self._sandbox_worker is None:
+                self._sandbox_worker = SandboxWorker()
+            
+            success, stdout, stderr = self._sandbox_worker.run(code, self._max_execution_time)
+            
+            if success:
+                logger.info("Sandboxed execution completed successfully")
+                if stdout:
+                    logger.info(f"Output: {stdout}")
+                return True
+            else:
+                logger.error(f"Sandboxed execution failed: {stderr}")
+                return False
+                
+        except multiprocessing.TimeoutError:
+            logger.error("Code execution timed out")
+            return False
+        except Exception as e:
+            logger.error(f"Sandboxed execution error: {e}")
+            return False
+    
     def _execute_direct(self, code: str) -> bool:
         """Execute code directly in the current process (less safe)"""
+        import traceback
+        
         try:
             # Create a restricted globals environment
             restricted_globals = {
@@ -2,41 +2,66 @@
 Dynamic command management and loading
 """
 
-import importlib.util
+import hashlib
+import json
+import os
 import sys
-import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Any, Optional, List
-import pickle
+from typing import Dict, Any, Optional, List, Tuple
 import click
 
 from logger import setup_logger
 
 logger = setup_logger(__name__)
 
+# Parsed registries keyed by file path, reused while the file's mtime is unchanged
+_registry_cache: Dict[str, Tuple[int, Dict[str, Dict[str, Any]]]] = {}
+
 class CommandManager:
     """Manages dynamic loading and registration of CLI commands"""
     
     def __init__(self, config_manager):
         self.config_manager = config_manager
         self.dynamic_commands: Dict[str, Any] = {}
+        self._lock = threading.Lock()
         self.command_registry: Dict[str, Dict[str, Any]] = {}
         self.generated_dir = Path(config_manager.get('paths.generated_dir', 'generated'))
         self.generated_dir.mkdir(exist_ok=True)
+        self.registry_file = (self.generated_dir / "command_registry.json").absolute()
+        self.legacy_registry_file = (self.generated_dir / "command_registry.pkl").absolute()
+        self._registry_mtime = 0
+        
+        # Only the registry metadata is read up front; command modules are
+        # imported one at a time when the CLI resolves them
+        self._load_registry()
     
     def save_command(self, command_id: str, code: str) -> bool:
         """Save a generated command permanently"""
+        import py_compile
+        
         try:
-            # Create command file
-            command_file = self.generated_dir / f"{command_id}.py"
+            # Files are named by content hash, so identical code is stored once
+            # and the command ID is just an alias in the registry
+            code_bytes = code.encode('utf-8')
+            digest = hashlib.blake2b(code_bytes, digest_size=12).hexdigest()
+            command_file = self.generated_dir / f"{digest}.py"
             
-            with open(command_file, 'w') as f:
-                f.write(code)
+            if not command_file.exists():
+                command_file.write_bytes(code_bytes)
+                
+                # Write the __pycache__ entry now so loading the command skips parsing
+                try:
+                    py_compile.compile(str(command_file), doraise=True)
+                except py_compile.PyCompileError as e:
+                    logger.warning(f"Could not precompile command {command_id}: {e.msg}")
             
             # Save metadata
             metadata = {
                 'id': command_id,
                 'file': str(command_file),
+                'digest': digest,
                 'code': code,
                 'created_at': str(Path(command_file).stat().st_mtime)
             }
@@ -51,23 +76,39 @@ class CommandManager:
             logger.error(f"Failed to save command {command_id}: {e}")
             return False
     
-    def load_dynamic_commands(self, cli_group):
-        """Load all saved dynamic commands into the CLI"""
-        try:
-            self._load_registry()
-            
-            for command_id, metadata in self.command_registry.items():
-                command_file = Path(metadata['file'])
-                
-                if command_file.exists():
-                    self._load_command_file(command_file, cli_group)
-                else:
-                    logger.warning(f"Command file not found: {command_file}")
-            
-            logger.info(f"Loaded {len(self.dynamic_commands)} dynamic commands")
-            
-        except Exception as e:
-            logger.error(f"Failed to load dynamic commands: {e}")
+    def load_single_command(self, command_id: str) -> Optional[click.Command]:
+        """Load the Click command saved under a command ID"""
+        if command_id in self.dynamic_commands:
+            return self.dynamic_commands[command_id]
+        
+        metadata = self.command_registry.get(command_id)
+        if not metadata:
+            return None
+        
+        command_file = Path(metadata['file'])
+        if not command_file.exists():
+            logger.warning(f"Command file not found: {command_file}")
+            return None
+        
+        command = self._load_command_file(command_file)
+        if command is not None:
+            with self._lock:
+                self.dynamic_commands[command_id] = command
+        return command
+    
+    def load_commands(self, command_ids: List[str]) -> Dict[str, click.Command]:
+        """Load several saved commands, importing their files in parallel"""
+        pending = [command_id for command_id in command_ids
+                   if command_id in self.command_registry and command_id not in self.dynamic_commands]
+        
+        # Each file is independent disk I/O plus an import, so overlap them
+        if pending:
+            max_workers = min(8, (os.cpu_count() or 1) * 2, len(pending))
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                list(executor.map(self.load_single_command, pending))
+        
+        return {command_id: self.dynamic_commands[command_id]
+                for command_id in command_ids if command_id in self.dynamic_commands}
     
     def delete_command(self, command_id: str) -> bool:
         """Delete a saved command"""
@@ -79,14 +120,16 @@ class CommandManager:
             metadata = self.command_registry[command_id]
             command_file = Path(metadata['file'])
             
-            # Remove file
-            if command_file.exists():
-                command_file.unlink()
-            
             # Remove from registry
             del self.command_registry[command_id]
             self._save_registry()
             
+            # Remove the file once no other command shares its content
+            still_referenced = any(other['file'] == metadata['file']
+                                   for other in self.command_registry.values())
+            if not still_referenced and command_file.exists():
+                command_file.unlink()
+            
             # Remove from dynamic commands
             if command_id in self.dynamic_commands:
                 del self.dynamic_commands[command_id]
@@ -115,8 +158,10 @@ class CommandManager:
             return self.command_registry[command_id].get('code')
         return None
     
-    def _load_command_file(self, command_file: Path, cli_group):
+    def _load_command_file(self, command_file: Path) -> Optional[click.Command]:
         """Load a command from a Python file"""
+        import importlib.util
+        
         try:
             # Create module spec
             spec = importlib.util.spec_from_file_location(
@@ -126,36 +171,42 @@ class CommandManager:
             
             if spec is None or spec.loader is None:
                 logger.error(f"Failed to create spec for {command_file}")
-                return
+                return None
             
             # Load module
             module = importlib.util.module_from_spec(spec)
             spec.loader.exec_module(module)
             
-            # Look for Click commands in the module
+            # Templates declare their commands in __click_commands__
+            for attr_name in getattr(module, '__click_commands__', ()):
+                attr = getattr(module, attr_name, None)
+                if isinstance(attr, click.Command):
+                    logger.info(f"Loaded dynamic command: {attr_name}")
+                    return attr
+            
+            # Otherwise look for the Click command in the module
             for attr_name in dir(module):
                 attr = getattr(module, attr_name)
                 
                 # Check if it's a Click command
-                if hasattr(attr, '__click_params__'):
-                    # Add command to CLI group
-                    cli_group.add_command(attr)
-                    
-                    command_id = command_file.stem
-                    self.dynamic_commands[command_id] = attr
-                    
+                if isinstance(attr, click.Command):
                     logger.info(f"Loaded dynamic command: {attr_name}")
+                    return attr
+            
+            logger.error(f"No Click command found in: {command_file}")
+            return None
             
         except Exception as e:
             logger.error(f"Failed to load command file {command_file}: {e}")
+            return None
     
     def _save_registry(self):
         """Save command registry to disk"""
         try:
-            registry_file = self.generated_dir / "command_registry.pkl"
+            self.registry_file.write_bytes(json.dumps(self.command_registry).encode('utf-8'))
             
-            with open(registry_file, 'wb') as f:
-                pickle.dump(self.command_registry, f)
+            self._registry_mtime = self.registry_file.stat().st_mtime_ns
+            _registry_cache[str(self.registry_file)] = (self._registry_mtime, dict(self.command_registry))
             
             logger.debug("Command registry saved")
             
@@ -165,13 +216,23 @@ class CommandManager:
     def _load_registry(self):
         """Load command registry from disk"""
         try:
-            registry_file = self.generated_dir / "command_registry.pkl"
-            
-            if registry_file.exists():
-                with open(registry_file, 'rb') as f:
-                    self.command_registry = pickle.load(f)
+            if self.registry_file.exists():
+                mtime = self.registry_file.stat().st_mtime_ns
+                if mtime == self._registry_mtime:
+                    return
                 
+                cached = _registry_cache.get(str(self.registry_file))
+                if cached and cached[0] == mtime:
+                    self.command_registry = dict(cached[1])
+                else:
+                    self.command_registry = json.loads(self.registry_file.read_bytes())
+                    _registry_cache[str(self.registry_file)] = (mtime, dict(self.command_registry))
+                
+                self._registry_mtime = mtime
                 logger.debug("Command registry loaded")
+            elif self.legacy_registry_file.exists():
+                self.command_registry = self._load_legacy_registry()
+                self._save_registry()
             else:
                 self.command_registry = {}
                 logger.debug("No existing command registry found")
@@ -180,6 +241,15 @@ class CommandManager:
             logger.error(f"Failed to load command registry: {e}")
             self.command_registry = {}
     
+    def _load_legacy_registry(self) -> Dict[str, Dict[str, Any]]:
+        """Load a legacy command_registry.pkl file (converted to JSON by the caller)"""
+        import pickle
+        
+        with open(self.legacy_registry_file, 'rb') as f:
+            registry = pickle.load(f)
+        logger.info(f"Migrated {len(registry)} commands from legacy registry file")
+        return registry
+    
     def create_command_template(self, command_name: str, description: str) -> str:
         """Create a template for a new command"""
         template = f'''"""
@@ -207,5 +277,6 @@ def {command_name.replace('-', '_')}(verbose):
 
 # Make the command available for dynamic loading
 __all__ = ["{command_name.replace('-', '_')}"]
+__click_commands__ = ["{command_name.replace('-', '_')}"]
 '''
         return template
@@ -2,23 +2,152 @@
 Configuration management for the self-evolving CLI tool
 """
 
-import yaml
+import copy
+import hashlib
+import json
+import mmap
 import os
 from pathlib import Path
-from typing import Dict, Any, Optional
+from functools import lru_cache
+from typing import Dict, Any, Optional, Tuple
 
 from logger import setup_logger
 
 logger = setup_logger(__name__)
 
+@lru_cache(maxsize=None)
+def _yaml_codec():
+    """Import PyYAML on first use; returns (yaml, loader, dumper)"""
+    import yaml
+    
+    # Use the libyaml C bindings when PyYAML was built with them
+    try:
+        from yaml import CSafeLoader as loader, CSafeDumper as dumper
+    except ImportError:
+        from yaml import SafeLoader as loader, SafeDumper as dumper
+    
+    return yaml, loader, dumper
+
+# Parsed config files keyed by (resolved path, mtime_ns, size); oldest evicted first
+_CONFIG_CACHE_SIZE = 32
+
+# Files above this size are parsed from a memory map instead of a bytes copy
+_MMAP_THRESHOLD = 64 * 1024
+_parsed_configs: Dict[Tuple[str, int, int], Dict[str, Any]] = {}
+
+def _config_cache_dir() -> Path:
+    """Directory holding JSON copies of parsed config files"""
+    return Path(os.environ.get('XDG_CACHE_HOME') or Path.home() / ".cache") / "evolve_cli"
+
+def _json_cache_file(resolved_path: str) -> Path:
+    """JSON cache file for a config file path"""
+    digest = hashlib.blake2b(resolved_path.encode('utf-8'), digest_size=8).hexdigest()
+    return _config_cache_dir() / f"config-{digest}.json"
+
+def _config_cache_key(config_path: Path) -> Tuple[str, int, int]:
+    """Identify a config file's current contents by path, mtime and size"""
+    st = config_path.stat()
+    return (str(config_path.resolve()), st.st_mtime_ns, st.st_size)
+
+def _read_json_cache(key: Tuple[str, int, int]) -> Optional[Dict[str, Any]]:
+    """Return the JSON copy of a config file if it matches the file's stat"""
+    try:
+        cached = json.loads(_json_cache_file(key[0]).read_bytes())
+        if [cached['mtime_ns'], cached['size']] == [key[1], key[2]]:
+            return cached['config']
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    return None
+
+def _write_json_cache(key: Tuple[str, int, int], config: Dict[str, Any]):
+    """Store a JSON copy of a parsed config file for the next process"""
+    try:
+        text = json.dumps({'mtime_ns': key[1], 'size': key[2], 'config': config})
+        # YAML allows non-string keys and dates that JSON cannot round-trip
+        if json.loads(text)['config'] != config:
+            return
+        
+        cache_file = _json_cache_file(key[0])
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = cache_file.with_suffix(f".{os.getpid()}.tmp")
+        tmp_file.write_text(text, encoding='utf-8')
+        os.replace(tmp_file, cache_file)
+    except (OSError, TypeError, ValueError) as e:
+        logger.debug(f"Could not write config cache: {e}")
+
+def _flatten_config(config: Dict[str, Any]) -> Dict[str, Any]:
+    """Map every dotted key path, including intermediate sections, to its value"""
+    flat: Dict[str, Any] = {}
+    stack = [("", config)]
+    
+    while stack:
+        prefix, section = stack.pop()
+        for k, value in section.items():
+            if not isinstance(k, str):
+                continue
+            path = prefix + k
+            flat[path] = value
+            if isinstance(value, dict):
+                stack.append((path + ".", value))
+    
+    return flat
+
+def _load_yaml_mmap(config_path: Path) -> Any:
+    """Parse a large YAML file from a read-only memory map of the page cache"""
+    yaml, loader, _ = _yaml_codec()
+    
+    with open(config_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        # Prefault the pages ahead of the parser's sequential reads
+        if hasattr(mm, 'madvise'):
+            mm.madvise(mmap.MADV_SEQUENTIAL)
+            if hasattr(mmap, 'MADV_WILLNEED'):
+                mm.madvise(mmap.MADV_WILLNEED)
+        return yaml.load(mm, Loader=loader)
+
+def _parse_config_file(config_path: Path) -> Dict[str, Any]:
+    """Parse a YAML config file, reusing earlier results while it is unchanged"""
+    key = _config_cache_key(config_path)
+    
+    config = _parsed_configs.get(key)
+    if config is None:
+        config = _read_json_cache(key)
+        if config is None:
+            if key[2] > _MMAP_THRESHOLD:
+                config = _load_yaml_mmap(config_path) or {}
+            else:
+                # Bytes go straight to the loader, which detects and decodes the
+                # encoding itself instead of Python decoding the text first
+                yaml, loader, _ = _yaml_codec()
+                config = yaml.load(config_path.read_bytes(), Loader=loader) or {}
+            _write_json_cache(key, config)
+        
+        if len(_parsed_configs) >= _CONFIG_CACHE_SIZE:
+            del _parsed_configs[next(iter(_parsed_configs))]
+        _parsed_configs[key] = config
+    
+    # Callers mutate their config through set(), so hand out a copy
+    return copy.deepcopy(config)
+
 class ConfigManager:
     """Manages configuration loading, saving, and validation"""
     
     def __init__(self):
-        self.config: Dict[str, Any] = {}
+        self._config: Dict[str, Any] = {}
+        self._flat: Optional[Dict[str, Any]] = None
+        self._frozen_sets: Dict[str, frozenset] = {}
         self.config_path: Optional[Path] = None
         self.verbose: bool = False
     
+    @property
+    def config(self) -> Dict[str, Any]:
+        """The nested configuration dictionary"""
+        return self._config
+    
+    @config.setter
+    def config(self, value: Dict[str, Any]):
+        self._config = value
+        self._invalidate()
+    
     def load_default_config(self):
         """Load the default configuration file"""
         default_config_path = Path(__file__).parent.parent / "config" / "default.yaml"
@@ -34,8 +163,7 @@ class ConfigManager:
                 self._create_default_config()
                 return
             
-            with open(self.config_path, 'r') as f:
-                self.config = yaml.safe_load(f) or {}
+            self.config = _parse_config_file(self.config_path)
             
             logger.info(f"Configuration loaded from: {config_path}")
             
@@ -52,8 +180,18 @@ class ConfigManager:
             # Ensure directory exists
             self.config_path.parent.mkdir(parents=True, exist_ok=True)
             
-            with open(self.config_path, 'w') as f:
-                yaml.dump(self.config, f, default_flow_style=False, indent=2)
+            yaml, _, dumper = _yaml_codec()
+            data = yaml.dump(self.config, Dumper=dumper, default_flow_style=False, indent=2,
+                             sort_keys=False, allow_unicode=True).encode('utf-8')
+            
+            # Write in one call to a temp file and rename, so readers never see a partial file
+            tmp_file = self.config_path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_file, 'wb', buffering=0) as f:
+                f.write(data)
+            os.replace(tmp_file, self.config_path)
+            
+            # The next load of the file we just wrote can skip YAML parsing
+            _write_json_cache(_config_cache_key(self.config_path), self.config)
             
             logger.info(f"Configuration saved to: {self.config_path}")
             
@@ -62,16 +200,12 @@ class ConfigManager:
     
     def get(self, key: str, default: Any = None) -> Any:
         """Get a configuration value"""
-        keys = key.split('.')
-        value = self.config
-        
-        for k in keys:
-            if isinstance(value, dict) and k in value:
-                value = value[k]
-            else:
-                return default
-        
-        return value
+        # Dotted keys are served from a flattened view built on first use and
+        # dropped whenever the config is replaced or changed through set().
+        # Sections are returned by reference, so holders see later set() calls.
+        if self._flat is None:
+            self._flat = _flatten_config(self._config)
+        return self._flat.get(key, default)
     
     def set(self, key: str, value: Any):
         """Set a configuration value"""
@@ -84,8 +218,29 @@ class ConfigManager:
             config = config[k]
         
         config[keys[-1]] = value
+        self._invalidate()
         logger.debug(f"Config set: {key} = {value}")
     
+    def get_frozenset(self, key: str) -> frozenset:
+        """Get a list setting as a frozenset, built once per config change"""
+        values = self._frozen_sets.get(key)
+        if values is None:
+            values = self._frozen_sets[key] = frozenset(self.get(key) or ())
+        return values
+    
+    def is_import_allowed(self, module: str) -> bool:
+        """Whether a module is in plugins.allowed_imports"""
+        return module in self.get_frozenset('plugins.allowed_imports')
+    
+    def is_module_restricted(self, module: str) -> bool:
+        """Whether a module is in security.restricted_modules"""
+        return module in self.get_frozenset('security.restricted_modules')
+    
+    def _invalidate(self):
+        """Drop views derived from the config after it changes"""
+        self._flat = None
+        self._frozen_sets.clear()
+    
     def set_verbose(self, verbose: bool):
         """Set verbose mode"""
         self.verbose = verbose
@@ -93,6 +248,8 @@ class ConfigManager:
     
     def _create_default_config(self):
         """Create default configuration"""
+        # Kept as a literal: building it is several times faster than
+        # deep-copying a shared template, and callers mutate the result
         self.config = {
             'version': '0.1.0',
             'verbose': False,
@@ -3,35 +3,85 @@ Docker-based Sandbox for Safe Code Execution
 Implements the security framework from docs/03-security-validation.md
 """
 
+import ast
+import atexit
+import shutil
 import tempfile
 import os
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Any, Optional, List
-from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, Any, Mapping, Optional, List, Tuple
+from dataclasses import dataclass, replace
 
-# Try to import Docker, handle gracefully if not available
-try:
-    import docker
-    DOCKER_AVAILABLE = True
-except ImportError:
-    DOCKER_AVAILABLE = False
-    docker = None
+# The Docker SDK is imported when the first sandbox is created; None until then
+DOCKER_AVAILABLE: Optional[bool] = None
 
 from logger import setup_logger
 
 logger = setup_logger(__name__)
 
-@dataclass
+# Per-language lookup tables, keyed by lower-case language name
+_EXT_MAP = {
+    'python': 'py',
+    'javascript': 'js',
+    'bash': 'sh',
+    'cpp': 'cpp',
+    'c': 'c'
+}
+
+_IMAGE_MAP = {
+    'python': 'python:3.11-alpine',
+    'javascript': 'node:18-alpine',
+    'bash': 'alpine:latest',
+    'cpp': 'gcc:alpine',
+    'c': 'gcc:alpine'
+}
+
+# Command templates; None marks where the code file name goes
+_CMD_MAP = {
+    'python': ('python3', None),
+    'javascript': ('node', None),
+    'bash': ('bash', None),
+    'cpp': ('g++', '-o', 'program', None, '&&', './program'),
+    'c': ('gcc', '-o', 'program', None, '&&', './program')
+}
+_DEFAULT_CMD = ('cat', None)
+
+# Interpreters that take the program text as an argument, and the largest
+# program passed that way (Linux caps a single argument at 128 KiB)
+_INLINE_CMD_MAP = {
+    'python': ('python3', '-c'),
+    'javascript': ('node', '-e'),
+    'bash': ('bash', '-c')
+}
+_INLINE_CODE_LIMIT = 64 * 1024
+
+# Exit status of a process killed with SIGKILL, which is how the kernel's
+# OOM killer ends programs that exceed the container memory limit
+_OOM_EXIT_CODE = 137
+
+# Shared read-only usage mappings so results don't allocate one per run;
+# real stats collection should return a fresh dict instead
+_EMPTY_USAGE: Mapping[str, Any] = MappingProxyType({})
+_ZERO_USAGE: Mapping[str, Any] = MappingProxyType({
+    'memory_usage': 0,
+    'cpu_usage': 0,
+    'network_io': 0,
+    'block_io': 0
+})
+
+@dataclass(slots=True, frozen=True)
 class ExecutionResult:
     success: bool
     output: str
     error: str
     exit_code: int
     execution_time: float
-    resource_usage: Dict[str, Any]
+    resource_usage: Mapping[str, Any]
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class SandboxConfig:
     memory_limit: str = "128m"
     cpu_limit: str = "0.5"
@@ -40,15 +90,41 @@ class SandboxConfig:
     read_only_filesystem: bool = True
     temp_dir_size: str = "10m"
     max_file_size: int = 1024 * 1024  # 1MB
-    allowed_syscalls: Optional[List[str]] = None
+    allowed_syscalls: Optional[Tuple[str, ...]] = None
+    languages: Tuple[str, ...] = ('python',)
+    reuse_containers: bool = False
+    max_container_uses: int = 50
 
 class DockerSandbox:
     """Docker-based sandbox for secure code execution"""
     
-    def __init__(self, config_manager):
+    # Docker SDK module, shared by all sandboxes once imported
+    _docker = None
+    
+    # One daemon connection per process, and the images already checked on it
+    _shared_client = None
+    _warmed_images: set = set()
+    
+    def __init__(self, config_manager, reuse_containers: Optional[bool] = None):
         self.config_manager = config_manager
         self.docker_client = None
         self.sandbox_config = self._load_sandbox_config()
+        if reuse_containers is not None:
+            self.sandbox_config = replace(self.sandbox_config, reuse_containers=reuse_containers)
+        self._container_templates: Dict[str, Dict[str, Any]] = {}
+        
+        # Opt-in pool of idle long-lived containers, one per language, each
+        # paired with the host directory mounted at /code
+        self._pool: Dict[str, Tuple[Any, str]] = {}
+        self._pool_drain_registered = False
+        
+        # Runs so far per pooled container; containers are recycled after
+        # max_container_uses so leftovers in their /tmp don't accumulate
+        self._container_uses: Dict[Any, int] = {}
+        
+        # Resource limits, built once when the docker SDK supports them
+        self._ulimits: Optional[List[Any]] = None
+        
         self._initialize_docker()
     
     def _load_sandbox_config(self) -> SandboxConfig:
@@ -63,27 +139,94 @@ class DockerSandbox:
             read_only_filesystem=sandbox_config.get('read_only_filesystem', True),
             temp_dir_size=sandbox_config.get('temp_dir_size', '10m'),
             max_file_size=sandbox_config.get('max_file_size', 1024 * 1024),
-            allowed_syscalls=sandbox_config.get('allowed_syscalls')
+            allowed_syscalls=tuple(sandbox_config.get('allowed_syscalls') or ()),
+            languages=tuple(language.lower() for language in sandbox_config.get('languages', ['python'])),
+            reuse_containers=sandbox_config.get('reuse_containers', False),
+            max_container_uses=sandbox_config.get('max_container_uses', 50)
         )
     
     def _initialize_docker(self):
         """Initialize Docker client"""
-        if not DOCKER_AVAILABLE:
+        docker = self._import_docker()
+        if docker is None:
             logger.warning("Docker not available - sandbox functionality disabled")
             return
+        
+        self._ulimits = self._build_ulimits()
+            
+        if DockerSandbox._shared_client is not None:
+            self.docker_client = DockerSandbox._shared_client
+            self._warm_images()
+            return
             
         try:
             self.docker_client = docker.from_env()
             # Test Docker connectivity
             self.docker_client.ping()
+            DockerSandbox._shared_client = self.docker_client
             logger.info("Docker client initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize Docker client: {e}")
             self.docker_client = None
+            return
+        
+        self._warm_images()
+    
+    def _build_ulimits(self) -> Optional[List[Any]]:
+        """Ulimits attached to every sandbox container, or None if unsupported"""
+        try:
+            from docker.types import Ulimit
+        except ImportError:
+            logger.debug("Docker ulimits not available, skipping")
+            return None
+        
+        max_file_size = self.sandbox_config.max_file_size
+        return [
+            Ulimit(name='nproc', soft=32, hard=32),
+            Ulimit(name='nofile', soft=64, hard=64),
+            Ulimit(name='fsize', soft=max_file_size, hard=max_file_size)
+        ]
+    
+    def _warm_images(self):
+        """Make sure the images for the configured languages are present locally"""
+        for language in self.sandbox_config.languages:
+            image = self._get_container_image(language)
+            if image in DockerSandbox._warmed_images:
+                continue
+            
+            try:
+                self.docker_client.images.get(image)
+            except self._docker.errors.ImageNotFound:
+                logger.info(f"Pulling sandbox image: {image}")
+                try:
+                    self.docker_client.images.pull(image)
+                except Exception as e:
+                    logger.warning(f"Could not pull sandbox image {image}: {e}")
+                    continue
+            except Exception as e:
+                logger.warning(f"Could not check sandbox image {image}: {e}")
+                continue
+            
+            DockerSandbox._warmed_images.add(image)
+    
+    @classmethod
+    def _import_docker(cls):
+        """Import the Docker SDK on first use; returns None if it is not installed"""
+        global DOCKER_AVAILABLE
+        
+        if DOCKER_AVAILABLE is None:
+            try:
+                import docker
+                cls._docker = docker
+                DOCKER_AVAILABLE = True
+            except ImportError:
+                DOCKER_AVAILABLE = False
+        
+        return cls._docker
     
     def is_available(self) -> bool:
         """Check if Docker sandbox is available"""
-        return DOCKER_AVAILABLE and self.docker_client is not None
+        return bool(DOCKER_AVAILABLE) and self.docker_client is not None
     
     def execute_code_safely(self, code: str, language: str = "python") -> ExecutionResult:
         """Execute code in isolated Docker container"""
@@ -94,12 +237,23 @@ class DockerSandbox:
                 error="Docker sandbox not available",
                 exit_code=-1,
                 execution_time=0.0,
-                resource_usage={}
+                resource_usage=_EMPTY_USAGE
             )
         
-        start_time = time.time()
+        start_ns = time.perf_counter_ns()
+        language = language.lower()
+        
+        if self.sandbox_config.reuse_containers:
+            result = self._execute_in_pooled_container(code, language)
+            return replace(result, execution_time=(time.perf_counter_ns() - start_ns) / 1e9)
         
         try:
+            # Interpreted code is passed on the command line; nothing touches disk
+            inline_command = self._get_inline_command(language, code)
+            if inline_command is not None:
+                result = self._execute_in_container(inline_command, language)
+                return replace(result, execution_time=(time.perf_counter_ns() - start_ns) / 1e9)
+            
             # Create temporary directory for code execution
             with tempfile.TemporaryDirectory() as temp_dir:
                 # Write code to file
@@ -108,15 +262,14 @@ class DockerSandbox:
                     f.write(code)
                 
                 # Execute in Docker container
-                result = self._execute_in_container(code_file, language, temp_dir)
+                command = self._get_execution_command(language, f'/code/{code_file.name}')
+                result = self._execute_in_container(command, language, temp_dir)
                 
-                execution_time = time.time() - start_time
-                result.execution_time = execution_time
-                
-                return result
+                execution_time = (time.perf_counter_ns() - start_ns) / 1e9
+                return replace(result, execution_time=execution_time)
                 
         except Exception as e:
-            execution_time = time.time() - start_time
+            execution_time = (time.perf_counter_ns() - start_ns) / 1e9
             logger.error(f"Sandbox execution failed: {e}")
             return ExecutionResult(
                 success=False,
@@ -124,69 +277,40 @@ class DockerSandbox:
                 error=f"Sandbox execution failed: {str(e)}",
                 exit_code=-1,
                 execution_time=execution_time,
-                resource_usage={}
+                resource_usage=_EMPTY_USAGE
             )
     
     def _get_file_extension(self, language: str) -> str:
-        """Get file extension for language"""
-        extensions = {
-            'python': 'py',
-            'javascript': 'js',
-            'bash': 'sh',
-            'cpp': 'cpp',
-            'c': 'c'
-        }
-        return extensions.get(language.lower(), 'txt')
+        """Get file extension for a lower-case language name"""
+        return _EXT_MAP.get(language, 'txt')
+    
+    def _get_inline_command(self, language: str, code: str) -> Optional[List[str]]:
+        """Command that runs the code given as an argument, if the language allows it"""
+        prefix = _INLINE_CMD_MAP.get(language)
+        if prefix is None or len(code.encode('utf-8')) > _INLINE_CODE_LIMIT:
+            return None
+        return [*prefix, code]
     
     def _get_execution_command(self, language: str, filename: str) -> List[str]:
-        """Get execution command for language"""
-        commands = {
-            'python': ['python3', filename],
-            'javascript': ['node', filename],
-            'bash': ['bash', filename],
-            'cpp': ['g++', '-o', 'program', filename, '&&', './program'],
-            'c': ['gcc', '-o', 'program', filename, '&&', './program']
-        }
-        return commands.get(language.lower(), ['cat', filename])
+        """Get execution command for a lower-case language name"""
+        command = _CMD_MAP.get(language, _DEFAULT_CMD)
+        return [filename if part is None else part for part in command]
     
-    def _execute_in_container(self, code_file: Path, language: str, temp_dir: str) -> ExecutionResult:
+    def _execute_in_container(self, command: List[str], language: str,
+                              temp_dir: Optional[str] = None) -> ExecutionResult:
         """Execute code in Docker container with security constraints"""
         
-        # Container configuration
-        container_config = {
-            'image': self._get_container_image(language),
-            'command': self._get_execution_command(language, f'/code/{code_file.name}'),
-            'volumes': {
-                temp_dir: {'bind': '/code', 'mode': 'ro'}
-            },
-            'mem_limit': self.sandbox_config.memory_limit,
-            'nano_cpus': int(float(self.sandbox_config.cpu_limit) * 1e9),
-            'network_disabled': self.sandbox_config.network_disabled,
-            'read_only': self.sandbox_config.read_only_filesystem,
-            'tmpfs': {'/tmp': f'size={self.sandbox_config.temp_dir_size}'},
-            'security_opt': ['no-new-privileges:true'],
-            'cap_drop': ['ALL'],
-            'cap_add': ['CHOWN', 'DAC_OVERRIDE', 'FOWNER', 'SETGID', 'SETUID'],
-            'user': 'nobody:nogroup',
-            'working_dir': '/code',
-            'remove': True,
-            'detach': False,
-            'stdout': True,
-            'stderr': True
-        }
+        # Only the command and the code mount change between runs
+        template = self._container_templates.get(language)
+        if template is None:
+            template = self._container_templates[language] = self._build_container_template(language)
         
-        # Add ulimits for additional security (if available)
-        try:
-            if hasattr(docker, 'types'):
-                ulimits = [
-                    docker.types.Ulimit(name='nproc', soft=32, hard=32),
-                    docker.types.Ulimit(name='nofile', soft=64, hard=64),
-                    docker.types.Ulimit(name='fsize', soft=self.sandbox_config.max_file_size, 
-                                      hard=self.sandbox_config.max_file_size)
-                ]
-                container_config['ulimits'] = ulimits
-        except (AttributeError, ImportError):
-            logger.debug("Docker ulimits not available, skipping")
+        container_config = dict(template, command=command)
+        if temp_dir is not None:
+            container_config['volumes'] = {temp_dir: {'bind': '/code', 'mode': 'ro'}}
+        else:
+            # Inline code has no /code mount; run from the writable tmpfs
+            container_config['working_dir'] = '/tmp'
         
         try:
             # Run container with timeout
@@ -232,37 +356,195 @@ class DockerSandbox:
                 error=error_msg,
                 exit_code=exit_code,
                 execution_time=0.0,
-                resource_usage={}
+                resource_usage=_EMPTY_USAGE
             )
     
-    def _get_container_image(self, language: str) -> str:
-        """Get appropriate container image for language"""
-        images = {
-            'python': 'python:3.11-alpine',
-            'javascript': 'node:18-alpine',
-            'bash': 'alpine:latest',
-            'cpp': 'gcc:alpine',
-            'c': 'gcc:alpine'
+    def _execute_in_pooled_container(self, code: str, language: str) -> ExecutionResult:
+        """Execute code with exec_run inside a reused long-lived container"""
+        entry = None
+        healthy = False
+        
+        try:
+            entry = self._acquire(language)
+            result = self._exec_in_session(entry, code, language)
+            healthy = result.exit_code != _OOM_EXIT_CODE
+            return result
+            
+        except Exception as e:
+            logger.error(f"Pooled sandbox execution failed: {e}")
+            return ExecutionResult(
+                success=False,
+                output="",
+                error=f"Container execution failed: {str(e)}",
+                exit_code=-1,
+                execution_time=0.0,
+                resource_usage=_EMPTY_USAGE
+            )
+        finally:
+            if entry is not None:
+                self._release(language, entry, healthy)
+    
+    def _exec_in_session(self, entry: Tuple[Any, str], code: str, language: str) -> ExecutionResult:
+        """Run one program in a long-lived container; raises on Docker errors"""
+        container, host_dir = entry
+        code_file = None
+        
+        try:
+            command = self._get_inline_command(language, code)
+            if command is None:
+                # A fresh file name per run, so nothing from an earlier run is executed
+                code_file = Path(host_dir) / f"code-{os.urandom(8).hex()}.{self._get_file_extension(language)}"
+                code_file.write_text(code)
+                command = self._get_execution_command(language, f'/code/{code_file.name}')
+            
+            command = ['timeout', str(self.sandbox_config.timeout)] + command
+            exit_code, (stdout, stderr) = container.exec_run(
+                command, workdir='/code', user='nobody:nogroup', demux=True
+            )
+            
+            return ExecutionResult(
+                success=exit_code == 0,
+                output=(stdout or b"").decode('utf-8', errors='replace'),
+                error=(stderr or b"").decode('utf-8', errors='replace'),
+                exit_code=exit_code,
+                execution_time=0.0,  # Will be set by caller
+                resource_usage=self._get_resource_usage()
+            )
+        finally:
+            if code_file is not None:
+                code_file.unlink(missing_ok=True)
+    
+    def _acquire(self, language: str) -> Tuple[Any, str]:
+        """Take an idle running container for a language, starting one if needed"""
+        entry = self._pool.pop(language, None)
+        if entry is not None:
+            try:
+                entry[0].reload()
+                if entry[0].status == 'running':
+                    return entry
+            except Exception as e:
+                logger.debug(f"Discarding pooled container: {e}")
+            self._discard(entry)
+        
+        if not self._pool_drain_registered:
+            atexit.register(self._drain_pool)
+            self._pool_drain_registered = True
+        
+        template = self._container_templates.get(language)
+        if template is None:
+            template = self._container_templates[language] = self._build_container_template(language)
+        
+        # The code directory stays on the host; runs only add and remove files in it
+        host_dir = tempfile.mkdtemp(prefix="agi-sandbox-")
+        config = {key: value for key, value in template.items()
+                  if key not in ('remove', 'detach', 'stdout', 'stderr')}
+        config.update(
+            command=['sleep', 'infinity'],
+            volumes={host_dir: {'bind': '/code', 'mode': 'ro'}},
+            labels={'agi-cli-sandbox': 'true'},
+            auto_remove=True,
+            detach=True
+        )
+        
+        try:
+            return self.docker_client.containers.run(**config), host_dir
+        except Exception:
+            shutil.rmtree(host_dir, ignore_errors=True)
+            raise
+    
+    def _release(self, language: str, entry: Tuple[Any, str], healthy: bool, runs: int = 1):
+        """Return a container to the pool, or remove it if it failed, is worn out or the slot is taken"""
+        uses = self._container_uses.get(entry[0], 0) + runs
+        if healthy and uses < self.sandbox_config.max_container_uses and language not in self._pool:
+            self._container_uses[entry[0]] = uses
+            self._pool[language] = entry
+        else:
+            self._discard(entry)
+    
+    def _discard(self, entry: Tuple[Any, str]):
+        """Remove a pooled container and its host code directory"""
+        container, host_dir = entry
+        self._container_uses.pop(container, None)
+        try:
+            container.remove(force=True)
+        except Exception as e:
+            logger.debug(f"Could not remove pooled container: {e}")
+        shutil.rmtree(host_dir, ignore_errors=True)
+    
+    def _drain_pool(self):
+        """Remove every idle pooled container"""
+        while self._pool:
+            self._discard(self._pool.popitem()[1])
+    
+    def _build_container_template(self, language: str) -> Dict[str, Any]:
+        """Container settings that depend only on the language and sandbox config"""
+        template = {
+            'image': self._get_container_image(language),
+            'mem_limit': self.sandbox_config.memory_limit,
+            'nano_cpus': int(float(self.sandbox_config.cpu_limit) * 1e9),
+            'network_disabled': self.sandbox_config.network_disabled,
+            'read_only': self.sandbox_config.read_only_filesystem,
+            'tmpfs': {'/tmp': f'size={self.sandbox_config.temp_dir_size}'},
+            'pids_limit': 64,
+            'security_opt': ['no-new-privileges:true'],
+            'cap_drop': ['ALL'],
+            'cap_add': ['CHOWN', 'DAC_OVERRIDE', 'FOWNER', 'SETGID', 'SETUID'],
+            'user': 'nobody:nogroup',
+            'working_dir': '/code',
+            'remove': True,
+            'detach': False,
+            'stdout': True,
+            'stderr': True
         }
-        return images.get(language.lower(), 'alpine:latest')
+        
+        # Add ulimits for additional security (if available)
+        if self._ulimits:
+            template['ulimits'] = self._ulimits
+        
+        return template
     
-    def _get_resource_usage(self) -> Dict[str, Any]:
+    def _get_container_image(self, language: str) -> str:
+        """Get appropriate container image for a lower-case language name"""
+        return _IMAGE_MAP.get(language, 'alpine:latest')
+    
+    def _get_resource_usage(self) -> Mapping[str, Any]:
         """Get resource usage statistics"""
+        # Stats are not collected yet; every run shares the same zeroed mapping
+        return _ZERO_USAGE
+    
+    def _passes_static_check(self, code: str, language: str) -> bool:
+        """Cheap AST gate run before paying for a container"""
+        if language.lower() != 'python':
+            return True
+        
         try:
-            # Basic resource usage tracking
-            return {
-                'memory_usage': 0,
-                'cpu_usage': 0,
-                'network_io': 0,
-                'block_io': 0
-            }
-        except Exception as e:
-            logger.warning(f"Could not get resource usage: {e}")
-            return {}
+            tree = ast.parse(code)
+        except SyntaxError as e:
+            logger.warning(f"Code validation failed: syntax error: {e}")
+            return False
+        
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                modules = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                modules = [node.module]
+            else:
+                continue
+            
+            for module in modules:
+                if (self.config_manager.is_module_restricted(module) or
+                        self.config_manager.is_module_restricted(module.partition('.')[0])):
+                    logger.warning(f"Code validation failed: restricted import: {module}")
+                    return False
+        
+        return True
     
     def validate_code_in_sandbox(self, code: str, language: str = "python") -> bool:
         """Validate code by executing it in sandbox"""
         try:
+            if not self._passes_static_check(code, language):
+                return False
+            
             result = self.execute_code_safely(code, language)
             
             # Consider code valid if it executes without error
@@ -278,16 +560,79 @@ class DockerSandbox:
             logger.error(f"Sandbox validation error: {e}")
             return False
     
+    def validate_many(self, codes: List[str], language: str = "python") -> List[bool]:
+        """Validate several snippets by running them all in one container session"""
+        if not codes:
+            return []
+        
+        language = language.lower()
+        if not self.is_available():
+            return [self.validate_code_in_sandbox(code, language) for code in codes]
+        
+        # Only snippets that pass the static check need the container
+        results: List[bool] = [self._passes_static_check(code, language) for code in codes]
+        pending = [i for i, passed in enumerate(results) if passed]
+        if not pending:
+            return results
+        
+        try:
+            entry = self._acquire(language)
+        except Exception as e:
+            logger.error(f"Could not start sandbox session: {e}")
+            for i in pending:
+                results[i] = self.validate_code_in_sandbox(codes[i], language)
+            return results
+        
+        healthy = True
+        done = 0
+        
+        try:
+            for i in pending:
+                code = codes[i]
+                start_ns = time.perf_counter_ns()
+                result = self._exec_in_session(entry, code, language)
+                execution_time = (time.perf_counter_ns() - start_ns) / 1e9
+                
+                valid = result.success and execution_time < self.sandbox_config.timeout
+                if not valid:
+                    logger.warning(f"Code validation failed: {result.error}")
+                if result.exit_code == _OOM_EXIT_CODE:
+                    healthy = False
+                results[i] = valid
+                done += 1
+                
+        except Exception as e:
+            logger.error(f"Sandbox session failed: {e}")
+            healthy = False
+            for i in pending[done:]:
+                results[i] = False
+        finally:
+            # Keep the session container only when pooling is enabled
+            self._release(language, entry, healthy and self.sandbox_config.reuse_containers, runs=done)
+        
+        return results
+    
+    def _remove_container(self, container):
+        """Force-remove one container, logging rather than raising on failure"""
+        try:
+            container.remove(force=True)
+        except Exception as e:
+            logger.warning(f"Could not remove sandbox container: {e}")
+    
     def cleanup(self):
         """Cleanup Docker resources"""
-        if self.docker_client and DOCKER_AVAILABLE:
+        self._drain_pool()
+        
+        if self.docker_client and bool(DOCKER_AVAILABLE):
             try:
                 # Remove any dangling containers with our label
                 containers = self.docker_client.containers.list(
-                    filters={'label': 'agi-cli-sandbox=true'}
+                    all=True, filters={'label': 'agi-cli-sandbox=true'}
                 )
-                for container in containers:
-                    container.remove(force=True)
+                if containers:
+                    # Removals are independent, so let the daemon handle them concurrently
+                    with ThreadPoolExecutor(max_workers=min(8, len(containers))) as executor:
+                        list(executor.map(self._remove_container, containers))
                 logger.info("Docker sandbox cleanup completed")
             except Exception as e:
                 logger.error(f"Docker cleanup failed: {e}") 
\ No newline at end of file
@@ -5,24 +5,49 @@ Implements the comprehensive validation pipeline from docs/03-security-validatio
 
 import ast
 import re
-import subprocess
-import tempfile
-import sys
-import os
-import signal
-import resource
-import time
-from pathlib import Path
 from typing import List, Dict, Any, Optional, Tuple
-import traceback
-from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
+from functools import lru_cache
 
 from logger import setup_logger
 from docker_sandbox import DockerSandbox, ExecutionResult
 
 logger = setup_logger(__name__)
 
+# Validation layers in reporting order
+_LAYERS = ('input_sanitization', 'ast_analysis', 'llm_validation',
+          'complexity_analysis', 'sandbox_execution')
+
+# Outcome of one layer: (valid, issues, warnings, score penalty, layer-specific result)
+_LayerOutcome = Tuple[Optional[bool], List[str], List[str], float, Any]
+
+# Names the AST scanner flags, shared by every scanner instance
+_DANGEROUS_FUNCTIONS = frozenset({
+    'eval', 'exec', 'compile', '__import__',
+    'open', 'file', 'input', 'raw_input'
+})
+_DANGEROUS_MODULES = frozenset({
+    'os', 'sys', 'subprocess', 'shutil',
+    'socket', 'urllib', 'requests', 'http'
+})
+_DEFAULT_ALLOWED_IMPORTS = (
+    'click', 'pathlib', 'typing', 'dataclasses', 'json', 'yaml',
+    'datetime', 'time', 'math', 'random', 'string', 'collections'
+)
+
+# An LLM verdict of SAFE as a whole word, e.g. "SAFE" or "SAFE. No issues"
+_SAFE_VERDICT_RE = re.compile(r'SAFE\b')
+
+@lru_cache(maxsize=256)
+def _parse_code(code: str) -> ast.AST:
+    """Parse source once per distinct text; the shared tree must be treated as read-only
+    
+    lru_cache does not store raised exceptions, so code that fails to parse
+    is parsed (and fails) afresh on every call.
+    """
+    return ast.parse(code)
+
 @dataclass
 class ValidationResult:
     is_valid: bool
@@ -35,31 +60,50 @@ class ValidationResult:
 class InputSanitizer:
     """Layer 1: Input Sanitization and Prompt Injection Prevention"""
     
-    def __init__(self):
-        self.dangerous_patterns = [
-            # Prompt injection attempts
-            r'ignore\s+previous\s+instructions',
-            r'system\s*:\s*you\s+are\s+now',
-            r'jailbreak|roleplay|pretend',
-            
-            # Code injection patterns
-            r'exec\s*\(',
-            r'eval\s*\(',
-            r'__import__\s*\(',
-            r'subprocess\.',
-        ]
+    dangerous_patterns = (
+        # Prompt injection attempts
+        r'ignore\s+previous\s+instructions',
+        r'system\s*:\s*you\s+are\s+now',
+        r'jailbreak|roleplay|pretend',
+        
+        # Code injection patterns
+        r'exec\s*\(',
+        r'eval\s*\(',
+        r'__import__\s*\(',
+        r'subprocess\.',
+    )
+    
+    # (pattern, literal that every match contains, description)
+    suspicious_patterns = (
+        (r'rm\s+-rf', '-rf', 'Dangerous file deletion command'),
+        (r'format\s+c:', 'c:', 'Disk formatting command'),
+        (r'del\s+/\w+', 'del', 'File deletion command'),
+        (r'sudo\s+', 'sudo', 'Privilege escalation'),
+        (r'chmod\s+777', 'chmod', 'Dangerous permission change'),
+    )
+    
+    # Compiled once for all instances. Input is scanned in a single pass of
+    # one alternation; responses are prefiltered with a substring search for
+    # each pattern's literal, so most of them never reach the regex engine
+    _danger_re = re.compile(
+        '|'.join(f'(?:{pattern})' for pattern in dangerous_patterns), re.IGNORECASE
+    )
+    _suspicious_checks = tuple(
+        (literal, re.compile(pattern, re.IGNORECASE), description)
+        for pattern, literal, description in suspicious_patterns
+    )
     
     def sanitize_user_input(self, user_input: str) -> str:
         """Sanitize user input before sending to LLM"""
+        if not user_input:
+            return user_input
         
-        # Remove dangerous patterns
-        sanitized = user_input
-        for pattern in self.dangerous_patterns:
-            sanitized = re.sub(pattern, '[FILTERED]', sanitized, flags=re.IGNORECASE)
+        # Limit input length first so the remaining work is bounded too
+        if len(user_input) > 10000:
+            user_input = user_input[:10000] + "... [TRUNCATED]"
         
-        # Limit input length
-        if len(sanitized) > 10000:
-            sanitized = sanitized[:10000] + "... [TRUNCATED]"
+        # Remove dangerous patterns
+        sanitized = self._danger_re.sub('[FILTERED]', user_input)
         
         # Basic escaping
         sanitized = sanitized.replace('<', '&lt;').replace('>', '&gt;')
@@ -69,58 +113,67 @@ class InputSanitizer:
     def validate_llm_response(self, response: str) -> Tuple[bool, List[str]]:
         """Validate LLM response for safety"""
         
-        issues = []
-        
-        # Check for suspicious patterns in response
-        suspicious_patterns = [
-            (r'rm\s+-rf', 'Dangerous file deletion command'),
-            (r'format\s+c:', 'Disk formatting command'),
-            (r'del\s+/\w+', 'File deletion command'),
-            (r'sudo\s+', 'Privilege escalation'),
-            (r'chmod\s+777', 'Dangerous permission change'),
-        ]
-        
-        for pattern, description in suspicious_patterns:
-            if re.search(pattern, response, re.IGNORECASE):
-                issues.append(f"Suspicious pattern detected: {description}")
+        # Check for suspicious patterns in response; casefold so the literal
+        # test agrees with the regex's case-insensitive matching
+        folded = response.casefold()
+        issues = [f"Suspicious pattern detected: {description}"
+                  for literal, pattern, description in self._suspicious_checks
+                  if literal in folded and pattern.search(response)]
         
         return len(issues) == 0, issues
 
+class _AbortScan(Exception):
+    """Raised inside the AST scan to stop at the first violation"""
+
 class ASTSecurityScanner(ast.NodeVisitor):
     """Layer 2: Abstract Syntax Tree (AST) Analysis"""
     
     def __init__(self, config_manager):
         self.config_manager = config_manager
         self.security_violations = []
-        self.dangerous_functions = {
-            'eval', 'exec', 'compile', '__import__',
-            'open', 'file', 'input', 'raw_input'
-        }
-        self.dangerous_modules = {
-            'os', 'sys', 'subprocess', 'shutil',
-            'socket', 'urllib', 'requests', 'http'
-        }
-        self.allowed_imports = self.config_manager.get('plugins.allowed_imports', [
-            'click', 'pathlib', 'typing', 'dataclasses', 'json', 'yaml',
-            'datetime', 'time', 'math', 'random', 'string', 'collections'
-        ])
+        self.dangerous_functions = _DANGEROUS_FUNCTIONS
+        self.dangerous_modules = _DANGEROUS_MODULES
+        self.allowed_imports = frozenset(
+            self.config_manager.get('plugins.allowed_imports', _DEFAULT_ALLOWED_IMPORTS)
+        )
+        # Rejected code only needs one reason, so stop walking at the first one
+        self._fail_fast = self.config_manager.get('validation.fail_fast', True)
     
-    def scan_code(self, code: str) -> Tuple[bool, List[str]]:
-        """Scan code for security violations"""
+    def scan_code(self, code: str, tree: Optional[ast.AST] = None) -> Tuple[bool, List[str]]:
+        """Scan code for security violations, reusing an already parsed tree if given"""
         self.security_violations = []
         
         try:
-            tree = ast.parse(code)
-            self.visit(tree)
+            if tree is None:
+                tree = ast.parse(code)
+            try:
+                self.visit(tree)
+            except _AbortScan:
+                pass
             return len(self.security_violations) == 0, self.security_violations
         except SyntaxError as e:
             return False, [f"Syntax error: {e}"]
     
+    def _report(self, violation: str):
+        """Record a violation, ending the scan here in fail-fast mode"""
+        self.security_violations.append(violation)
+        if self._fail_fast:
+            raise _AbortScan()
+    
+    # Leaves with nothing to check below them; skipping generic_visit there
+    # prunes most of the nodes in literal-heavy code
+    
+    def visit_Constant(self, node):
+        """Constants (including docstrings) hold no calls or imports"""
+    
+    def visit_Name(self, node):
+        """Bare names only have a load/store context below them"""
+    
     def visit_Call(self, node):
         """Check function calls for dangerous operations"""
         if isinstance(node.func, ast.Name):
             if node.func.id in self.dangerous_functions:
-                self.security_violations.append(
+                self._report(
                     f"Dangerous function call: {node.func.id}"
                 )
         
@@ -128,7 +181,7 @@ class ASTSecurityScanner(ast.NodeVisitor):
             if hasattr(node.func.value, 'id'):
                 module_name = node.func.value.id
                 if module_name in self.dangerous_modules:
-                    self.security_violations.append(
+                    self._report(
                         f"Dangerous module usage: {module_name}.{node.func.attr}"
                     )
         
@@ -138,11 +191,11 @@ class ASTSecurityScanner(ast.NodeVisitor):
         """Check imports for dangerous modules"""
         for alias in node.names:
             if alias.name in self.dangerous_modules:
-                self.security_violations.append(
+                self._report(
                     f"Dangerous import: {alias.name}"
                 )
             elif alias.name not in self.allowed_imports:
-                self.security_violations.append(
+                self._report(
                     f"Import not in allowed list: {alias.name}"
                 )
         self.generic_visit(node)
@@ -150,11 +203,11 @@ class ASTSecurityScanner(ast.NodeVisitor):
     def visit_ImportFrom(self, node):
         """Check from imports for dangerous modules"""
         if node.module in self.dangerous_modules:
-            self.security_violations.append(
+            self._report(
                 f"Dangerous from import: {node.module}"
             )
         elif node.module and node.module not in self.allowed_imports:
-            self.security_violations.append(
+            self._report(
                 f"From import not in allowed list: {node.module}"
             )
         self.generic_visit(node)
@@ -162,8 +215,10 @@ class ASTSecurityScanner(ast.NodeVisitor):
 class LLMSecurityValidator:
     """Layer 3: LLM-based Security Analysis"""
     
-    def __init__(self, llm_integration):
+    def __init__(self, llm_integration, detail_on_ambiguous: bool = False):
         self.llm_integration = llm_integration
+        # Asking the model to explain an unclear verdict costs a second round trip
+        self.detail_on_ambiguous = detail_on_ambiguous
     
     def validate_with_llm(self, code: str) -> Tuple[bool, List[str]]:
         """Use LLM to validate code for security issues"""
@@ -185,18 +240,21 @@ Respond with only 'SAFE' if the code is acceptable, or 'UNSAFE' if it poses any
             if not response:
                 return False, ["LLM validation failed - no response"]
             
-            response = response.strip().upper()
+            verdict = response.strip().upper()
             
-            if response == 'SAFE':
+            # Models often add punctuation or a reason after the verdict word
+            if _SAFE_VERDICT_RE.match(verdict):
                 return True, []
-            elif response == 'UNSAFE':
+            elif 'UNSAFE' in verdict[:32]:
                 return False, ["LLM identified security risks in code"]
-            else:
+            elif self.detail_on_ambiguous:
                 # If response is not clear, ask for details
                 detail_prompt = f"The code was flagged as potentially unsafe. Please explain the specific security issues:\n\n{code}"
                 detail_response = self.llm_integration.query(detail_prompt, system_prompt)
                 
                 return False, [f"LLM security concern: {detail_response or 'Unknown security issue'}"]
+            else:
+                return False, [f"LLM returned an ambiguous verdict: {response.strip()[:200]}"]
                 
         except Exception as e:
             logger.error(f"LLM validation error: {e}")
@@ -211,52 +269,56 @@ class ComplexityAnalyzer:
         self.max_lines = config_manager.get('validation.max_lines', 100)
         self.max_functions = config_manager.get('validation.max_functions', 5)
     
-    def analyze_complexity(self, code: str) -> Tuple[bool, List[str], Dict[str, Any]]:
-        """Analyze code complexity and resource requirements"""
+    def analyze_complexity(self, code: str, tree: Optional[ast.AST] = None) -> Tuple[bool, List[str], Dict[str, Any]]:
+        """Analyze code complexity and resource requirements, reusing an already parsed tree if given"""
         
         issues = []
         warnings = []
         metrics = {}
         
         try:
-            tree = ast.parse(code)
+            if tree is None:
+                tree = ast.parse(code)
             
-            # Count various code elements
-            functions = [node for node in ast.walk(tree) if isinstance(node, ast.FunctionDef)]
-            classes = [node for node in ast.walk(tree) if isinstance(node, ast.ClassDef)]
-            loops = [node for node in ast.walk(tree) if isinstance(node, (ast.For, ast.While))]
-            conditionals = [node for node in ast.walk(tree) if isinstance(node, ast.If)]
+            # Count various code elements in a single traversal
+            functions = classes = loops = conditionals = 0
+            for node in ast.walk(tree):
+                if isinstance(node, ast.FunctionDef):
+                    functions += 1
+                elif isinstance(node, ast.ClassDef):
+                    classes += 1
+                elif isinstance(node, (ast.For, ast.While)):
+                    loops += 1
+                    # Check for potential infinite loops
+                    # Simple heuristic: while True without break
+                    if (isinstance(node, ast.While) and
+                            isinstance(node.test, ast.Constant) and node.test.value is True and
+                            not any(isinstance(inner, ast.Break) for inner in ast.walk(node))):
+                        warnings.append("Potential infinite loop detected")
+                elif isinstance(node, ast.If):
+                    conditionals += 1
             
-            lines = len([line for line in code.split('\n') if line.strip()])
+            lines = sum(1 for line in code.splitlines() if line.strip())
             
             metrics = {
                 'lines': lines,
-                'functions': len(functions),
-                'classes': len(classes),
-                'loops': len(loops),
-                'conditionals': len(conditionals),
-                'complexity_score': len(loops) + len(conditionals) + len(functions)
+                'functions': functions,
+                'classes': classes,
+                'loops': loops,
+                'conditionals': conditionals,
+                'complexity_score': loops + conditionals + functions
             }
             
             # Check limits
             if lines > self.max_lines:
                 issues.append(f"Code too long: {lines} lines (max {self.max_lines})")
             
-            if len(functions) > self.max_functions:
-                issues.append(f"Too many functions: {len(functions)} (max {self.max_functions})")
+            if functions > self.max_functions:
+                issues.append(f"Too many functions: {functions} (max {self.max_functions})")
             
             if metrics['complexity_score'] > self.max_complexity:
                 issues.append(f"Code too complex: score {metrics['complexity_score']} (max {self.max_complexity})")
             
-            # Check for potential infinite loops
-            for loop in loops:
-                if isinstance(loop, ast.While):
-                    # Simple heuristic: while True without break
-                    if (isinstance(loop.test, ast.Constant) and loop.test.value is True):
-                        has_break = any(isinstance(node, ast.Break) for node in ast.walk(loop))
-                        if not has_break:
-                            warnings.append("Potential infinite loop detected")
-            
             return len(issues) == 0, issues + warnings, metrics
             
         except SyntaxError as e:
@@ -275,76 +337,67 @@ class EnhancedValidator:
         # Initialize validation layers
         self.input_sanitizer = InputSanitizer()
         self.ast_scanner = ASTSecurityScanner(config_manager)
-        self.llm_validator = LLMSecurityValidator(llm_integration)
+        self.llm_validator = LLMSecurityValidator(
+            llm_integration, config_manager.get('validation.llm_detail_on_ambiguous', False)
+        )
         self.complexity_analyzer = ComplexityAnalyzer(config_manager)
-        self.docker_sandbox = DockerSandbox(config_manager)
+        # Validations exec into a warm, periodically recycled container
+        # instead of paying for a new container each time
+        self.docker_sandbox = DockerSandbox(
+            config_manager, reuse_containers=config_manager.get('validation.persistent_sandbox', True)
+        )
         
         logger.info("Enhanced 5-layer validation system initialized")
     
-    def validate_code_comprehensive(self, code: str, user_input: str = "") -> ValidationResult:
-        """Run comprehensive 5-layer validation"""
-        
-        issues = []
-        warnings = []
-        layer_results = {}
-        security_score = 100.0
-        
-        logger.info("Starting comprehensive code validation")
-        
-        # Layer 1: Input Sanitization
+    def _layer_input_sanitization(self, code: str, user_input: str) -> _LayerOutcome:
+        """Layer 1: Input Sanitization"""
         try:
+            warnings = []
             if user_input:
                 sanitized_input = self.input_sanitizer.sanitize_user_input(user_input)
                 if sanitized_input != user_input:
                     warnings.append("User input was sanitized")
             
             llm_response_valid, llm_issues = self.input_sanitizer.validate_llm_response(code)
-            layer_results['input_sanitization'] = llm_response_valid
-            
             if not llm_response_valid:
-                issues.extend(llm_issues)
-                security_score -= 30
+                return False, llm_issues, warnings, 30, None
+            return True, [], warnings, 0, None
                 
         except Exception as e:
             logger.error(f"Layer 1 validation failed: {e}")
-            layer_results['input_sanitization'] = False
-            issues.append(f"Input sanitization failed: {str(e)}")
-            security_score -= 20
-        
-        # Layer 2: AST Security Analysis
+            return False, [f"Input sanitization failed: {str(e)}"], [], 20, None
+    
+    def _layer_ast_analysis(self, code: str, tree: Optional[ast.AST] = None) -> _LayerOutcome:
+        """Layer 2: AST Security Analysis"""
         try:
-            ast_valid, ast_issues = self.ast_scanner.scan_code(code)
-            layer_results['ast_analysis'] = ast_valid
-            
+            ast_valid, ast_issues = self.ast_scanner.scan_code(code, tree)
             if not ast_valid:
-                issues.extend(ast_issues)
-                security_score -= 25
+                return False, ast_issues, [], 25, None
+            return True, [], [], 0, None
                 
         except Exception as e:
             logger.error(f"Layer 2 validation failed: {e}")
-            layer_results['ast_analysis'] = False
-            issues.append(f"AST analysis failed: {str(e)}")
-            security_score -= 20
-        
-        # Layer 3: LLM Security Validation
+            return False, [f"AST analysis failed: {str(e)}"], [], 20, None
+    
+    def _layer_llm_validation(self, code: str) -> _LayerOutcome:
+        """Layer 3: LLM Security Validation"""
         try:
             llm_valid, llm_sec_issues = self.llm_validator.validate_with_llm(code)
-            layer_results['llm_validation'] = llm_valid
-            
             if not llm_valid:
-                issues.extend(llm_sec_issues)
-                security_score -= 20
+                return False, llm_sec_issues, [], 20, None
+            return True, [], [], 0, None
                 
         except Exception as e:
             logger.error(f"Layer 3 validation failed: {e}")
-            layer_results['llm_validation'] = False
-            issues.append(f"LLM validation failed: {str(e)}")
-            security_score -= 15
-        
-        # Layer 4: Complexity Analysis
+            return False, [f"LLM validation failed: {str(e)}"], [], 15, None
+    
+    def _layer_complexity_analysis(self, code: str, tree: Optional[ast.AST] = None) -> _LayerOutcome:
+        """Layer 4: Complexity Analysis"""
         try:
-            complexity_valid, complexity_issues, metrics = self.complexity_analyzer.analyze_complexity(code)
-            layer_results['complexity_analysis'] = complexity_valid
+            complexity_valid, complexity_issues, metrics = self.complexity_analyzer.analyze_complexity(code, tree)
+            issues = []
+            warnings = []
+            penalty = 0
             
             if not complexity_valid:
                 # Separate issues from warnings
@@ -353,39 +406,86 @@ class EnhancedValidator:
                         warnings.append(issue)
                     else:
                         issues.append(issue)
-                        security_score -= 10
+                        penalty += 10
+            
+            return complexity_valid, issues, warnings, penalty, None
                         
         except Exception as e:
             logger.error(f"Layer 4 validation failed: {e}")
-            layer_results['complexity_analysis'] = False
-            issues.append(f"Complexity analysis failed: {str(e)}")
-            security_score -= 10
-        
-        # Layer 5: Sandbox Execution
-        execution_result = None
+            return False, [f"Complexity analysis failed: {str(e)}"], [], 10, None
+    
+    def _layer_sandbox_execution(self, code: str) -> _LayerOutcome:
+        """Layer 5: Sandbox Execution"""
         try:
-            if self.docker_sandbox.is_available():
-                execution_result = self.docker_sandbox.execute_code_safely(code)
-                sandbox_valid = execution_result.success
-                layer_results['sandbox_execution'] = sandbox_valid
-                
-                if not sandbox_valid:
-                    issues.append(f"Sandbox execution failed: {execution_result.error}")
-                    security_score -= 15
-                else:
-                    # Check execution time and resource usage
-                    if execution_result.execution_time > 10:  # 10 seconds
-                        warnings.append(f"Long execution time: {execution_result.execution_time:.2f}s")
-                        
-            else:
-                layer_results['sandbox_execution'] = None
-                warnings.append("Docker sandbox not available - skipping execution validation")
+            if not self.docker_sandbox.is_available():
+                return None, [], ["Docker sandbox not available - skipping execution validation"], 0, None
+            
+            execution_result = self.docker_sandbox.execute_code_safely(code)
+            if not execution_result.success:
+                return False, [f"Sandbox execution failed: {execution_result.error}"], [], 15, execution_result
+            
+            # Check execution time and resource usage
+            warnings = []
+            if execution_result.execution_time > 10:  # 10 seconds
+                warnings.append(f"Long execution time: {execution_result.execution_time:.2f}s")
+            return True, [], warnings, 0, execution_result
                 
         except Exception as e:
             logger.error(f"Layer 5 validation failed: {e}")
-            layer_results['sandbox_execution'] = False
-            issues.append(f"Sandbox validation failed: {str(e)}")
-            security_score -= 10
+            return False, [f"Sandbox validation failed: {str(e)}"], [], 10, None
+    
+    def validate_code_comprehensive(self, code: str, user_input: str = "") -> ValidationResult:
+        """Run comprehensive 5-layer validation"""
+        
+        issues = []
+        warnings = []
+        layer_results = {}
+        security_score = 100.0
+        
+        logger.info("Starting comprehensive code validation")
+        
+        # Parse once for the two AST-based layers (and reuse the tree when the
+        # same code is validated again); if parsing fails each of them
+        # re-parses so it reports the error the usual way. Pathologically
+        # nested input raises RecursionError or MemoryError rather than
+        # SyntaxError, and must not escape the validator either
+        try:
+            tree = _parse_code(code)
+        except (SyntaxError, ValueError, MemoryError, RecursionError):
+            tree = None
+        
+        # The local layers take microseconds; run them first, since a definite
+        # reject from the sanitizer or AST scan makes the LLM and sandbox moot
+        outcomes = {
+            'input_sanitization': self._layer_input_sanitization(code, user_input),
+            'ast_analysis': self._layer_ast_analysis(code, tree),
+            'complexity_analysis': self._layer_complexity_analysis(code, tree)
+        }
+        rejected = not (outcomes['input_sanitization'][0] and outcomes['ast_analysis'][0])
+        
+        if rejected and self.config_manager.get('validation.fail_fast', True):
+            outcomes['llm_validation'] = (
+                None, [], ["LLM validation skipped after a critical layer failed"], 0, None)
+            outcomes['sandbox_execution'] = (
+                None, [], ["Sandbox execution skipped after a critical layer failed"], 0, None)
+        else:
+            # The LLM and sandbox layers wait on I/O, so run them side by side
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                llm_future = executor.submit(self._layer_llm_validation, code)
+                sandbox_future = executor.submit(self._layer_sandbox_execution, code)
+                outcomes['llm_validation'] = llm_future.result()
+                outcomes['sandbox_execution'] = sandbox_future.result()
+        
+        # Aggregate in layer order so reports don't depend on completion order
+        execution_result = None
+        for layer in _LAYERS:
+            valid, layer_issues, layer_warnings, penalty, extra = outcomes[layer]
+            layer_results[layer] = valid
+            issues.extend(layer_issues)
+            warnings.extend(layer_warnings)
+            security_score -= penalty
+            if layer == 'sandbox_execution':
+                execution_result = extra
         
         # Calculate final validation result
         critical_layers = ['input_sanitization', 'ast_analysis', 'llm_validation']
@@ -2,28 +2,180 @@
 Command history and rollback capabilities
 """
 
+import atexit
+import heapq
 import json
+import mmap
+import os
+import subprocess
+import sys
+import threading
 import uuid
+import weakref
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 import shutil
 
+# Prefer orjson for history persistence, fall back to stdlib json
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+    orjson = None
+
 from logger import setup_logger
 
 logger = setup_logger(__name__)
 
+# Blob store of entries written before the store name was recorded per entry
+_DEFAULT_CODE_STORE = "codes.bin"
+
+def _dump_json(data: Any, pretty: bool = False) -> bytes:
+    """Serialize data to UTF-8 JSON bytes, compact unless pretty is set"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 if pretty else None)
+    if pretty:
+        return json.dumps(data, indent=2).encode('utf-8')
+    return json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+def _dump_line(data: Any) -> bytes:
+    """Serialize data to a single compact JSON Lines record"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data) + b'\n'
+    return json.dumps(data).encode('utf-8') + b'\n'
+
+def _load_json(raw: bytes) -> Any:
+    """Deserialize JSON bytes"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+def _native_copy_commands(src: Path, dst: Path) -> List[List[str]]:
+    """Native copy commands to try in order, cheapest (reflink/clone) first"""
+    if sys.platform == 'darwin':
+        # APFS clonefile, then a regular recursive copy
+        return [['cp', '-c', '-pR', f"{src}/.", str(dst)],
+                ['cp', '-pR', f"{src}/.", str(dst)]]
+    
+    # GNU cp clones extents on btrfs/XFS and silently copies elsewhere
+    return [['cp', '--reflink=auto', '-a', f"{src}/.", str(dst)],
+            ['cp', '-a', f"{src}/.", str(dst)]]
+
+def _fast_copytree(src: Path, dst: Path):
+    """Copy a directory tree with the platform's native copy tool, if available"""
+    dst.mkdir(parents=True, exist_ok=True)
+    
+    try:
+        if os.name == 'nt':
+            if shutil.which('robocopy'):
+                result = subprocess.run(
+                    ['robocopy', str(src), str(dst), '/MT:64', '/E', '/NFL', '/NDL', '/NJH', '/NJS'],
+                    capture_output=True
+                )
+                # robocopy exit codes 0-7 indicate success
+                if result.returncode < 8:
+                    return
+        elif shutil.which('cp'):
+            for command in _native_copy_commands(src, dst):
+                result = subprocess.run(command, capture_output=True)
+                if result.returncode == 0:
+                    return
+        
+        logger.debug(f"Native copy unavailable for {src}, using shutil")
+        
+    except OSError as e:
+        logger.debug(f"Native copy failed for {src}: {e}")
+    
+    shutil.copytree(src, dst, dirs_exist_ok=True)
+
+def _replace_tree(src: Path, dst: Path):
+    """Replace dst with a copy of src, deleting the old tree in the background"""
+    old = None
+    if dst.exists():
+        # Renaming is O(1); the old tree is reclaimed off the critical path
+        old = dst.with_name(f"{dst.name}.old-{uuid.uuid4().hex[:8]}")
+        os.replace(dst, old)
+    
+    try:
+        _fast_copytree(src, dst)
+    except Exception:
+        # Put the previous tree back so a failed restore leaves nothing half-done
+        if old is not None:
+            shutil.rmtree(dst, ignore_errors=True)
+            os.replace(old, dst)
+        raise
+    
+    if old is not None:
+        threading.Thread(target=shutil.rmtree, args=(old,),
+                         kwargs={'ignore_errors': True}).start()
+
+# Live managers whose buffered records are flushed at exit. Weak, so
+# registering does not keep a manager (or its buffer) alive
+_open_managers = weakref.WeakSet()
+
+@atexit.register
+def _flush_open_managers():
+    """Flush the queued records of every live history manager"""
+    for manager in list(_open_managers):
+        manager._flush_history()
+
 class HistoryManager:
     """Manages command history, backups, and rollbacks"""
     
     def __init__(self, config_manager):
         self.config_manager = config_manager
-        self.history_config = config_manager.get('history', {})
+        self.reload_config()
         self.history_dir = Path(config_manager.get('paths.backups_dir', 'backups'))
         self.history_dir.mkdir(parents=True, exist_ok=True)
         
-        self.history_file = self.history_dir / "command_history.json"
-        self.history_data = self._load_history()
+        # Append-only JSON Lines log; records are folded by id at load time.
+        # Absolute so the exit-time flush is unaffected by later chdir calls
+        self.history_file = self.history_dir.absolute() / "command_history.jsonl"
+        self.legacy_history_file = self.history_dir / "command_history.json"
+        self._record_count = 0
+        
+        # Appended records are buffered and flushed in batches (and at
+        # close or exit)
+        self._pending_records: List[bytes] = []
+        _open_managers.add(self)
+        
+        # Entries keyed by id, kept in chronological (insertion) order
+        self._by_id: Dict[str, Dict[str, Any]] = self._load_history()
+        
+        # Newest-first view, rebuilt lazily after inserts and deletes
+        self._history_view: Optional[List[Dict[str, Any]]] = None
+        
+        # Code blobs live in an append-only file, addressed by (store, offset,
+        # length). Compaction writes a new store under a fresh name, so the
+        # log on disk always references a file with the offsets it expects
+        store_names = [e['code_store'] for e in self._by_id.values() if 'code_store' in e]
+        self.code_store_file = self.history_dir.absolute() / (
+            store_names[-1] if store_names else _DEFAULT_CODE_STORE)
+        self._code_store = None
+        
+        # Read-only mapping of the blob store, remapped when it grows
+        self._code_mm: Optional[mmap.mmap] = None
+    
+    def close(self):
+        """Flush queued records and release the blob store"""
+        self._flush_history()
+        self._close_code_store()
+        _open_managers.discard(self)
+    
+    def reload_config(self):
+        """Re-read the configuration values used by history and backups"""
+        self.history_config = self.config_manager.get('history', {})
+        self._max_entries = self.history_config.get('max_entries', 1000)
+        self._flush_threshold = self.history_config.get('flush_threshold', 16)
+        self._generated_dir = Path(self.config_manager.get('paths.generated_dir', 'generated'))
+        self._plugins_dir = Path(self.config_manager.get('paths.plugins_dir', 'plugins'))
+    
+    @property
+    def history_data(self) -> List[Dict[str, Any]]:
+        """All history entries in chronological order"""
+        return list(self._by_id.values())
     
     def save_command(self, description: str, code: str) -> str:
         """Save a command to history"""
@@ -34,27 +186,22 @@ class HistoryManager:
             entry = {
                 'id': command_id,
                 'description': description,
-                'code': code,
                 'timestamp': timestamp,
                 'status': 'saved'
             }
             
-            # Save code to separate file
-            code_file = self.history_dir / f"{command_id}.py"
-            with open(code_file, 'w') as f:
-                f.write(code)
-            
-            entry['code_file'] = str(code_file)
+            # Append code to the blob store
+            entry['code_offset'], entry['code_len'] = self._write_code(code.encode('utf-8'))
+            entry['code_store'] = self.code_store_file.name
             
             # Add to history
-            self.history_data.append(entry)
+            self._by_id[entry['id']] = entry
+            self._history_view = None
+            self._append_history(entry)
             
-            # Cleanup old entries if needed
+            # Compact the log if it has grown past its limit
             self._cleanup_history()
             
-            # Save history
-            self._save_history()
-            
             logger.info(f"Command saved to history: {command_id}")
             return command_id
             
@@ -64,23 +211,54 @@ class HistoryManager:
     
     def get_history(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
         """Get command history"""
-        history = sorted(self.history_data, key=lambda x: x['timestamp'], reverse=True)
+        if self._history_view is None:
+            # Entries are appended chronologically, so this is a linear-time
+            # run reversal for timsort rather than a full sort
+            self._history_view = sorted(self._by_id.values(), key=lambda x: x['timestamp'], reverse=True)
         
         if limit:
-            history = history[:limit]
+            return self._history_view[:limit]
         
-        return history
+        return list(self._history_view)
     
     def get_history_count(self) -> int:
         """Get total number of history entries"""
-        return len(self.history_data)
+        return len(self._by_id)
     
     def get_command(self, command_id: str) -> Optional[Dict[str, Any]]:
         """Get a specific command by ID"""
-        for entry in self.history_data:
-            if entry['id'] == command_id:
-                return entry
-        return None
+        return self._by_id.get(command_id)
+    
+    def get_code(self, command_id: str) -> Optional[str]:
+        """Get the source code saved for a command"""
+        entry = self._by_id.get(command_id)
+        if not entry:
+            return None
+        
+        if 'code_offset' in entry:
+            return self._read_code(entry).decode('utf-8')
+        
+        # Legacy entries keep their code inline
+        return entry.get('code')
+    
+    def export_history_json(self, export_path: str, pretty: bool = True) -> bool:
+        """Export history, with code inlined, as a JSON document for auditing"""
+        try:
+            entries = []
+            for entry in self.get_history():
+                exported = {k: v for k, v in entry.items()
+                            if k not in ('code_offset', 'code_len', 'code_store')}
+                exported['code'] = self.get_code(entry['id'])
+                entries.append(exported)
+            
+            Path(export_path).write_bytes(_dump_json(entries, pretty=pretty))
+            
+            logger.info(f"Exported {len(entries)} history entries to {export_path}")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Failed to export history: {e}")
+            return False
     
     def rollback_command(self, command_id: str) -> bool:
         """Rollback a command (mark as inactive)"""
@@ -100,13 +278,14 @@ class HistoryManager:
                 'rollback_of': command_id
             }
             
-            self.history_data.append(rollback_entry)
+            self._by_id[rollback_entry['id']] = rollback_entry
+            self._history_view = None
             
             # Mark original as rolled back
             entry['status'] = 'rolled_back'
             entry['rolled_back_at'] = datetime.now().isoformat()
             
-            self._save_history()
+            self._append_history(rollback_entry, entry)
             
             logger.info(f"Command rolled back: {command_id}")
             return True
@@ -123,15 +302,16 @@ class HistoryManager:
                 logger.error(f"Command not found in history: {command_id}")
                 return False
             
-            # Remove code file
-            code_file = Path(entry.get('code_file', ''))
-            if code_file.exists():
-                code_file.unlink()
+            # Legacy entries have a per-command code file; blobs are
+            # reclaimed when the log is compacted
+            self._remove_code_file(entry)
             
             # Remove from history
-            self.history_data = [e for e in self.history_data if e['id'] != command_id]
+            del self._by_id[command_id]
+            self._history_view = None
             
-            self._save_history()
+            # Record a tombstone instead of rewriting the log
+            self._append_history({'id': command_id, 'deleted': True})
             
             logger.info(f"Command deleted from history: {command_id}")
             return True
@@ -150,18 +330,15 @@ class HistoryManager:
             
             # Backup configuration
             config_backup = backup_dir / "config.json"
-            with open(config_backup, 'w') as f:
-                json.dump(self.config_manager.config, f, indent=2)
+            config_backup.write_bytes(_dump_json(self.config_manager.config))
             
             # Backup generated commands
-            generated_dir = Path(self.config_manager.get('paths.generated_dir', 'generated'))
-            if generated_dir.exists():
-                shutil.copytree(generated_dir, backup_dir / "generated", dirs_exist_ok=True)
+            if self._generated_dir.exists():
+                _fast_copytree(self._generated_dir, backup_dir / "generated")
             
             # Backup plugins
-            plugins_dir = Path(self.config_manager.get('paths.plugins_dir', 'plugins'))
-            if plugins_dir.exists():
-                shutil.copytree(plugins_dir, backup_dir / "plugins", dirs_exist_ok=True)
+            if self._plugins_dir.exists():
+                _fast_copytree(self._plugins_dir, backup_dir / "plugins")
             
             # Create backup metadata
             backup_metadata = {
@@ -177,8 +354,7 @@ class HistoryManager:
             }
             
             metadata_file = backup_dir / "metadata.json"
-            with open(metadata_file, 'w') as f:
-                json.dump(backup_metadata, f, indent=2)
+            metadata_file.write_bytes(_dump_json(backup_metadata))
             
             # Add to history
             history_entry = {
@@ -190,8 +366,9 @@ class HistoryManager:
                 'backup_dir': str(backup_dir)
             }
             
-            self.history_data.append(history_entry)
-            self._save_history()
+            self._by_id[history_entry['id']] = history_entry
+            self._history_view = None
+            self._append_history(history_entry)
             
             logger.info(f"System backup created: {backup_id}")
             return backup_id
@@ -216,26 +393,20 @@ class HistoryManager:
             # Restore configuration
             config_backup = backup_dir / "config.json"
             if config_backup.exists():
-                with open(config_backup, 'r') as f:
-                    restored_config = json.load(f)
+                restored_config = _load_json(config_backup.read_bytes())
                 self.config_manager.config = restored_config
                 self.config_manager.save_config()
+                self.reload_config()
             
             # Restore generated commands
             generated_backup = backup_dir / "generated"
-            generated_dir = Path(self.config_manager.get('paths.generated_dir', 'generated'))
             if generated_backup.exists():
-                if generated_dir.exists():
-                    shutil.rmtree(generated_dir)
-                shutil.copytree(generated_backup, generated_dir)
+                _replace_tree(generated_backup, self._generated_dir)
             
             # Restore plugins
             plugins_backup = backup_dir / "plugins"
-            plugins_dir = Path(self.config_manager.get('paths.plugins_dir', 'plugins'))
             if plugins_backup.exists():
-                if plugins_dir.exists():
-                    shutil.rmtree(plugins_dir)
-                shutil.copytree(plugins_backup, plugins_dir)
+                _replace_tree(plugins_backup, self._plugins_dir)
             
             # Create restore entry
             restore_entry = {
@@ -247,8 +418,9 @@ class HistoryManager:
                 'restored_from': backup_id
             }
             
-            self.history_data.append(restore_entry)
-            self._save_history()
+            self._by_id[restore_entry['id']] = restore_entry
+            self._history_view = None
+            self._append_history(restore_entry)
             
             logger.info(f"System restored from backup: {backup_id}")
             return True
@@ -257,49 +429,202 @@ class HistoryManager:
             logger.error(f"Failed to restore system backup {backup_id}: {e}")
             return False
     
-    def _load_history(self) -> List[Dict[str, Any]]:
-        """Load history from file"""
+    def _load_history(self) -> Dict[str, Dict[str, Any]]:
+        """Load history by folding the JSON Lines log by entry id"""
         try:
-            if self.history_file.exists():
-                with open(self.history_file, 'r') as f:
-                    return json.load(f)
-            else:
-                return []
+            if not self.history_file.exists():
+                return self._load_legacy_history()
+            
+            entries: Dict[str, Dict[str, Any]] = {}
+            record_count = 0
+            
+            for line in self.history_file.read_bytes().splitlines():
+                if not line.strip():
+                    continue
+                try:
+                    record = _load_json(line)
+                except ValueError:
+                    logger.warning("Skipping corrupt history record")
+                    continue
+                
+                record_count += 1
+                if record.get('deleted'):
+                    entries.pop(record['id'], None)
+                else:
+                    entries[record['id']] = record
+            
+            self._record_count = record_count
+            return entries
+            
         except Exception as e:
             logger.error(f"Failed to load history: {e}")
-            return []
+            return {}
+    
+    def _load_legacy_history(self) -> Dict[str, Dict[str, Any]]:
+        """Load a legacy command_history.json file (converted on first write)"""
+        if not self.legacy_history_file.exists():
+            return {}
+        
+        history_data = _load_json(self.legacy_history_file.read_bytes())
+        logger.info(f"Loaded {len(history_data)} entries from legacy history file")
+        return {entry['id']: entry for entry in history_data}
+    
+    def _append_history(self, *records: Dict[str, Any]):
+        """Queue records for the history log, flushing once enough accumulate"""
+        self._pending_records.extend(_dump_line(record) for record in records)
+        self._record_count += len(records)
+        
+        if len(self._pending_records) >= self._flush_threshold:
+            self._flush_history()
+    
+    def _flush_history(self):
+        """Write queued records to the history log"""
+        if not self._pending_records:
+            return
+        
+        try:
+            # First write (or legacy migration): publish a full snapshot instead
+            if not self.history_file.exists():
+                self._save_history()
+                return
+            
+            with open(self.history_file, 'ab') as f:
+                f.write(b''.join(self._pending_records))
+            
+            self._pending_records.clear()
+            logger.debug("History appended")
+            
+        except Exception as e:
+            logger.error(f"Failed to append history: {e}")
     
-    def _save_history(self):
-        """Save history to file"""
+    def _save_history(self) -> bool:
+        """Rewrite the history log with only the live entries"""
         try:
-            with open(self.history_file, 'w') as f:
-                json.dump(self.history_data, f, indent=2)
+            temp_file = self.history_file.with_suffix('.jsonl.tmp')
+            temp_file.write_bytes(b''.join(_dump_line(entry) for entry in self._by_id.values()))
+            os.replace(temp_file, self.history_file)
             
+            # The snapshot already reflects any queued records
+            self._pending_records.clear()
+            self._record_count = len(self._by_id)
             logger.debug("History saved")
+            return True
             
         except Exception as e:
             logger.error(f"Failed to save history: {e}")
+            return False
     
     def _cleanup_history(self):
-        """Clean up old history entries"""
+        """Trim old entries and compact the log once it exceeds its limit"""
         try:
-            max_entries = self.history_config.get('max_entries', 1000)
-            
-            if len(self.history_data) > max_entries:
-                # Sort by timestamp and keep the most recent
-                sorted_history = sorted(self.history_data, key=lambda x: x['timestamp'], reverse=True)
-                entries_to_remove = sorted_history[max_entries:]
-                
-                # Remove old code files
-                for entry in entries_to_remove:
-                    code_file = Path(entry.get('code_file', ''))
-                    if code_file.exists():
-                        code_file.unlink()
-                
-                # Keep only recent entries
-                self.history_data = sorted_history[:max_entries]
-                
+            max_entries = self._max_entries
+            
+            # Allow 20% slack so compaction is amortized over many appends
+            if self._record_count <= max_entries * 1.2:
+                return
+            
+            # Select the most recent entries without sorting the whole history
+            recent = heapq.nlargest(max_entries, self._by_id.values(), key=lambda x: x['timestamp'])
+            recent_ids = {entry['id'] for entry in recent}
+            entries_to_remove = [e for e in self._by_id.values() if e['id'] not in recent_ids]
+            
+            # Remove old code files
+            for entry in entries_to_remove:
+                self._remove_code_file(entry)
+            
+            # Keep only recent entries
+            self._by_id = {entry['id']: entry for entry in reversed(recent)}
+            self._history_view = recent
+            # Old blob stores are only deleted once the log that references
+            # the compacted store is on disk
+            self._compact_code_store()
+            if self._save_history():
+                self._remove_stale_code_stores()
+            
+            if entries_to_remove:
                 logger.info(f"Cleaned up {len(entries_to_remove)} old history entries")
         
         except Exception as e:
             logger.error(f"Failed to cleanup history: {e}")
+    
+    def _open_code_store(self):
+        """Open the blob store on first use"""
+        if self._code_store is None:
+            self._code_store = open(self.code_store_file, 'ab+')
+        return self._code_store
+    
+    def _write_code(self, data: bytes) -> Tuple[int, int]:
+        """Append a code blob to the store and return its (offset, length)"""
+        code_store = self._open_code_store()
+        offset = code_store.seek(0, os.SEEK_END)
+        code_store.write(data)
+        code_store.flush()
+        return offset, len(data)
+    
+    def _read_code(self, entry: Dict[str, Any]) -> bytes:
+        """Read the code blob referenced by a history entry"""
+        start = entry['code_offset']
+        end = start + entry['code_len']
+        if start == end:
+            return b''
+        
+        # Entries still in an older store (a compacted log was not saved)
+        store_name = entry.get('code_store', _DEFAULT_CODE_STORE)
+        if store_name != self.code_store_file.name:
+            with open(self.code_store_file.with_name(store_name), 'rb') as f:
+                f.seek(start)
+                return f.read(end - start)
+        
+        if self._code_mm is None or end > len(self._code_mm):
+            self._remap_code_store()
+        
+        return self._code_mm[start:end]
+    
+    def _remap_code_store(self):
+        """Map the current contents of the blob store"""
+        self._unmap_code_store()
+        code_store = self._open_code_store()
+        self._code_mm = mmap.mmap(code_store.fileno(), 0, access=mmap.ACCESS_READ)
+    
+    def _unmap_code_store(self):
+        """Release the blob store mapping"""
+        if self._code_mm is not None:
+            self._code_mm.close()
+            self._code_mm = None
+    
+    def _close_code_store(self):
+        """Release the blob store mapping and file handle"""
+        self._unmap_code_store()
+        if self._code_store is not None:
+            self._code_store.close()
+            self._code_store = None
+    
+    def _remove_code_file(self, entry: Dict[str, Any]):
+        """Remove the per-command code file of a legacy entry"""
+        code_file = entry.get('code_file')
+        if code_file and Path(code_file).is_file():
+            Path(code_file).unlink()
+    
+    def _compact_code_store(self):
+        """Copy the code of live entries into a new blob store and point them at it"""
+        live_entries = [e for e in self._by_id.values() if 'code_offset' in e]
+        blobs = [self._read_code(entry) for entry in live_entries]
+        
+        # A fresh name leaves the current store intact for the log on disk
+        new_store = self.code_store_file.with_name(f"codes-{uuid.uuid4().hex[:8]}.bin")
+        new_store.write_bytes(b''.join(blobs))
+        
+        offset = 0
+        for entry, blob in zip(live_entries, blobs):
+            entry['code_offset'] = offset
+            entry['code_store'] = new_store.name
+            offset += len(blob)
+        
+        self._close_code_store()
+        self.code_store_file = new_store
+    
+    def _remove_stale_code_stores(self):
+        """Delete blob stores no longer referenced by the saved log"""
+        for store in self.code_store_file.parent.glob("codes*.bin"):
+            if store != self.code_store_file:
+                store.unlink(missing_ok=True)
@@ -0,0 +1,188 @@
+"""
+Exact-match cache for LLM responses
+"""
+
+import hashlib
+import json
+import math
+import operator
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Dict, Any, Tuple, Callable, Sequence, List
+
+from logger import setup_logger
+
+logger = setup_logger(__name__)
+
+def response_cache_key(settings: Dict[str, Any], system_prompt: Optional[str], prompt: str) -> str:
+    """Content hash identifying a query under the given LLM settings"""
+    payload = json.dumps([settings, system_prompt, prompt], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class LLMCache:
+    """In-memory LRU + TTL response cache with an optional SQLite file behind it"""
+    
+    def __init__(self, max_entries: int = 2048, ttl_seconds: float = 3600,
+                 db_path: Optional[Path] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.stats = {'hits': 0, 'misses': 0}
+        
+        self._memory: OrderedDict[str, Tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+        
+        # The file lets separate CLI runs share responses
+        self._conn = None
+        if db_path is not None:
+            try:
+                import sqlite3
+                
+                db_path.parent.mkdir(parents=True, exist_ok=True)
+                # Queries may come from worker threads; access is serialized by the lock
+                self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS llm_cache "
+                    "(key TEXT PRIMARY KEY, response TEXT NOT NULL, ts REAL NOT NULL)"
+                )
+                self._conn.commit()
+            except Exception as e:
+                logger.warning(f"LLM response cache file unavailable: {e}")
+                self._conn = None
+    
+    def __len__(self) -> int:
+        """Number of responses held in memory"""
+        with self._lock:
+            return len(self._memory)
+    
+    def get(self, key: str) -> Optional[str]:
+        """Return a cached response, or None if missing or expired"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None and self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT ts, response FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    entry = self._remember(key, row[0], row[1])
+            
+            if entry is not None:
+                if time.time() - entry[0] <= self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self.stats['hits'] += 1
+                    return entry[1]
+                self._forget(key)
+            
+            self.stats['misses'] += 1
+            return None
+    
+    def set(self, key: str, response: str):
+        """Store a response"""
+        with self._lock:
+            ts = time.time()
+            self._remember(key, ts, response)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, response, ts) VALUES (?, ?, ?)",
+                    (key, response, ts)
+                )
+                # Drop expired rows and keep the file to the same size as memory
+                self._conn.execute(
+                    "DELETE FROM llm_cache WHERE ts < ? OR key IN "
+                    "(SELECT key FROM llm_cache ORDER BY ts DESC LIMIT -1 OFFSET ?)",
+                    (ts - self.ttl_seconds, self.max_entries)
+                )
+                self._conn.commit()
+    
+    def close(self):
+        """Close the cache file"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+    
+    def _remember(self, key: str, ts: float, response: str) -> Tuple[float, str]:
+        """Put an entry in memory, evicting the least recently used beyond max_entries"""
+        entry = self._memory[key] = (ts, response)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+        return entry
+    
+    def _forget(self, key: str):
+        """Drop an expired entry everywhere"""
+        self._memory.pop(key, None)
+        if self._conn is not None:
+            self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            self._conn.commit()
+
+def load_sentence_encoder(model_name: str) -> Optional[Callable[[str], Sequence[float]]]:
+    """Local sentence-transformers encoder, or None if the package is unavailable"""
+    try:
+        from sentence_transformers import SentenceTransformer
+        
+        model = SentenceTransformer(model_name, device='cpu')
+    except Exception as e:
+        logger.warning(f"Semantic LLM cache disabled: {e}")
+        return None
+    
+    return lambda text: model.encode(text).tolist()
+
+class SemanticLLMCache:
+    """Nearest-neighbour response cache over prompt embeddings
+    
+    Entries are grouped by namespace (settings and system prompt) so that only
+    prompts sent under the same configuration can answer each other.
+    """
+    
+    def __init__(self, encode: Callable[[str], Sequence[float]], threshold: float = 0.92,
+                 max_entries: int = 512):
+        self.encode = encode
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.stats = {'hits': 0, 'misses': 0}
+        
+        self._entries: OrderedDict[int, Tuple[str, List[float], str]] = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        """Number of stored responses"""
+        with self._lock:
+            return len(self._entries)
+    
+    def embed(self, prompt: str) -> List[float]:
+        """Unit-length embedding of a prompt, so a dot product is the cosine similarity"""
+        vector = [float(x) for x in self.encode(prompt)]
+        norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+        return [x / norm for x in vector]
+    
+    def get(self, namespace: str, embedding: List[float]) -> Optional[str]:
+        """Return the response of the most similar prompt above the threshold"""
+        best_id, best_score = None, self.threshold
+        with self._lock:
+            # A linear scan; at a few hundred entries it costs far less than
+            # computing the embedding, and needs no index dependency
+            for entry_id, (entry_namespace, vector, _) in self._entries.items():
+                if entry_namespace != namespace:
+                    continue
+                score = sum(map(operator.mul, vector, embedding))
+                if score >= best_score:
+                    best_id, best_score = entry_id, score
+            
+            if best_id is None:
+                self.stats['misses'] += 1
+                return None
+            
+            self._entries.move_to_end(best_id)
+            self.stats['hits'] += 1
+            return self._entries[best_id][2]
+    
+    def set(self, namespace: str, embedding: List[float], response: str):
+        """Store a response, evicting the least recently used beyond max_entries"""
+        with self._lock:
+            self._entries[self._next_id] = (namespace, embedding, response)
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
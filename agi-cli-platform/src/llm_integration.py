@@ -2,19 +2,86 @@
 LLM integration for code generation and queries
 """
 
+import asyncio
 import subprocess
 import json
 import os
-from typing import Optional, Dict, Any
+import threading
+import time
+from typing import Optional, Dict, Any, List, Tuple, Iterator, Callable
 from pathlib import Path
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from logger import setup_logger
+from llm_cache import LLMCache, SemanticLLMCache, load_sentence_encoder, response_cache_key
 
 logger = setup_logger(__name__)
 
-import json
-import requests
-from typing import Optional, Dict, Any
+# Hosts of the hosted providers and the environment variables holding their keys
+_PROVIDER_HOSTS = {
+    'gemini': ('https://generativelanguage.googleapis.com', ('GEMINI_API_KEY', 'GOOGLE_API_KEY')),
+    'openai': ('https://api.openai.com', ('OPENAI_API_KEY',)),
+    'anthropic': ('https://api.anthropic.com', ('ANTHROPIC_API_KEY',)),
+}
+
+# Fixed prompts for the code helpers; user templates are filled with str.format
+_GENERATE_SYSTEM_PROMPT = """You are a Python code generator for a self-evolving CLI tool.
+Generate clean, safe, and functional Python code based on the user's description.
+The code should be compatible with the Click framework and follow these guidelines:
+
+1. Use only safe imports and avoid dangerous operations
+2. Include proper error handling
+3. Add docstrings and comments
+4. Return complete, executable code
+5. Use Click decorators for CLI commands when appropriate
+6. Follow PEP 8 style guidelines
+
+CRITICAL: Return ONLY the raw Python code without any markdown formatting, code blocks, or explanations. 
+Do not include ```python or ``` markers. Start directly with the Python code."""
+
+_GENERATE_USER_TEMPLATE = """Generate Python code for a CLI command with this functionality:
+{description}
+
+The code should be a complete function or class that can be dynamically loaded into a Click-based CLI application."""
+
+_VALIDATE_SYSTEM_PROMPT = """You are a code validator for a self-evolving CLI tool.
+Analyze the provided Python code and respond with only 'SAFE' or 'UNSAFE'.
+
+Check for:
+1. Dangerous imports or operations (eval, exec, os.system, etc.)
+2. File system operations outside allowed directories
+3. Network operations without proper validation
+4. Infinite loops or resource exhaustion
+5. Code injection vulnerabilities
+
+Respond with only 'SAFE' if the code is acceptable, or 'UNSAFE' if it poses any security risks."""
+
+_VALIDATE_USER_TEMPLATE = """Validate this Python code:
+
+```python
+{code}
+```"""
+
+_IMPROVE_SYSTEM_PROMPT = """You are a Python code improver for a self-evolving CLI tool.
+Given code that has an error, fix the issues and return improved code.
+Focus on fixing the specific error while maintaining the original functionality.
+
+Return ONLY the improved Python code without any explanations or markdown formatting."""
+
+_IMPROVE_USER_TEMPLATE = """Fix this Python code that has an error:
+
+Error: {error_message}
+
+Original code:
+```python
+{code}
+```
+
+Please provide the corrected code."""
 
 class LLMIntegration:
     """Handles integration with LLM providers via direct API and fallback to 'llm' command"""
@@ -29,9 +96,165 @@ class LLMIntegration:
             'local': self._query_local
         }
         self.use_direct_api = self.llm_config.get('use_direct_api', True)
+        self.session = self._create_session()
+        # Connect separately from read: a dead host fails fast while a slow
+        # generation still gets the full timeout
+        self.http_timeout = (self.llm_config.get('connect_timeout', 10), self.llm_config.get('timeout', 30))
+        
+        # Response cache keyed by a hash of the config and prompts. Sampling at a
+        # non-zero temperature is not repeatable, so by default only cache at 0
+        self._cache_enabled = self.llm_config.get(
+            'cache_enabled', self.llm_config.get('temperature', 0.7) == 0)
+        self._cache = self._create_cache() if self._cache_enabled else None
+        
+        # Opt-in: answers reworded prompts from similar earlier ones, so it is
+        # off unless semantic_cache is set
+        self._semantic_cache = None
+        if self.llm_config.get('semantic_cache', False):
+            self._semantic_cache = self._create_semantic_cache()
+        
+        # Model from the 'llm' package, resolved on first fallback query
+        # (False once the package is known to be missing)
+        self._llm_model = None
+        
+        # Environment for the 'llm' command; None inherits ours unchanged, which
+        # is the usual case unless the key is only set as LLM_API_KEY
+        api_key = os.getenv('OPENAI_API_KEY') or os.getenv('LLM_API_KEY')
+        if api_key and os.environ.get('OPENAI_API_KEY') != api_key:
+            self._command_env = {**os.environ, 'OPENAI_API_KEY': api_key}
+        else:
+            self._command_env = None
+        
+        if self.use_direct_api and self.llm_config.get('prewarm_connections', False):
+            self.warmup()
+    
+    def _create_session(self) -> requests.Session:
+        """HTTP session that keeps provider connections alive between queries"""
+        session = requests.Session()
+        
+        # Transient provider errors are retried with backoff; LLM calls are
+        # POSTs, which urllib3 does not retry unless told to
+        retry = Retry(
+            total=2,
+            backoff_factor=0.3,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=frozenset({'POST'}),
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(
+            pool_connections=self.llm_config.get('http_pool_connections', 4),
+            pool_maxsize=self.llm_config.get('http_max_connections', 32),
+            max_retries=retry
+        )
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+    
+    def _provider_hosts(self) -> List[str]:
+        """Base URLs of the configured providers that can actually be queried"""
+        hosts = []
+        for provider_name in self.llm_config.get('providers', ['gemini']):
+            if provider_name == 'local':
+                endpoint = urlsplit(self.llm_config.get('local_endpoint', 'http://0.0.0.0:11434/api/generate'))
+                hosts.append(f"{endpoint.scheme}://{endpoint.netloc}")
+            elif provider_name in _PROVIDER_HOSTS:
+                host, key_vars = _PROVIDER_HOSTS[provider_name]
+                if any(os.getenv(var) for var in key_vars):
+                    hosts.append(host)
+        return hosts
+    
+    def warmup(self):
+        """Open pooled connections to the provider hosts in the background"""
+        for host in self._provider_hosts():
+            threading.Thread(target=self._warm_host, args=(host,), daemon=True).start()
+    
+    def _warm_host(self, host: str):
+        """Send a HEAD request so DNS, TCP and TLS are done before the first query"""
+        try:
+            self.session.head(host, timeout=5)
+        except Exception as e:
+            logger.debug(f"Connection warmup failed for {host}: {e}")
+    
+    def _create_cache(self) -> LLMCache:
+        """Response cache, persisted under the user cache directory unless disabled"""
+        db_path = None
+        if self.llm_config.get('cache_persistent', True):
+            cache_root = Path(os.environ.get('XDG_CACHE_HOME') or Path.home() / ".cache")
+            db_path = cache_root / "evolve_cli" / "llm_cache.sqlite3"
+        
+        return LLMCache(
+            max_entries=self.llm_config.get('cache_max_entries', 2048),
+            ttl_seconds=self.llm_config.get('cache_ttl_seconds', 3600),
+            db_path=db_path
+        )
+    
+    def _create_semantic_cache(self) -> Optional[SemanticLLMCache]:
+        """Embedding cache on a local model, or None if the model cannot be loaded"""
+        encode = load_sentence_encoder(self.llm_config.get('semantic_model', 'all-MiniLM-L6-v2'))
+        if encode is None:
+            return None
+        
+        return SemanticLLMCache(
+            encode,
+            threshold=self.llm_config.get('semantic_threshold', 0.92),
+            max_entries=self.llm_config.get('semantic_max_entries', 512)
+        )
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Response cache hit/miss counters and current size"""
+        if self._cache is None:
+            stats = {'hits': 0, 'misses': 0, 'size': 0, 'enabled': False}
+        else:
+            stats = {**self._cache.stats, 'size': len(self._cache), 'enabled': True}
+        
+        if self._semantic_cache is not None:
+            stats['semantic'] = {**self._semantic_cache.stats, 'size': len(self._semantic_cache)}
+        return stats
+    
+    def _cache_lookup(self, prompt: str, system_prompt: Optional[str]) -> Tuple[Optional[str], Callable[[str], None]]:
+        """Cached response from the exact or semantic cache, and a function storing a fresh one in both"""
+        key = namespace = embedding = None
+        
+        if self._cache is not None:
+            key = response_cache_key(self.llm_config, system_prompt, prompt)
+            cached = self._cache.get(key)
+            if cached is not None:
+                return cached, None
+        
+        if self._semantic_cache is not None:
+            namespace = response_cache_key(self.llm_config, system_prompt, '')
+            embedding = self._semantic_cache.embed(prompt)
+            cached = self._semantic_cache.get(namespace, embedding)
+            if cached is not None:
+                return cached, None
+        
+        def remember(response: str):
+            if key is not None:
+                self._cache.set(key, response)
+            if embedding is not None:
+                self._semantic_cache.set(namespace, embedding, response)
+        
+        return None, remember
     
     def query(self, prompt: str, system_prompt: Optional[str] = None) -> Optional[str]:
         """Send a query to the LLM and return the response"""
+        if self._cache is None and self._semantic_cache is None:
+            return self._query_providers(prompt, system_prompt)
+        
+        cached, remember = self._cache_lookup(prompt, system_prompt)
+        if cached is not None:
+            return cached
+        
+        response = self._query_providers(prompt, system_prompt)
+        
+        # Failures are not cached so the next call retries
+        if response:
+            remember(response)
+        
+        return response
+    
+    def _query_providers(self, prompt: str, system_prompt: Optional[str] = None) -> Optional[str]:
+        """Query the configured providers in priority order"""
         try:
             # Try direct API first if enabled
             if self.use_direct_api:
@@ -55,27 +278,21 @@ class LLMIntegration:
             logger.error(f"All LLM query methods failed: {e}")
             return None
     
-    def _query_gemini(self, prompt: str, system_prompt: Optional[str] = None) -> Optional[str]:
-        """Query Google Gemini API directly"""
+    def _gemini_url(self, method: str) -> str:
+        """Endpoint for a Gemini model method, with the API key"""
         api_key = os.getenv('GEMINI_API_KEY') or os.getenv('GOOGLE_API_KEY')
         if not api_key:
             raise ValueError("GEMINI_API_KEY or GOOGLE_API_KEY not found")
         
-        headers = {
-            'Content-Type': 'application/json'
-        }
-        
-        # Build the content parts
-        parts = []
-        if system_prompt:
-            parts.append({"text": f"System: {system_prompt}\n\nUser: {prompt}"})
-        else:
-            parts.append({"text": prompt})
-        
+        model = self.llm_config.get('gemini_model', 'gemini-2.0-flash')
+        return f'https://generativelanguage.googleapis.com/v1beta/models/{model}:{method}?key={api_key}'
+    
+    def _gemini_request(self, prompt: str, system_prompt: Optional[str] = None) -> Dict[str, Any]:
+        """generateContent request body"""
         data = {
             "contents": [
                 {
-                    "parts": parts
+                    "parts": [{"text": prompt}]
                 }
             ],
             "generationConfig": {
@@ -84,14 +301,19 @@ class LLMIntegration:
             }
         }
         
-        model = self.llm_config.get('gemini_model', 'gemini-2.0-flash')
-        url = f'https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent?key={api_key}'
+        # A separate system instruction keeps the fixed prefix identical
+        # across calls, which Gemini's implicit prompt caching relies on
+        if system_prompt:
+            data["systemInstruction"] = {"parts": [{"text": system_prompt}]}
         
-        response = requests.post(
-            url,
-            headers=headers,
-            json=data,
-            timeout=self.llm_config.get('timeout', 30)
+        return data
+    
+    def _query_gemini(self, prompt: str, system_prompt: Optional[str] = None) -> Optional[str]:
+        """Query Google Gemini API directly"""
+        response = self.session.post(
+            self._gemini_url('generateContent'),
+            json=self._gemini_request(prompt, system_prompt),
+            timeout=self.http_timeout
         )
         
         if response.status_code == 200:
@@ -104,34 +326,35 @@ class LLMIntegration:
         else:
             raise Exception(f"Gemini API error: {response.status_code} - {response.text}")
 
-    def _query_openai(self, prompt: str, system_prompt: Optional[str] = None) -> Optional[str]:
-        """Query OpenAI API directly"""
+    def _openai_headers(self) -> Dict[str, str]:
+        """Authorization headers for the OpenAI API"""
         api_key = os.getenv('OPENAI_API_KEY')
         if not api_key:
             raise ValueError("OPENAI_API_KEY not found")
         
-        headers = {
-            'Authorization': f'Bearer {api_key}',
-            'Content-Type': 'application/json'
-        }
-        
+        return {'Authorization': f'Bearer {api_key}'}
+    
+    def _openai_request(self, prompt: str, system_prompt: Optional[str] = None) -> Dict[str, Any]:
+        """Chat completion request body"""
         messages = []
         if system_prompt:
             messages.append({"role": "system", "content": system_prompt})
         messages.append({"role": "user", "content": prompt})
         
-        data = {
+        return {
             "model": self.llm_config.get('openai_model', 'gpt-3.5-turbo'),
             "messages": messages,
             "temperature": self.llm_config.get('temperature', 0.7),
             "max_tokens": self.llm_config.get('max_tokens', 2000)
         }
-        
-        response = requests.post(
+    
+    def _query_openai(self, prompt: str, system_prompt: Optional[str] = None) -> Optional[str]:
+        """Query OpenAI API directly"""
+        response = self.session.post(
             'https://api.openai.com/v1/chat/completions',
-            headers=headers,
-            json=data,
-            timeout=self.llm_config.get('timeout', 30)
+            headers=self._openai_headers(),
+            json=self._openai_request(prompt, system_prompt),
+            timeout=self.http_timeout
         )
         
         if response.status_code == 200:
@@ -140,33 +363,43 @@ class LLMIntegration:
         else:
             raise Exception(f"OpenAI API error: {response.status_code} - {response.text}")
     
-    def _query_anthropic(self, prompt: str, system_prompt: Optional[str] = None) -> Optional[str]:
-        """Query Anthropic API directly"""
+    def _anthropic_headers(self) -> Dict[str, str]:
+        """Authentication and version headers for the Anthropic API"""
         api_key = os.getenv('ANTHROPIC_API_KEY')
         if not api_key:
             raise ValueError("ANTHROPIC_API_KEY not found")
         
-        headers = {
+        return {
             'x-api-key': api_key,
-            'Content-Type': 'application/json',
             'anthropic-version': '2023-06-01'
         }
-        
-        content = prompt
-        if system_prompt:
-            content = f"{system_prompt}\n\n{prompt}"
-        
+    
+    def _anthropic_request(self, prompt: str, system_prompt: Optional[str] = None) -> Dict[str, Any]:
+        """Messages request body"""
         data = {
             "model": self.llm_config.get('anthropic_model', 'claude-3-sonnet-20240229'),
-            "messages": [{"role": "user", "content": content}],
+            "messages": [{"role": "user", "content": prompt}],
             "max_tokens": self.llm_config.get('max_tokens', 2000)
         }
         
-        response = requests.post(
+        # Send the system prompt as a separate, cacheable prefix so repeated
+        # validations with the same instructions can reuse the provider's cache
+        if system_prompt:
+            data["system"] = [{
+                "type": "text",
+                "text": system_prompt,
+                "cache_control": {"type": "ephemeral"}
+            }]
+        
+        return data
+    
+    def _query_anthropic(self, prompt: str, system_prompt: Optional[str] = None) -> Optional[str]:
+        """Query Anthropic API directly"""
+        response = self.session.post(
             'https://api.anthropic.com/v1/messages',
-            headers=headers,
-            json=data,
-            timeout=self.llm_config.get('timeout', 30)
+            headers=self._anthropic_headers(),
+            json=self._anthropic_request(prompt, system_prompt),
+            timeout=self.http_timeout
         )
         
         if response.status_code == 200:
@@ -175,20 +408,21 @@ class LLMIntegration:
         else:
             raise Exception(f"Anthropic API error: {response.status_code} - {response.text}")
     
-    def _query_local(self, prompt: str, system_prompt: Optional[str] = None) -> Optional[str]:
-        """Query local LLM endpoint"""
-        endpoint = self.llm_config.get('local_endpoint', 'http://0.0.0.0:11434/api/generate')
-        
-        data = {
+    def _local_request(self, prompt: str, system_prompt: Optional[str] = None,
+                       stream: bool = False) -> Dict[str, Any]:
+        """Ollama-style generate request body"""
+        return {
             "model": self.llm_config.get('local_model', 'llama2'),
             "prompt": f"{system_prompt}\n\n{prompt}" if system_prompt else prompt,
-            "stream": False
+            "stream": stream
         }
-        
-        response = requests.post(
-            endpoint,
-            json=data,
-            timeout=self.llm_config.get('timeout', 30)
+    
+    def _query_local(self, prompt: str, system_prompt: Optional[str] = None) -> Optional[str]:
+        """Query local LLM endpoint"""
+        response = self.session.post(
+            self.llm_config.get('local_endpoint', 'http://0.0.0.0:11434/api/generate'),
+            json=self._local_request(prompt, system_prompt),
+            timeout=self.http_timeout
         )
         
         if response.status_code == 200:
@@ -197,8 +431,126 @@ class LLMIntegration:
         else:
             raise Exception(f"Local LLM error: {response.status_code} - {response.text}")
     
+    def query_stream(self, prompt: str, system_prompt: Optional[str] = None) -> Iterator[str]:
+        """Yield the response in chunks as the provider produces them"""
+        stream_providers = {
+            'gemini': self._stream_gemini,
+            'openai': self._stream_openai,
+            'anthropic': self._stream_anthropic,
+            'local': self._stream_local
+        }
+        
+        cached, remember = self._cache_lookup(prompt, system_prompt)
+        if cached is not None:
+            yield cached
+            return
+        
+        provider_name = next((name for name in self.llm_config.get('providers', ['gemini'])
+                              if name in stream_providers), None)
+        if not self.use_direct_api or provider_name is None:
+            logger.error("No LLM providers available for streaming")
+            return
+        
+        chunks = []
+        try:
+            for chunk in stream_providers[provider_name](prompt, system_prompt):
+                if chunk:
+                    chunks.append(chunk)
+                    yield chunk
+        except Exception as e:
+            # Chunks already yielded stay with the caller; only the rest is lost
+            logger.error(f"Streaming failed for {provider_name}: {e}")
+            return
+        
+        if chunks:
+            remember(''.join(chunks).strip())
+    
+    def _stream_events(self, url: str, data: Dict[str, Any],
+                       headers: Optional[Dict[str, str]] = None) -> Iterator[Dict[str, Any]]:
+        """POST a streaming request and yield each JSON event, from SSE or NDJSON"""
+        with self.session.post(url, headers=headers, json=data, timeout=self.http_timeout,
+                               stream=True) as response:
+            if response.status_code != 200:
+                raise Exception(f"Streaming API error: {response.status_code} - {response.text}")
+            
+            # NDJSON responses carry no charset, so decode lines ourselves
+            for raw_line in response.iter_lines():
+                line = raw_line.decode('utf-8')
+                if line.startswith('data:'):
+                    line = line[5:].strip()
+                elif line.startswith(('event:', ':')):
+                    continue
+                if not line or line == '[DONE]':
+                    continue
+                yield json.loads(line)
+    
+    def _stream_gemini(self, prompt: str, system_prompt: Optional[str] = None) -> Iterator[str]:
+        """Stream text chunks from Gemini"""
+        events = self._stream_events(
+            self._gemini_url('streamGenerateContent') + '&alt=sse',
+            self._gemini_request(prompt, system_prompt)
+        )
+        for event in events:
+            for candidate in event.get('candidates', [])[:1]:
+                for part in candidate.get('content', {}).get('parts', []):
+                    yield part.get('text', '')
+    
+    def _stream_openai(self, prompt: str, system_prompt: Optional[str] = None) -> Iterator[str]:
+        """Stream text chunks from OpenAI"""
+        events = self._stream_events(
+            'https://api.openai.com/v1/chat/completions',
+            {**self._openai_request(prompt, system_prompt), "stream": True},
+            self._openai_headers()
+        )
+        for event in events:
+            for choice in event.get('choices', [])[:1]:
+                yield choice.get('delta', {}).get('content') or ''
+    
+    def _stream_anthropic(self, prompt: str, system_prompt: Optional[str] = None) -> Iterator[str]:
+        """Stream text chunks from Anthropic"""
+        events = self._stream_events(
+            'https://api.anthropic.com/v1/messages',
+            {**self._anthropic_request(prompt, system_prompt), "stream": True},
+            self._anthropic_headers()
+        )
+        for event in events:
+            if event.get('type') == 'content_block_delta':
+                yield event['delta'].get('text', '')
+            elif event.get('type') == 'error':
+                raise Exception(f"Anthropic stream error: {event.get('error')}")
+    
+    def _stream_local(self, prompt: str, system_prompt: Optional[str] = None) -> Iterator[str]:
+        """Stream text chunks from the local endpoint"""
+        events = self._stream_events(
+            self.llm_config.get('local_endpoint', 'http://0.0.0.0:11434/api/generate'),
+            self._local_request(prompt, system_prompt, stream=True)
+        )
+        for event in events:
+            yield event.get('response', '')
+    
+    def _get_llm_model(self):
+        """In-process model from the 'llm' package, or None if it is not installed"""
+        if self._llm_model is None:
+            try:
+                import llm
+            except ImportError:
+                self._llm_model = False
+            else:
+                self._llm_model = llm.get_model(self.llm_config.get('model') or llm.get_default_model())
+        return self._llm_model or None
+    
     def _query_external_command(self, prompt: str, system_prompt: Optional[str] = None) -> Optional[str]:
-        """Fallback to external llm command"""
+        """Fallback to the llm package, in process when importable, else via its command"""
+        try:
+            model = self._get_llm_model()
+            if model is not None:
+                response = model.prompt(prompt, system=system_prompt).text().strip()
+                logger.debug(f"LLM response length: {len(response)} characters")
+                return response
+        except Exception as e:
+            logger.error(f"LLM query failed: {e}")
+            return None
+        
         try:
             # Build the llm command
             cmd = ['llm']
@@ -215,14 +567,6 @@ class LLMIntegration:
             # Add the main prompt
             cmd.append(prompt)
             
-            # Set environment variables for API keys
-            env = os.environ.copy()
-            
-            # Try to get API key from environment
-            api_key = os.getenv('OPENAI_API_KEY') or os.getenv('LLM_API_KEY')
-            if api_key:
-                env['OPENAI_API_KEY'] = api_key
-            
             logger.debug(f"Executing LLM command: {' '.join(cmd[:3])}...")
             
             # Execute the command
@@ -231,7 +575,7 @@ class LLMIntegration:
                 capture_output=True,
                 text=True,
                 timeout=self.llm_config.get('timeout', 30),
-                env=env
+                env=self._command_env
             )
             
             if result.returncode == 0:
@@ -252,29 +596,20 @@ class LLMIntegration:
             logger.error(f"LLM query failed: {e}")
             return None
     
-    def generate_code(self, description: str) -> Optional[str]:
-        """Generate Python code based on description"""
+    def generate_code(self, description: str,
+                      on_chunk: Optional[Callable[[str], None]] = None) -> Optional[str]:
+        """Generate Python code based on description, streaming raw chunks to on_chunk if given"""
+        system_prompt = _GENERATE_SYSTEM_PROMPT
+        user_prompt = _GENERATE_USER_TEMPLATE.format(description=description)
         
-        system_prompt = """You are a Python code generator for a self-evolving CLI tool.
-Generate clean, safe, and functional Python code based on the user's description.
-The code should be compatible with the Click framework and follow these guidelines:
-
-1. Use only safe imports and avoid dangerous operations
-2. Include proper error handling
-3. Add docstrings and comments
-4. Return complete, executable code
-5. Use Click decorators for CLI commands when appropriate
-6. Follow PEP 8 style guidelines
-
-CRITICAL: Return ONLY the raw Python code without any markdown formatting, code blocks, or explanations. 
-Do not include ```python or ``` markers. Start directly with the Python code."""
-
-        user_prompt = f"""Generate Python code for a CLI command with this functionality:
-{description}
-
-The code should be a complete function or class that can be dynamically loaded into a Click-based CLI application."""
-
-        response = self.query(user_prompt, system_prompt)
+        if on_chunk is None:
+            response = self.query(user_prompt, system_prompt)
+        else:
+            chunks = []
+            for chunk in self.query_stream(user_prompt, system_prompt):
+                on_chunk(chunk)
+                chunks.append(chunk)
+            response = ''.join(chunks) or None
         
         if response:
             # Clean up any markdown formatting that might be included
@@ -303,26 +638,7 @@ The code should be a complete function or class that can be dynamically loaded i
     
     def validate_code_with_llm(self, code: str) -> bool:
         """Use LLM to validate generated code for safety and correctness"""
-        
-        system_prompt = """You are a code validator for a self-evolving CLI tool.
-Analyze the provided Python code and respond with only 'SAFE' or 'UNSAFE'.
-
-Check for:
-1. Dangerous imports or operations (eval, exec, os.system, etc.)
-2. File system operations outside allowed directories
-3. Network operations without proper validation
-4. Infinite loops or resource exhaustion
-5. Code injection vulnerabilities
-
-Respond with only 'SAFE' if the code is acceptable, or 'UNSAFE' if it poses any security risks."""
-
-        user_prompt = f"""Validate this Python code:
-
-```python
-{code}
-```"""
-
-        response = self.query(user_prompt, system_prompt)
+        response = self.query(_VALIDATE_USER_TEMPLATE.format(code=code), _VALIDATE_SYSTEM_PROMPT)
         
         if response:
             response_upper = response.upper().strip()
@@ -337,22 +653,171 @@ Respond with only 'SAFE' if the code is acceptable, or 'UNSAFE' if it poses any
     
     def improve_code(self, code: str, error_message: str) -> Optional[str]:
         """Improve code based on error feedback"""
+        return self.query(_IMPROVE_USER_TEMPLATE.format(code=code, error_message=error_message),
+                          _IMPROVE_SYSTEM_PROMPT)
+    
+    def batch_query(self, items: List[Tuple[str, Optional[str]]],
+                    mode: str = 'async') -> List[Optional[str]]:
+        """Answer many (prompt, system_prompt) pairs, in order
         
-        system_prompt = """You are a Python code improver for a self-evolving CLI tool.
-Given code that has an error, fix the issues and return improved code.
-Focus on fixing the specific error while maintaining the original functionality.
-
-Return ONLY the improved Python code without any explanations or markdown formatting."""
-
-        user_prompt = f"""Fix this Python code that has an error:
-
-Error: {error_message}
-
-Original code:
-```python
-{code}
-```
-
-Please provide the corrected code."""
-
-        return self.query(user_prompt, system_prompt)
+        'async' sends concurrent interactive queries; 'batch_api' submits one
+        job to the provider's batch endpoint, which is cheaper but may take
+        hours to complete.
+        """
+        if not items:
+            return []
+        if mode == 'batch_api':
+            return self._batch_api_query(items)
+        if mode != 'async':
+            raise ValueError(f"Unknown batch mode: {mode}")
+        
+        return asyncio.run(self.abatch_query(items))
+    
+    def _batch_api_query(self, items: List[Tuple[str, Optional[str]]]) -> List[Optional[str]]:
+        """Run the items as one job on the first configured provider with a batch API"""
+        batch_providers = {'openai': self._openai_batch, 'anthropic': self._anthropic_batch}
+        provider_name = next((name for name in self.llm_config.get('providers', ['gemini'])
+                              if name in batch_providers), None)
+        if provider_name is None:
+            logger.error("No configured provider supports batch requests")
+            return [None] * len(items)
+        
+        try:
+            results = batch_providers[provider_name](items)
+        except Exception as e:
+            logger.error(f"Batch request failed for {provider_name}: {e}")
+            return [None] * len(items)
+        
+        return [results.get(str(index)) for index in range(len(items))]
+    
+    def _poll_batch(self, url: str, headers: Dict[str, str], is_done) -> Dict[str, Any]:
+        """Poll a batch job with exponential backoff until is_done(job) holds"""
+        interval = self.llm_config.get('batch_poll_interval', 5)
+        deadline = time.monotonic() + self.llm_config.get('batch_timeout', 86400)
+        
+        while True:
+            response = self.session.get(url, headers=headers, timeout=self.http_timeout)
+            response.raise_for_status()
+            job = response.json()
+            if is_done(job):
+                return job
+            if time.monotonic() + interval > deadline:
+                raise TimeoutError(f"Batch job {job.get('id')} still running")
+            
+            time.sleep(interval)
+            interval = min(interval * 2, 300)
+    
+    def _openai_batch(self, items: List[Tuple[str, Optional[str]]]) -> Dict[str, str]:
+        """Submit items to the OpenAI Batch API and collect responses by custom_id"""
+        headers = self._openai_headers()
+        lines = [
+            json.dumps({
+                "custom_id": str(index),
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": self._openai_request(prompt, system_prompt)
+            })
+            for index, (prompt, system_prompt) in enumerate(items)
+        ]
+        
+        upload = self.session.post(
+            'https://api.openai.com/v1/files',
+            headers=headers,
+            data={'purpose': 'batch'},
+            files={'file': ('batch.jsonl', '\n'.join(lines).encode('utf-8'))},
+            timeout=self.http_timeout
+        )
+        upload.raise_for_status()
+        
+        created = self.session.post(
+            'https://api.openai.com/v1/batches',
+            headers=headers,
+            json={
+                "input_file_id": upload.json()['id'],
+                "endpoint": "/v1/chat/completions",
+                "completion_window": "24h"
+            },
+            timeout=self.http_timeout
+        )
+        created.raise_for_status()
+        
+        job = self._poll_batch(
+            f"https://api.openai.com/v1/batches/{created.json()['id']}", headers,
+            lambda job: job['status'] in ('completed', 'failed', 'expired', 'cancelled')
+        )
+        if not job.get('output_file_id'):
+            raise Exception(f"OpenAI batch {job['id']} ended as {job['status']}")
+        
+        output = self.session.get(
+            f"https://api.openai.com/v1/files/{job['output_file_id']}/content",
+            headers=headers,
+            timeout=self.http_timeout
+        )
+        output.raise_for_status()
+        
+        results = {}
+        for line in output.text.splitlines():
+            record = json.loads(line)
+            response = record.get('response') or {}
+            if response.get('status_code') == 200:
+                results[record['custom_id']] = response['body']['choices'][0]['message']['content'].strip()
+        return results
+    
+    def _anthropic_batch(self, items: List[Tuple[str, Optional[str]]]) -> Dict[str, str]:
+        """Submit items to the Anthropic Message Batches API and collect responses by custom_id"""
+        headers = self._anthropic_headers()
+        created = self.session.post(
+            'https://api.anthropic.com/v1/messages/batches',
+            headers=headers,
+            json={"requests": [
+                {"custom_id": str(index), "params": self._anthropic_request(prompt, system_prompt)}
+                for index, (prompt, system_prompt) in enumerate(items)
+            ]},
+            timeout=self.http_timeout
+        )
+        created.raise_for_status()
+        
+        job = self._poll_batch(
+            f"https://api.anthropic.com/v1/messages/batches/{created.json()['id']}", headers,
+            lambda job: job['processing_status'] == 'ended'
+        )
+        
+        output = self.session.get(job['results_url'], headers=headers, timeout=self.http_timeout)
+        output.raise_for_status()
+        
+        results = {}
+        for line in output.text.splitlines():
+            record = json.loads(line)
+            if record['result']['type'] == 'succeeded':
+                results[record['custom_id']] = record['result']['message']['content'][0]['text'].strip()
+        return results
+    
+    # Async variants run the blocking HTTP call on a worker thread so many
+    # requests can be in flight at once under asyncio.gather
+    
+    async def aquery(self, prompt: str, system_prompt: Optional[str] = None) -> Optional[str]:
+        """Async variant of query"""
+        return await asyncio.to_thread(self.query, prompt, system_prompt)
+    
+    async def abatch_query(self, items: List[Tuple[str, Optional[str]]],
+                           max_concurrency: Optional[int] = None) -> List[Optional[str]]:
+        """Query many (prompt, system_prompt) pairs concurrently, in order"""
+        semaphore = asyncio.Semaphore(max_concurrency or self.llm_config.get('batch_max_concurrency', 10))
+        
+        async def query_one(prompt: str, system_prompt: Optional[str]) -> Optional[str]:
+            async with semaphore:
+                return await self.aquery(prompt, system_prompt)
+        
+        return await asyncio.gather(*(query_one(prompt, system_prompt) for prompt, system_prompt in items))
+    
+    async def agenerate_code(self, description: str) -> Optional[str]:
+        """Async variant of generate_code"""
+        return await asyncio.to_thread(self.generate_code, description)
+    
+    async def avalidate_code_with_llm(self, code: str) -> bool:
+        """Async variant of validate_code_with_llm"""
+        return await asyncio.to_thread(self.validate_code_with_llm, code)
+    
+    async def aimprove_code(self, code: str, error_message: str) -> Optional[str]:
+        """Async variant of improve_code"""
+        return await asyncio.to_thread(self.improve_code, code, error_message)
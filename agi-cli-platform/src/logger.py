@@ -2,27 +2,22 @@
 Logging configuration and utilities
 """
 
+import atexit
 import logging
+import logging.handlers
+import queue
 import sys
 from pathlib import Path
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
-def setup_logger(name: str, level: Optional[str] = None) -> logging.Logger:
-    """Setup logger with appropriate configuration"""
-    
-    # Create logger
-    logger = logging.getLogger(name)
-    
-    # Set level
-    if level:
-        logger.setLevel(getattr(logging, level.upper(), logging.INFO))
-    else:
-        logger.setLevel(logging.INFO)
-    
-    # Avoid duplicate handlers
-    if logger.handlers:
-        return logger
+# Console and file handlers shared by every project logger, built on first use
+_handlers: List[logging.Handler] = []
+
+def _init_handlers():
+    """Create the shared console and file handlers once"""
+    if _handlers:
+        return
     
     # Create formatters
     detailed_formatter = logging.Formatter(
@@ -39,18 +34,42 @@ def setup_logger(name: str, level: Optional[str] = None) -> logging.Logger:
     console_handler.setFormatter(simple_formatter)
     console_handler.setLevel(logging.INFO)
     
-    # File handler
+    # File handler; the log file is only opened on the first record
     logs_dir = Path("logs")
     logs_dir.mkdir(exist_ok=True)
     
     log_file = logs_dir / f"evolve_cli_{datetime.now().strftime('%Y%m%d')}.log"
-    file_handler = logging.FileHandler(log_file)
+    file_handler = logging.FileHandler(log_file, delay=True)
     file_handler.setFormatter(detailed_formatter)
     file_handler.setLevel(logging.DEBUG)
     
-    # Add handlers
-    logger.addHandler(console_handler)
-    logger.addHandler(file_handler)
+    # File writes happen on a listener thread; callers only enqueue records.
+    # The console stays synchronous so it interleaves correctly with click output
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, file_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    
+    # Attached to the project's own loggers only, never the root logger, so
+    # third-party warnings (e.g. urllib3 retries) stay off stdout
+    _handlers.extend([console_handler, logging.handlers.QueueHandler(log_queue)])
+
+def setup_logger(name: str, level: Optional[str] = None) -> logging.Logger:
+    """Setup logger with appropriate configuration"""
+    
+    _init_handlers()
+    
+    # Create logger
+    logger = logging.getLogger(name)
+    for handler in _handlers:
+        if handler not in logger.handlers:
+            logger.addHandler(handler)
+    
+    # Set level
+    if level:
+        logger.setLevel(getattr(logging, level.upper(), logging.INFO))
+    else:
+        logger.setLevel(logging.INFO)
     
     return logger
 
@@ -7,7 +7,8 @@ import os
 import json
 import asyncio
 import time
-from typing import Optional, Dict, Any, List, Union
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Optional, Dict, Any, List, Union, Callable
 from dataclasses import dataclass
 from abc import ABC, abstractmethod
 import requests
@@ -108,21 +109,19 @@ class GeminiProvider(BaseLLMProvider):
         try:
             headers = {'Content-Type': 'application/json'}
             
-            # Build the content parts
-            parts = []
-            if system_prompt:
-                parts.append({"text": f"System: {system_prompt}\n\nUser: {prompt}"})
-            else:
-                parts.append({"text": prompt})
-            
             data = {
-                "contents": [{"parts": parts}],
+                "contents": [{"parts": [{"text": prompt}]}],
                 "generationConfig": {
                     "temperature": self.config.temperature,
                     "maxOutputTokens": self.config.max_tokens
                 }
             }
             
+            # Fixed instructions go in their own field so the prompt prefix is
+            # stable across calls and eligible for provider-side caching
+            if system_prompt:
+                data["systemInstruction"] = {"parts": [{"text": system_prompt}]}
+            
             url = f'https://generativelanguage.googleapis.com/v1beta/models/{self.model}:generateContent?key={self.api_key}'
             
             response = requests.post(
@@ -275,16 +274,19 @@ class AnthropicProvider(BaseLLMProvider):
                 'anthropic-version': '2023-06-01'
             }
             
-            content = prompt
-            if system_prompt:
-                content = f"{system_prompt}\n\n{prompt}"
-            
             data = {
                 "model": self.model,
-                "messages": [{"role": "user", "content": content}],
+                "messages": [{"role": "user", "content": prompt}],
                 "max_tokens": self.config.max_tokens
             }
             
+            if system_prompt:
+                data["system"] = [{
+                    "type": "text",
+                    "text": system_prompt,
+                    "cache_control": {"type": "ephemeral"}
+                }]
+            
             response = requests.post(
                 'https://api.anthropic.com/v1/messages',
                 headers=headers, json=data, timeout=self.config.timeout
@@ -407,6 +409,9 @@ class MultiProviderLLM:
         self.config_manager = config_manager
         self.providers: Dict[str, BaseLLMProvider] = {}
         self.fallback_order: List[str] = []
+        # Send each query to every available provider at once and keep the
+        # first success; faster on a slow or failing provider but billed by all
+        self.race_providers = config_manager.get('llm', {}).get('race_providers', False)
         self._initialize_providers()
     
     def _initialize_providers(self):
@@ -442,8 +447,11 @@ class MultiProviderLLM:
             )
         }
         
-        # Override with user configuration
+        # Override with user configuration; a plain list only sets priority order
         provider_configs = llm_config.get('providers', {})
+        if isinstance(provider_configs, list):
+            provider_configs = {name: {'priority': index + 1}
+                                for index, name in enumerate(provider_configs)}
         for provider_name, config_data in provider_configs.items():
             if provider_name in default_configs:
                 # Update default config with user settings
@@ -487,6 +495,9 @@ class MultiProviderLLM:
                 error="No LLM providers available"
             )
         
+        if self.race_providers and len(self.fallback_order) > 1:
+            return self._query_race(prompt, system_prompt)
+        
         last_error = "Unknown error"
         
         for provider_name in self.fallback_order:
@@ -526,6 +537,43 @@ class MultiProviderLLM:
             error=f"All providers failed. Last error: {last_error}"
         )
     
+    def _query_race(self, prompt: str, system_prompt: Optional[str] = None) -> LLMResponse:
+        """Query all available providers in parallel and return the first success"""
+        executor = ThreadPoolExecutor(max_workers=len(self.fallback_order))
+        pending = {
+            executor.submit(self.providers[name].query, prompt, system_prompt): name
+            for name in self.fallback_order
+        }
+        last_error = "Unknown error"
+        
+        try:
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    provider_name = pending.pop(future)
+                    try:
+                        response = future.result()
+                    except Exception as e:
+                        last_error = str(e)
+                        logger.error(f"{provider_name} exception: {last_error}")
+                        continue
+                    
+                    if response.success:
+                        logger.info(f"Successful response from {provider_name}")
+                        return response
+                    last_error = response.error or "Unknown provider error"
+                    logger.warning(f"{provider_name} failed: {last_error}")
+        finally:
+            # Requests already in flight cannot be interrupted; their threads
+            # finish in the background and the results are dropped
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        return LLMResponse(
+            content="", provider="failed", model="none",
+            tokens_used=0, response_time=0.0, success=False,
+            error=f"All providers failed. Last error: {last_error}"
+        )
+    
     def get_provider_stats(self) -> Dict[str, Any]:
         """Get statistics for all providers"""
         return {
@@ -561,8 +609,12 @@ class MultiProviderLLM:
         response = self.query_with_fallback(prompt, system_prompt)
         return response.content if response.success else None
     
-    def generate_code(self, description: str) -> Optional[str]:
-        """Generate code with multi-provider fallback"""
+    def generate_code(self, description: str,
+                      on_chunk: Optional[Callable[[str], None]] = None) -> Optional[str]:
+        """Generate code with multi-provider fallback, passing the raw response to on_chunk if given
+        
+        Providers here answer in one piece, so on_chunk receives a single chunk.
+        """
         system_prompt = """You are a Python code generator for a self-evolving CLI tool.
 Generate clean, safe, and functional Python code based on the user's description.
 The code should be compatible with the Click framework and follow these guidelines:
@@ -578,6 +630,8 @@ Return ONLY the Python code without any explanations or markdown formatting."""
         
         response = self.query_with_fallback(description, system_prompt)
         if response.success:
+            if on_chunk is not None:
+                on_chunk(response.content)
             return self._clean_code_response(response.content)
         return None
     
@@ -600,6 +654,18 @@ Respond with only 'SAFE' if the code is acceptable, or 'UNSAFE' if it poses any
             return response.content.strip().upper() == 'SAFE'
         return False
     
+    async def aquery(self, prompt: str, system_prompt: Optional[str] = None) -> Optional[str]:
+        """Async variant of query, run on a worker thread"""
+        return await asyncio.to_thread(self.query, prompt, system_prompt)
+    
+    async def agenerate_code(self, description: str) -> Optional[str]:
+        """Async variant of generate_code, run on a worker thread"""
+        return await asyncio.to_thread(self.generate_code, description)
+    
+    async def avalidate_code_with_llm(self, code: str) -> bool:
+        """Async variant of validate_code_with_llm, run on a worker thread"""
+        return await asyncio.to_thread(self.validate_code_with_llm, code)
+    
     def _clean_code_response(self, response: str) -> str:
         """Clean and extract code from LLM response"""
         # Remove markdown code blocks
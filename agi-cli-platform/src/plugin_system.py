@@ -3,7 +3,10 @@ Plugin system for extending functionality
 """
 
 import importlib.util
+import py_compile
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Dict, Any, List, Optional
 import json
@@ -12,26 +15,88 @@ from logger import setup_logger
 
 logger = setup_logger(__name__)
 
+# Source for generated plugins; {name} and {class_name} are filled in per plugin
+_PLUGIN_TEMPLATE = '''"""
+Plugin: {name}
+Auto-generated plugin template
+"""
+
+import click
+from typing import List, Any
+
+class {class_name}Plugin:
+    """
+    {name} plugin for the self-evolving CLI tool
+    """
+    
+    def __init__(self):
+        self.name = "{name}"
+        self.version = "1.0.0"
+        self.description = "Auto-generated {name} plugin"
+        self.enabled = False
+    
+    def activate(self):
+        """Activate the plugin"""
+        self.enabled = True
+        print(f"Plugin {{self.name}} activated")
+    
+    def deactivate(self):
+        """Deactivate the plugin"""
+        self.enabled = False
+        print(f"Plugin {{self.name}} deactivated")
+    
+    def get_commands(self) -> List[Any]:
+        """Return list of Click commands provided by this plugin"""
+        return [self.{name}_command]
+    
+    @click.command(name="{name}")
+    @click.option('--message', '-m', default="Hello from {name}!", 
+                  help='Message to display')
+    def {name}_command(self, message: str):
+        """
+        Example command provided by {name} plugin
+        """
+        click.echo(f"🔌 {{message}}")
+
+# Plugin entry point
+plugin_class = {class_name}Plugin
+'''
+
 class PluginSystem:
     """Manages plugin loading, activation, and deactivation"""
     
     def __init__(self, config_manager):
         self.config_manager = config_manager
-        self.plugin_config = config_manager.get('plugins', {})
         self.loaded_plugins: Dict[str, Any] = {}
         self.active_plugins: Dict[str, Any] = {}
+        self.reload_config()
+        
+        # Guards plugin registration when files are loaded concurrently
+        self._lock = threading.Lock()
+    
+    def reload_config(self):
+        """Re-read the plugin configuration"""
+        self.plugin_config = self.config_manager.get('plugins', {})
+        self._auto_load = self.plugin_config.get('auto_load', True)
+        self._auto_activate = self.plugin_config.get('auto_activate', True)
         self.plugin_dirs = self._get_plugin_directories()
     
     def load_plugins(self):
         """Load all available plugins"""
         try:
-            if not self.plugin_config.get('auto_load', True):
+            if not self._auto_load:
                 logger.info("Plugin auto-loading is disabled")
                 return
             
+            plugin_files = []
             for plugin_dir in self.plugin_dirs:
                 if plugin_dir.exists():
-                    self._scan_plugin_directory(plugin_dir)
+                    plugin_files.extend(self._scan_plugin_directory(plugin_dir))
+            
+            # Reading and compiling plugin files is I/O bound, so overlap it
+            if plugin_files:
+                with ThreadPoolExecutor(max_workers=min(32, len(plugin_files))) as executor:
+                    list(executor.map(self._load_plugin_file, plugin_files))
             
             logger.info(f"Loaded {len(self.loaded_plugins)} plugins")
             
@@ -51,8 +116,10 @@ class PluginSystem:
             # Save plugin to disk
             plugin_file = self.plugin_dirs[0] / f"{plugin_name}.py"
             
-            with open(plugin_file, 'w') as f:
-                f.write(plugin_code)
+            plugin_file.write_bytes(plugin_code.encode('utf-8'))
+            
+            # Write the __pycache__ entry now so later startups skip compiling
+            py_compile.compile(str(plugin_file), doraise=True)
             
             # Load the plugin
             return self._load_plugin_file(plugin_file)
@@ -152,24 +219,23 @@ class PluginSystem:
         
         return dirs
     
-    def _scan_plugin_directory(self, plugin_dir: Path):
-        """Scan a directory for plugins"""
+    def _scan_plugin_directory(self, plugin_dir: Path) -> List[Path]:
+        """Scan a directory for plugin files"""
         try:
-            for plugin_file in plugin_dir.glob("*.py"):
-                if plugin_file.name.startswith("__"):
-                    continue
-                
-                self._load_plugin_file(plugin_file)
+            return [plugin_file for plugin_file in plugin_dir.glob("*.py")
+                    if not plugin_file.name.startswith("__")]
             
         except Exception as e:
             logger.error(f"Failed to scan plugin directory {plugin_dir}: {e}")
+            return []
     
     def _load_plugin_file(self, plugin_file: Path) -> bool:
         """Load a plugin from a Python file"""
         try:
             plugin_name = plugin_file.stem
             
-            # Create module spec
+            # The file-location spec uses SourceFileLoader, which reuses the
+            # __pycache__ bytecode for the file while it is up to date
             spec = importlib.util.spec_from_file_location(
                 f"plugin_{plugin_name}",
                 plugin_file
@@ -183,29 +249,32 @@ class PluginSystem:
             module = importlib.util.module_from_spec(spec)
             spec.loader.exec_module(module)
             
-            # Look for plugin class
-            plugin_class = None
+            # Plugins declare their entry point as `plugin_class`
+            plugin_class = getattr(module, 'plugin_class', None)
             
-            for attr_name in dir(module):
-                attr = getattr(module, attr_name)
-                
-                # Look for class with plugin interface
-                if (isinstance(attr, type) and 
-                    hasattr(attr, '__init__') and
-                    not attr_name.startswith('_')):
-                    plugin_class = attr
-                    break
+            if plugin_class is None:
+                for attr_name in dir(module):
+                    attr = getattr(module, attr_name)
+                    
+                    # Look for class with plugin interface
+                    if (isinstance(attr, type) and 
+                        hasattr(attr, '__init__') and
+                        not attr_name.startswith('_')):
+                        plugin_class = attr
+                        break
             
             if plugin_class:
                 # Instantiate plugin
                 plugin_instance = plugin_class()
-                self.loaded_plugins[plugin_name] = plugin_instance
                 
-                logger.info(f"Loaded plugin: {plugin_name}")
-                
-                # Auto-activate if configured
-                if self.plugin_config.get('auto_activate', True):
-                    self.activate_plugin(plugin_name)
+                with self._lock:
+                    self.loaded_plugins[plugin_name] = plugin_instance
+                    
+                    logger.info(f"Loaded plugin: {plugin_name}")
+                    
+                    # Auto-activate if configured
+                    if self._auto_activate:
+                        self.activate_plugin(plugin_name)
                 
                 return True
             else:
@@ -218,49 +287,5 @@ class PluginSystem:
     
     def _generate_plugin_template(self, plugin_name: str) -> Optional[str]:
         """Generate a basic plugin template"""
-        template = f'''"""
-Plugin: {plugin_name}
-Auto-generated plugin template
-"""
-
-import click
-from typing import List, Any
-
-class {plugin_name.title().replace('_', '')}Plugin:
-    """
-    {plugin_name} plugin for the self-evolving CLI tool
-    """
-    
-    def __init__(self):
-        self.name = "{plugin_name}"
-        self.version = "1.0.0"
-        self.description = "Auto-generated {plugin_name} plugin"
-        self.enabled = False
-    
-    def activate(self):
-        """Activate the plugin"""
-        self.enabled = True
-        print(f"Plugin {{self.name}} activated")
-    
-    def deactivate(self):
-        """Deactivate the plugin"""
-        self.enabled = False
-        print(f"Plugin {{self.name}} deactivated")
-    
-    def get_commands(self) -> List[Any]:
-        """Return list of Click commands provided by this plugin"""
-        return [self.{plugin_name}_command]
-    
-    @click.command(name="{plugin_name}")
-    @click.option('--message', '-m', default="Hello from {plugin_name}!", 
-                  help='Message to display')
-    def {plugin_name}_command(self, message: str):
-        """
-        Example command provided by {plugin_name} plugin
-        """
-        click.echo(f"🔌 {{message}}")
-
-# Plugin entry point
-plugin_class = {plugin_name.title().replace('_', '')}Plugin
-'''
-        return template
+        class_name = plugin_name.title().replace('_', '')
+        return _PLUGIN_TEMPLATE.format(name=plugin_name, class_name=class_name)
@@ -223,7 +223,7 @@ class CodeValidator:
         """Validate imports against allowed list"""
         issues = []
 
-        allowed_imports = self.config_manager.get('plugins.allowed_imports', [])
+        is_allowed = self.config_manager.is_import_allowed
 
         try:
             tree = ast.parse(code)
@@ -231,11 +231,11 @@ class CodeValidator:
             for node in ast.walk(tree):
                 if isinstance(node, ast.Import):
                     for alias in node.names:
-                        if alias.name not in allowed_imports:
+                        if not is_allowed(alias.name):
                             issues.append(f"Import not in allowed list: {alias.name}")
 
                 elif isinstance(node, ast.ImportFrom):
-                    if node.module and node.module not in allowed_imports:
+                    if node.module and not is_allowed(node.module):
                         issues.append(f"Import from not in allowed list: {node.module}")
 
         except Exception as e:
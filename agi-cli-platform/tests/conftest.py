@@ -71,8 +71,8 @@ def mock_gemini_response():
 
 @pytest.fixture
 def mock_requests_post(mock_gemini_response):
-    """Mock requests.post for API calls"""
-    with patch('requests.post') as mock_post:
+    """Mock session posts for API calls"""
+    with patch('requests.Session.post') as mock_post:
         mock_response = Mock()
         mock_response.status_code = 200
         mock_response.json.return_value = mock_gemini_response
@@ -100,11 +100,12 @@ def temp_dir():
 
 
 @pytest.fixture(autouse=True)
-def mock_env_vars():
+def mock_env_vars(tmp_path):
     """Mock environment variables for testing"""
     with patch.dict(os.environ, {
         'GEMINI_API_KEY': 'test-gemini-key',
-        'GOOGLE_API_KEY': 'test-google-key'
+        'GOOGLE_API_KEY': 'test-google-key',
+        'XDG_CACHE_HOME': str(tmp_path / "cache")
     }):
         yield
 
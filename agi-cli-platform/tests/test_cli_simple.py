@@ -4,9 +4,9 @@ Simplified CLI tests that don't require complex mocking
 
 import pytest
 from click.testing import CliRunner
-from unittest.mock import patch
+from unittest.mock import Mock, patch
 
-from cli import cli
+from cli import cli, CLIContext, _echo_lines, _format_provider
 
 
 class TestCLIBasic:
@@ -56,6 +56,13 @@ class TestCLIBasic:
         assert result.exit_code == 0
         assert "Show command generation history" in result.output
 
+    def test_export_history_help(self):
+        """Test export-history command help"""
+        result = self.runner.invoke(cli, ['export-history', '--help'])
+        
+        assert result.exit_code == 0
+        assert "Export command history as JSON" in result.output
+
     def test_rollback_help(self):
         """Test rollback command help"""
         result = self.runner.invoke(cli, ['rollback', '--help'])
@@ -89,4 +96,59 @@ class TestCLIBasic:
         result = self.runner.invoke(cli, ['invalid-command'])
         
         assert result.exit_code != 0
-        assert "No such command" in result.output 
\ No newline at end of file
+        assert "No such command" in result.output 
+
+    def test_context_builds_subsystems_lazily(self):
+        """Test that subsystems are only constructed on first access"""
+        cli_ctx = CLIContext()
+        
+        assert 'history_manager' not in vars(cli_ctx)
+        assert 'llm_integration' not in vars(cli_ctx)
+        assert cli_ctx.command_manager is cli_ctx.command_manager
+
+    def test_echo_lines_single_write(self):
+        """Test that display lines are emitted with one echo call"""
+        with patch('cli.click.echo') as echo:
+            _echo_lines(["header", "=" * 4, "body"])
+        
+        echo.assert_called_once_with("header\n====\nbody")
+
+    def test_history_prints_without_pager(self):
+        """Test that the short history listing is printed directly for long histories"""
+        entries = [{'id': f"id{i}", 'description': f"cmd {i}", 'timestamp': str(i)} for i in range(30)]
+        history_manager = Mock(**{'get_history.return_value': entries})
+        
+        with patch.object(CLIContext, 'history_manager', history_manager), \
+                patch('cli.click.echo_via_pager') as pager:
+            result = self.runner.invoke(cli, ['history'])
+        
+        assert result.exit_code == 0
+        pager.assert_not_called()
+        assert result.output.count("ID: ") == 10
+
+    def test_evolve_stream_prints_chunks(self):
+        """Test that evolve --stream prints generated code as it arrives"""
+        def generate_command(description, on_chunk=None):
+            for chunk in ("x = ", "1"):
+                on_chunk(chunk)
+            return "x = 1"
+        
+        code_generator = Mock(**{'generate_command.side_effect': generate_command})
+        with patch.object(CLIContext, 'code_generator', code_generator):
+            result = self.runner.invoke(cli, ['evolve', '--stream', 'set x'])
+        
+        assert result.exit_code == 0
+        assert "x = 1\n✅ Code generated successfully" in result.output
+        assert "preview" not in result.output
+
+    def test_format_provider_output(self):
+        """Test the rendered provider statistics block"""
+        block = _format_provider('gemini', 'gemini-pro', True, 4, 1, 0.25, 1.4567)
+        
+        assert block.splitlines() == [
+            "GEMINI (gemini-pro) - 🟢 Available",
+            "  Requests: 4",
+            "  Errors: 1 (25.0%)",
+            "  Avg Response Time: 1.46s",
+        ]
+        assert "🔴 Unavailable" in _format_provider('openai', 'gpt-4', False, 0, 0, 0.0, 0.0)
@@ -4,12 +4,13 @@ Unit tests for code generator
 
 import pytest
 import ast
+import asyncio
 import tempfile
 import subprocess
 from unittest.mock import Mock, patch, MagicMock
 from pathlib import Path
 
-from code_generator import CodeGenerator
+from code_generator import CodeCache, CodeGenerator, SandboxWorker
 
 
 class TestCodeGenerator:
@@ -53,6 +54,57 @@ class TestCodeGenerator:
             
             assert result is None  # Should be rejected for being too long
 
+    def test_generate_command_uses_persistent_cache(self, config_manager, mock_config,
+                                                    llm_integration, temp_dir):
+        """Test that repeated descriptions are served from the code cache"""
+        mock_config['code_generation']['cache_enabled'] = True
+        mock_config['paths.generated_dir'] = str(temp_dir)
+        
+        with patch.object(llm_integration, 'generate_code', return_value="print('hi')") as mock_generate:
+            generator = CodeGenerator(config_manager, llm_integration)
+            assert generator.generate_command("Say hi") == "print('hi')"
+            
+            # A fresh generator reads the same database; matching ignores case
+            reloaded = CodeGenerator(config_manager, llm_integration)
+            assert reloaded.generate_command("  say HI ") == "print('hi')"
+            assert mock_generate.call_count == 1
+            
+            # Changing the model invalidates cached entries
+            mock_config['llm']['gemini_model'] = 'other-model'
+            reloaded.generate_command("Say hi")
+            assert mock_generate.call_count == 2
+            
+            reloaded.forget_generated("Say hi")
+            reloaded.generate_command("Say hi")
+            assert mock_generate.call_count == 3
+        
+        generator._code_cache.close()
+        reloaded._code_cache.close()
+
+    def test_code_cache_default_follows_temperature(self, config_manager, mock_config,
+                                                    llm_integration, temp_dir):
+        """Test that without cache_enabled the code cache is on only at temperature 0"""
+        mock_config['paths.generated_dir'] = str(temp_dir)
+        assert CodeGenerator(config_manager, llm_integration)._code_cache is None
+        
+        mock_config['llm']['temperature'] = 0
+        generator = CodeGenerator(config_manager, llm_integration)
+        assert generator._code_cache is not None
+        generator._code_cache.close()
+
+    def test_code_cache_evicts_least_used(self, temp_dir):
+        """Test that the code cache evicts the least frequently used entry"""
+        cache = CodeCache(temp_dir / "cache.sqlite3", max_entries=2)
+        cache.put(b"a", "a = 1")
+        cache.put(b"b", "b = 1")
+        assert cache.get(b"a") == "a = 1"
+        
+        cache.put(b"c", "c = 1")
+        assert cache.get(b"b") is None
+        assert cache.get(b"a") == "a = 1"
+        assert cache.get(b"c") == "c = 1"
+        cache.close()
+
     def test_validate_code_success(self, code_generator):
         """Test successful code validation"""
         valid_code = """
@@ -69,6 +121,61 @@ def hello_world():
             
             assert result is True
 
+    def test_validate_code_cached(self, code_generator):
+        """Test that identical code is only parsed and scanned once"""
+        valid_code = "def hello(): return 'Hello'"
+        
+        with patch.object(code_generator, '_validate_with_llm') as mock_llm_validate, \
+             patch.object(code_generator, '_validate_ast', wraps=code_generator._validate_ast) as mock_ast:
+            mock_llm_validate.return_value = True
+            
+            assert code_generator.validate_code(valid_code) is True
+            assert code_generator.validate_code(valid_code) is True
+            assert code_generator.validate_code(valid_code + "\n") is True
+            
+            assert mock_ast.call_count == 2
+            assert mock_llm_validate.call_count == 3
+
+    def test_validate_code_retries_llm_after_error(self, code_generator):
+        """Test that an LLM failure is not cached as the verdict for the code"""
+        code = "def hello(): return 'Hello'"
+        
+        with patch.object(code_generator.llm_integration, 'validate_code_with_llm') as mock_validate:
+            mock_validate.side_effect = [ConnectionError("offline"), False]
+            
+            # The failed call fails open, but the next one reaches the LLM
+            assert code_generator.validate_code(code) is True
+            assert code_generator.validate_code(code) is False
+            assert mock_validate.call_count == 2
+
+    def test_validate_many(self, code_generator):
+        """Test concurrent validation of several snippets"""
+        codes = [
+            "def ok(): return 1",
+            "def broken(:",
+            "def bad():\n    eval('1')",
+            "def also_ok(): return 2",
+        ]
+        
+        with patch.object(code_generator.llm_integration, 'validate_code_with_llm') as mock_validate:
+            mock_validate.return_value = True
+            
+            results = asyncio.run(code_generator.validate_many(codes, max_concurrency=2))
+            
+            assert results == [True, False, False, True]
+            assert mock_validate.call_count == 2
+
+    def test_validate_code_fast_skips_llm(self, code_generator):
+        """Test that fast validation only runs the local checks"""
+        with patch.object(code_generator, '_validate_with_llm') as mock_llm_validate:
+            assert code_generator.validate_code_fast("def ok(): return 1") is True
+            assert code_generator.validate_code_fast("eval('1')") is False
+            
+            mock_llm_validate.assert_not_called()
+            
+            mock_llm_validate.return_value = False
+            assert code_generator.validate_with_llm_background("def ok(): return 1").result() is False
+
     def test_validate_code_syntax_error(self, code_generator):
         """Test code validation with syntax error"""
         invalid_code = "def hello(\n    print('missing closing paren')"
@@ -118,6 +225,25 @@ def dangerous_function():
             result = code_generator._validate_ast(code)
             assert result is False
 
+    def test_validate_ast_nested_violations(self, code_generator):
+        """Test AST validation finds violations nested inside other nodes"""
+        nested_codes = [
+            "def run():\n    print(eval('1 + 1'))",
+            "class Tool:\n    def load(self):\n        import os"
+        ]
+        
+        for code in nested_codes:
+            assert code_generator._validate_ast(code) is False
+
+    def test_reload_config_refreshes_hoisted_settings(self, code_generator, mock_config):
+        """Test that hoisted security settings only change on reload"""
+        mock_config['security'] = dict(mock_config['security'], restricted_modules=['json'])
+        assert code_generator._validate_ast("import json") is True
+        
+        code_generator.reload_config()
+        assert code_generator._validate_ast("import json") is False
+        assert code_generator._validate_ast("import os") is True
+
     def test_validate_ast_restricted_imports(self, code_generator):
         """Test AST validation catches restricted imports"""
         restricted_codes = [
@@ -219,6 +345,18 @@ def calculate_sum(a, b):
             
             assert result is False
 
+    @pytest.mark.skipif(not SandboxWorker.is_supported(), reason="forkserver not available")
+    def test_execute_code_persistent_worker(self, code_generator):
+        """Test execution through the persistent sandbox worker"""
+        code_generator.security_config['persistent_worker'] = True
+        
+        try:
+            assert code_generator.execute_code("print('Hello, World!')") is True
+            assert code_generator.execute_code("raise Exception('Test error')") is False
+            assert code_generator.execute_code("import sys; sys.exit(0)") is True
+        finally:
+            code_generator._sandbox_worker.close()
+
     def test_execute_code_sandbox_disabled(self, code_generator):
         """Test code execution with sandbox disabled"""
         code_generator.security_config['sandbox_enabled'] = False
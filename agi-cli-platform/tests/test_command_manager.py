@@ -0,0 +1,138 @@
+"""
+Unit tests for dynamic command management
+"""
+
+import importlib.util
+import json
+import pytest
+from pathlib import Path
+from click.testing import CliRunner
+from unittest.mock import Mock
+
+from config import ConfigManager
+from command_manager import CommandManager
+from cli import cli
+
+
+COMMAND_SOURCE = '''
+import click
+
+@click.command(name="hello")
+def hello():
+    """Say hello"""
+    click.echo("hello from a saved command")
+'''
+
+
+@pytest.fixture
+def command_manager(temp_dir, monkeypatch):
+    """Command manager rooted in a temporary working directory"""
+    monkeypatch.chdir(temp_dir)
+    manager = Mock(spec=ConfigManager)
+    manager.get.side_effect = lambda key, default=None: default
+    return CommandManager(manager)
+
+
+class TestCommandManager:
+    """Test cases for command manager"""
+
+    def test_save_and_load_single_command(self, command_manager):
+        """Test that a saved command is loaded on demand by ID"""
+        assert command_manager.save_command("abc12345", COMMAND_SOURCE)
+        assert command_manager.dynamic_commands == {}
+
+        reloaded = CommandManager(command_manager.config_manager)
+        command = reloaded.load_single_command("abc12345")
+        assert command is not None
+        assert command.name == "hello"
+        assert reloaded.load_single_command("missing") is None
+
+    def test_save_command_precompiles_bytecode(self, command_manager):
+        """Test that saving a command writes its cached bytecode"""
+        command_manager.save_command("abc12345", COMMAND_SOURCE)
+
+        command_file = Path(command_manager.command_registry["abc12345"]["file"])
+        assert Path(importlib.util.cache_from_source(str(command_file))).exists()
+
+    def test_identical_code_shares_one_file(self, command_manager):
+        """Test that identical commands share a file until the last is deleted"""
+        command_manager.save_command("first123", COMMAND_SOURCE)
+        command_manager.save_command("second45", COMMAND_SOURCE)
+
+        registry = command_manager.command_registry
+        command_file = Path(registry["first123"]["file"])
+        assert registry["second45"]["file"] == str(command_file)
+        assert len(list(command_manager.generated_dir.glob("*.py"))) == 1
+
+        assert command_manager.delete_command("first123")
+        assert command_file.exists()
+        assert command_manager.load_single_command("second45").name == "hello"
+
+        assert command_manager.delete_command("second45")
+        assert not command_file.exists()
+
+    def test_load_commands_in_parallel(self, command_manager):
+        """Test that several saved commands are loaded in one batch"""
+        for i in range(4):
+            command_manager.save_command(f"cmd{i}", COMMAND_SOURCE.replace("hello", f"hello{i}"))
+
+        reloaded = CommandManager(command_manager.config_manager)
+        commands = reloaded.load_commands([f"cmd{i}" for i in range(4)] + ["missing"])
+        assert sorted(command.name for command in commands.values()) == [f"hello{i}" for i in range(4)]
+        assert reloaded.dynamic_commands == commands
+
+    def test_load_command_from_template(self, command_manager):
+        """Test that template commands are found through __click_commands__"""
+        code = command_manager.create_command_template("say-hi", "Say hi")
+        assert '__click_commands__ = ["say_hi"]' in code
+        command_manager.save_command("def67890", code)
+
+        command = command_manager.load_single_command("def67890")
+        assert command is not None
+        assert command.name == "say-hi"
+
+    def test_migrates_legacy_pickle_registry(self, command_manager):
+        """Test that a legacy command_registry.pkl is converted to JSON once"""
+        import pickle
+
+        command_file = command_manager.generated_dir / "old12345.py"
+        command_file.write_text(COMMAND_SOURCE)
+        legacy = {'old12345': {'id': 'old12345', 'file': str(command_file),
+                               'code': COMMAND_SOURCE, 'created_at': '0'}}
+        command_manager.legacy_registry_file.write_bytes(pickle.dumps(legacy))
+
+        reloaded = CommandManager(command_manager.config_manager)
+        assert reloaded.command_registry == legacy
+        assert json.loads(reloaded.registry_file.read_text()) == legacy
+        assert reloaded.load_single_command("old12345").name == "hello"
+
+        # The JSON registry takes over from then on
+        assert reloaded.delete_command("old12345")
+        assert CommandManager(command_manager.config_manager).command_registry == {}
+
+    def test_registry_is_json(self, command_manager):
+        """Test that the registry is stored as JSON and shared between instances"""
+        command_manager.save_command("abc12345", COMMAND_SOURCE)
+
+        registry = json.loads(command_manager.registry_file.read_text())
+        assert registry["abc12345"]["code"] == COMMAND_SOURCE
+
+        reloaded = CommandManager(command_manager.config_manager)
+        assert reloaded.command_registry == command_manager.command_registry
+        assert reloaded.command_registry is not command_manager.command_registry
+
+    def test_cli_invokes_saved_command(self, command_manager):
+        """Test that the CLI resolves saved commands lazily"""
+        command_manager.save_command("abc12345", COMMAND_SOURCE)
+
+        result = CliRunner().invoke(cli, ["abc12345"])
+        assert result.exit_code == 0
+        assert "hello from a saved command" in result.output
+
+    def test_cli_help_lists_saved_commands(self, command_manager):
+        """Test that top-level help loads and lists saved commands"""
+        command_manager.save_command("abc12345", COMMAND_SOURCE)
+
+        result = CliRunner().invoke(cli, ["--help"])
+        assert result.exit_code == 0
+        assert "abc12345" in result.output
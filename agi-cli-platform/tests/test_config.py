@@ -0,0 +1,164 @@
+"""
+Unit tests for configuration management
+"""
+
+from unittest.mock import patch
+
+import config
+from config import ConfigManager
+
+
+class TestConfigManager:
+    """Test cases for config manager"""
+
+    def test_load_default_config(self):
+        """Test that the bundled default configuration parses"""
+        manager = ConfigManager()
+        manager.load_default_config()
+
+        assert manager.get('paths.generated_dir') == 'generated'
+        assert 'gemini' in manager.get('llm.providers')
+
+    def test_save_and_reload_round_trip(self, temp_dir):
+        """Test that a saved configuration loads back unchanged"""
+        manager = ConfigManager()
+        manager.config_path = temp_dir / "config.yaml"
+        manager.set('llm.temperature', 0.2)
+        manager.set('plugins.plugin_dirs', ['plugins', 'extra'])
+        manager.save_config()
+
+        reloaded = ConfigManager()
+        reloaded.load_config(str(manager.config_path))
+        assert reloaded.config == manager.config
+
+    def test_save_keeps_key_order_and_unicode(self, temp_dir):
+        """Test that saving preserves key order and writes non-ASCII text as-is"""
+        manager = ConfigManager()
+        manager.config_path = temp_dir / "config.yaml"
+        manager.config = {'zeta': 1, 'alpha': {'greeting': "héllo ✓"}}
+        manager.save_config()
+
+        text = manager.config_path.read_text(encoding='utf-8')
+        assert text.index('zeta') < text.index('alpha')
+        assert "héllo ✓" in text
+        assert [p.name for p in temp_dir.iterdir()] == ["config.yaml"]
+
+    def test_missing_file_falls_back_to_defaults(self, temp_dir):
+        """Test that a missing config file yields the built-in defaults"""
+        manager = ConfigManager()
+        manager.load_config(str(temp_dir / "missing.yaml"))
+
+        assert manager.get('security.max_execution_time') == 60
+
+    def test_parsed_config_is_cached(self, temp_dir):
+        """Test that unchanged files are parsed once and edits are picked up"""
+        config_file = temp_dir / "config.yaml"
+        config_file.write_text("llm:\n  temperature: 0.5\n")
+
+        first = ConfigManager()
+        first.load_config(str(config_file))
+        first.set('llm.temperature', 0.9)
+
+        with patch('yaml.load') as mock_load:
+            second = ConfigManager()
+            second.load_config(str(config_file))
+            mock_load.assert_not_called()
+        assert second.get('llm.temperature') == 0.5
+
+        config_file.write_text("llm:\n  temperature: 0.25\n")
+        third = ConfigManager()
+        third.load_config(str(config_file))
+        assert third.get('llm.temperature') == 0.25
+
+    def test_json_cache_survives_new_process(self, temp_dir):
+        """Test that a fresh process reads the JSON copy instead of the YAML"""
+        config_file = temp_dir / "config.yaml"
+        config_file.write_text("paths:\n  generated_dir: out\n")
+        ConfigManager().load_config(str(config_file))
+
+        config._parsed_configs.clear()
+        with patch('yaml.load') as mock_load:
+            manager = ConfigManager()
+            manager.load_config(str(config_file))
+            mock_load.assert_not_called()
+        assert manager.get('paths.generated_dir') == 'out'
+
+    def test_get_dotted_keys(self):
+        """Test dotted lookups of leaves and sections, and updates via set"""
+        manager = ConfigManager()
+        manager.config = {'llm': {'model': 'a', 'limits': {'tokens': 10}}}
+
+        assert manager.get('llm.limits.tokens') == 10
+        assert manager.get('llm.limits') == {'tokens': 10}
+        assert manager.get('llm.missing', 'x') == 'x'
+        assert manager.get('llm.model.name') is None
+
+        manager.set('llm.limits.tokens', 20)
+        manager.set('paths.generated_dir', 'out')
+        assert manager.get('llm.limits.tokens') == 20
+        assert manager.get('paths') == {'generated_dir': 'out'}
+
+        manager.config = {'llm': {'model': 'b'}}
+        assert manager.get('llm.model') == 'b'
+        assert manager.get('paths.generated_dir') is None
+
+    def test_get_sections_are_shared(self):
+        """Test that sections are returned by reference and see later set() calls"""
+        manager = ConfigManager()
+        manager.config = {'llm': {'temperature': 0.7, 'providers': ['gemini']}}
+
+        section = manager.get('llm')
+        assert section is manager.config['llm']
+        assert manager.get('llm.providers') is section['providers']
+
+        manager.set('llm.temperature', 0)
+        assert section['temperature'] == 0
+        assert manager.get('llm.temperature') == 0
+
+    def test_load_utf8_config(self, temp_dir):
+        """Test that non-ASCII values are decoded from the raw bytes"""
+        config_file = temp_dir / "config.yaml"
+        config_file.write_bytes("cli:\n  greeting: \"héllo ✓\"\n".encode('utf-8'))
+
+        manager = ConfigManager()
+        manager.load_config(str(config_file))
+        assert manager.get('cli.greeting') == "héllo ✓"
+
+    def test_load_large_config_via_mmap(self, temp_dir):
+        """Test that configs above the mmap threshold parse the same"""
+        config_file = temp_dir / "config.yaml"
+        entries = "".join(f"  key_{i}: \"value {i}\"\n" for i in range(4000))
+        config_file.write_text(f"version: \"2.0\"\nbulk:\n{entries}")
+        assert config_file.stat().st_size > config._MMAP_THRESHOLD
+
+        manager = ConfigManager()
+        manager.load_config(str(config_file))
+        assert manager.get('version') == "2.0"
+        assert manager.get('bulk.key_3999') == "value 3999"
+
+    def test_save_writes_json_cache(self, temp_dir):
+        """Test that loading a freshly saved config skips YAML parsing"""
+        manager = ConfigManager()
+        manager.config_path = temp_dir / "config.yaml"
+        manager.set('paths.generated_dir', 'saved')
+        manager.save_config()
+
+        with patch('yaml.load') as mock_load:
+            reloaded = ConfigManager()
+            reloaded.load_config(str(manager.config_path))
+            mock_load.assert_not_called()
+        assert reloaded.get('paths.generated_dir') == 'saved'
+
+    def test_module_set_accessors(self):
+        """Test the allowed/restricted module lookups and their invalidation"""
+        manager = ConfigManager()
+        manager.config = {'plugins': {'allowed_imports': ['json']},
+                          'security': {'restricted_modules': ['os']}}
+
+        assert manager.is_import_allowed('json')
+        assert not manager.is_import_allowed('os')
+        assert manager.is_module_restricted('os')
+        assert manager.get_frozenset('missing.key') == frozenset()
+
+        manager.set('plugins.allowed_imports', ['json', 'math'])
+        assert manager.is_import_allowed('math')
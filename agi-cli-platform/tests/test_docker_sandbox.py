@@ -0,0 +1,208 @@
+"""
+Unit tests for the Docker sandbox
+"""
+
+import pytest
+from dataclasses import replace
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+import docker_sandbox
+from config import ConfigManager
+from docker_sandbox import DockerSandbox
+
+
+@pytest.fixture
+def sandbox():
+    """Sandbox with a mocked Docker client"""
+    manager = ConfigManager()
+    manager.config = {'security': {'restricted_modules': ['os', 'subprocess']}}
+
+    with patch.object(DockerSandbox, '_initialize_docker'):
+        sandbox = DockerSandbox(manager)
+    sandbox.docker_client = Mock()
+    sandbox.docker_client.containers.run.return_value = b"ok\n"
+    return sandbox
+
+
+class TestDockerSandbox:
+    """Test cases for the Docker sandbox"""
+
+    def test_container_template_reused(self, sandbox, monkeypatch):
+        """Test that per-language settings are built once and runs differ only per call"""
+        monkeypatch.setattr(docker_sandbox, 'DOCKER_AVAILABLE', True)
+
+        with patch.object(sandbox, '_build_container_template',
+                          wraps=sandbox._build_container_template) as build:
+            first = sandbox.execute_code_safely("print('a')")
+            second = sandbox.execute_code_safely("print('b')")
+
+        assert first.success and second.success
+        assert first.output == "ok\n"
+        assert first.resource_usage is second.resource_usage
+        build.assert_called_once_with("python")
+
+        configs = [call.kwargs for call in sandbox.docker_client.containers.run.call_args_list]
+        assert configs[0]['image'] == 'python:3.11-alpine'
+        assert configs[0]['command'] == ['python3', '-c', "print('a')"]
+        assert configs[1]['command'] == ['python3', '-c', "print('b')"]
+        assert 'command' not in sandbox._container_templates['python']
+
+    def test_unavailable_without_client(self, sandbox):
+        """Test that execution is refused when Docker is unavailable"""
+        sandbox.docker_client = None
+
+        result = sandbox.execute_code_safely("print('a')")
+        assert not result.success
+        assert result.error == "Docker sandbox not available"
+
+    def test_language_lookups(self, sandbox, monkeypatch):
+        """Test that language names are normalized once and mapped to commands"""
+        monkeypatch.setattr(docker_sandbox, 'DOCKER_AVAILABLE', True)
+
+        sandbox.execute_code_safely("int main() {}", language="CPP")
+        config = sandbox.docker_client.containers.run.call_args.kwargs
+        assert config['image'] == 'gcc:alpine'
+        assert config['command'] == ['g++', '-o', 'program', '/code/code.cpp', '&&', './program']
+
+        assert sandbox._get_execution_command('cobol', 'f.txt') == ['cat', 'f.txt']
+
+    def test_client_shared_and_images_warmed(self, monkeypatch):
+        """Test that sandboxes share one client and pull missing images once"""
+        class ImageNotFound(Exception):
+            pass
+
+        fake_docker = Mock()
+        fake_docker.errors.ImageNotFound = ImageNotFound
+        client = fake_docker.from_env.return_value
+        client.images.get.side_effect = ImageNotFound()
+        monkeypatch.setattr(DockerSandbox, '_docker', fake_docker)
+        monkeypatch.setattr(DockerSandbox, '_shared_client', None)
+        monkeypatch.setattr(DockerSandbox, '_warmed_images', set())
+        monkeypatch.setattr(docker_sandbox, 'DOCKER_AVAILABLE', True)
+
+        manager = ConfigManager()
+        first = DockerSandbox(manager)
+        second = DockerSandbox(manager)
+
+        assert first.docker_client is second.docker_client is client
+        fake_docker.from_env.assert_called_once()
+        client.images.pull.assert_called_once_with('python:3.11-alpine')
+
+    def test_pooled_container_reused(self, sandbox, monkeypatch):
+        """Test that pooled mode starts one container and execs each run in it"""
+        monkeypatch.setattr(docker_sandbox, 'DOCKER_AVAILABLE', True)
+        sandbox.sandbox_config = replace(sandbox.sandbox_config, reuse_containers=True)
+        container = Mock()
+        sandbox.docker_client.containers.run.return_value = container
+        container.status = 'running'
+        container.exec_run.return_value = (0, (b"hi\n", None))
+
+        first = sandbox.execute_code_safely("print('hi')")
+        second = sandbox.execute_code_safely("print('hi')")
+
+        assert first.success and second.output == "hi\n"
+        sandbox.docker_client.containers.run.assert_called_once()
+        assert sandbox.docker_client.containers.run.call_args.kwargs['command'] == ['sleep', 'infinity']
+        command = container.exec_run.call_args.args[0]
+        assert command == ['timeout', '30', 'python3', '-c', "print('hi')"]
+
+        host_dir = sandbox._pool['python'][1]
+        assert not list(Path(host_dir).iterdir())
+        sandbox.cleanup()
+        container.remove.assert_called_once_with(force=True)
+        assert not Path(host_dir).exists()
+
+    def test_pooled_container_recycled(self, sandbox, monkeypatch):
+        """Test that pooled containers are replaced after max uses or an OOM kill"""
+        monkeypatch.setattr(docker_sandbox, 'DOCKER_AVAILABLE', True)
+        sandbox.sandbox_config = replace(sandbox.sandbox_config, reuse_containers=True,
+                                         max_container_uses=2)
+        containers = [Mock(status='running') for _ in range(3)]
+        sandbox.docker_client.containers.run.side_effect = containers
+        for container in containers:
+            container.exec_run.return_value = (0, (b"", None))
+        containers[1].exec_run.return_value = (137, (None, b"Killed"))
+
+        for _ in range(4):
+            sandbox.execute_code_safely("x = 1")
+        assert containers[0].exec_run.call_count == 2
+        containers[0].remove.assert_called_once_with(force=True)
+
+        containers[1].exec_run.assert_called_once()
+        containers[1].remove.assert_called_once_with(force=True)
+        assert sandbox._pool['python'][0] is containers[2]
+        sandbox.cleanup()
+
+    def test_inline_code_skips_disk(self, sandbox, monkeypatch):
+        """Test that interpreted code runs without a code mount unless it is too large"""
+        monkeypatch.setattr(docker_sandbox, 'DOCKER_AVAILABLE', True)
+        run = sandbox.docker_client.containers.run
+
+        sandbox.execute_code_safely("echo hi", language="bash")
+        assert run.call_args.kwargs['command'] == ['bash', '-c', "echo hi"]
+        assert 'volumes' not in run.call_args.kwargs
+        assert run.call_args.kwargs['working_dir'] == '/tmp'
+
+        monkeypatch.setattr(docker_sandbox, '_INLINE_CODE_LIMIT', 4)
+        sandbox.execute_code_safely("print('large')")
+        assert run.call_args.kwargs['command'] == ['python3', '/code/code.py']
+        assert run.call_args.kwargs['working_dir'] == '/code'
+
+    def test_validate_many_uses_one_session(self, sandbox, monkeypatch):
+        """Test that a batch of snippets runs in a single container session"""
+        monkeypatch.setattr(docker_sandbox, 'DOCKER_AVAILABLE', True)
+        container = Mock()
+        sandbox.docker_client.containers.run.return_value = container
+        container.exec_run.side_effect = [(0, (b"", None)), (1, (None, b"boom")), (0, (b"", None))]
+
+        assert sandbox.validate_many(["a = 1", "raise SystemExit(1)", "b = 2"]) == [True, False, True]
+        sandbox.docker_client.containers.run.assert_called_once()
+        assert container.exec_run.call_count == 3
+
+        # Without pooling the session container is removed afterwards
+        container.remove.assert_called_once_with(force=True)
+        assert sandbox._pool == {}
+
+    def test_validate_many_without_docker(self, sandbox):
+        """Test that batch validation fails closed when Docker is unavailable"""
+        sandbox.docker_client = None
+
+        assert sandbox.validate_many(["a = 1", "b = 2"]) == [False, False]
+
+    def test_static_check_skips_container(self, sandbox, monkeypatch):
+        """Test that syntax errors and restricted imports never reach Docker"""
+        monkeypatch.setattr(docker_sandbox, 'DOCKER_AVAILABLE', True)
+
+        assert not sandbox.validate_code_in_sandbox("def broken(:")
+        assert not sandbox.validate_code_in_sandbox("import os.path")
+        assert not sandbox.validate_code_in_sandbox("from subprocess import run")
+        sandbox.docker_client.containers.run.assert_not_called()
+
+        assert sandbox.validate_code_in_sandbox("import json")
+        sandbox.docker_client.containers.run.assert_called_once()
+
+    def test_ulimits_built_once(self, sandbox, monkeypatch):
+        """Test that ulimits resolved at init are shared by every language template"""
+        monkeypatch.setattr(docker_sandbox, 'DOCKER_AVAILABLE', True)
+        sandbox._ulimits = sandbox._build_ulimits()
+        assert [limit['Name'] for limit in sandbox._ulimits] == ['nproc', 'nofile', 'fsize']
+
+        sandbox.execute_code_safely("print('a')")
+        sandbox.execute_code_safely("echo hi", language="bash")
+        configs = [call.kwargs for call in sandbox.docker_client.containers.run.call_args_list]
+        assert configs[0]['ulimits'] is configs[1]['ulimits'] is sandbox._ulimits
+
+    def test_cleanup_removes_labelled_containers(self, sandbox, monkeypatch):
+        """Test that cleanup lists stopped containers too and removes each of them"""
+        monkeypatch.setattr(docker_sandbox, 'DOCKER_AVAILABLE', True)
+        containers = [Mock() for _ in range(3)]
+        containers[0].remove.side_effect = RuntimeError("gone")
+        sandbox.docker_client.containers.list.return_value = containers
+
+        sandbox.cleanup()
+
+        sandbox.docker_client.containers.list.assert_called_once_with(
+            all=True, filters={'label': 'agi-cli-sandbox=true'})
+        for container in containers:
+            container.remove.assert_called_once_with(force=True)
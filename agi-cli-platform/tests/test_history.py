@@ -0,0 +1,226 @@
+"""
+Unit tests for command history management
+"""
+
+import gc
+import json
+import weakref
+import pytest
+from unittest.mock import Mock, patch
+
+from config import ConfigManager
+from history import HistoryManager
+
+
+@pytest.fixture
+def history_config():
+    """Configuration values used by the history manager"""
+    return {
+        'history': {'max_entries': 10},
+        'paths.backups_dir': 'backups',
+        'paths.generated_dir': 'generated',
+        'paths.plugins_dir': 'plugins',
+    }
+
+
+@pytest.fixture
+def history_manager(temp_dir, history_config, monkeypatch):
+    """History manager rooted in a temporary working directory"""
+    monkeypatch.chdir(temp_dir)
+    manager = Mock(spec=ConfigManager)
+    manager.config = {'version': '0.1.0'}
+    manager.get.side_effect = lambda key, default=None: history_config.get(key, default)
+    history = HistoryManager(manager)
+    yield history
+    # Flush queued records while the temporary directory still exists
+    history.close()
+
+
+class TestHistoryManager:
+    """Test cases for history manager"""
+
+    def test_save_and_get_command(self, history_manager):
+        """Test saving a command and reading it back"""
+        command_id = history_manager.save_command("say hello", "print('hello')")
+
+        entry = history_manager.get_command(command_id)
+        assert entry is not None
+        assert entry['description'] == "say hello"
+        assert history_manager.get_history_count() == 1
+
+    def test_close_flushes_and_releases_manager(self, history_manager):
+        """Test that close writes queued records and managers are not kept alive"""
+        command_id = history_manager.save_command("say hello", "print('hello')")
+        history_manager.close()
+
+        reloaded = HistoryManager(history_manager.config_manager)
+        assert reloaded.get_code(command_id) == "print('hello')"
+        reloaded.close()
+
+        ref = weakref.ref(HistoryManager(history_manager.config_manager))
+        gc.collect()
+        assert ref() is None
+
+    def test_history_persists_across_instances(self, history_manager):
+        """Test that saves, rollbacks and deletes survive a reload"""
+        kept = history_manager.save_command("keep", "x = 1")
+        rolled = history_manager.save_command("roll", "x = 2")
+        deleted = history_manager.save_command("drop", "x = 3")
+
+        assert history_manager.rollback_command(rolled)
+        assert history_manager.delete_command(deleted)
+        history_manager._flush_history()
+
+        reloaded = HistoryManager(history_manager.config_manager)
+        assert reloaded.get_command(kept)['status'] == 'saved'
+        assert reloaded.get_command(rolled)['status'] == 'rolled_back'
+        assert reloaded.get_command(deleted) is None
+        assert reloaded.get_history_count() == history_manager.get_history_count()
+
+    def test_history_log_is_append_only(self, history_manager):
+        """Test that each save appends a single JSON Lines record"""
+        history_manager.save_command("first", "a = 1")
+        history_manager.save_command("second", "b = 2")
+        history_manager._flush_history()
+
+        lines = history_manager.history_file.read_bytes().splitlines()
+        assert len(lines) == 2
+        assert json.loads(lines[1])['description'] == "second"
+
+    def test_cleanup_compacts_log(self, history_manager):
+        """Test that the log is trimmed to max_entries once it overflows"""
+        for i in range(13):
+            history_manager.save_command(f"cmd {i}", f"x = {i}")
+
+        assert history_manager.get_history_count() == 10
+        lines = history_manager.history_file.read_bytes().splitlines()
+        assert len(lines) <= 12
+
+        newest = history_manager.get_history(limit=1)[0]
+        assert history_manager.get_code(newest['id']) == "x = 12"
+
+    def test_compaction_keeps_saved_log_readable(self, history_manager):
+        """Test that code stays readable if compaction stops before the log is saved"""
+        history_manager._flush_threshold = 1
+        for i in range(12):
+            history_manager.save_command(f"cmd {i}", f"x = {i}")
+        old_store = history_manager.code_store_file
+
+        # Simulate a crash between writing the new blob store and the log
+        with patch.object(HistoryManager, '_save_history', return_value=False):
+            history_manager.save_command("cmd 12", "x = 12")
+        assert old_store.exists()
+        assert history_manager.code_store_file != old_store
+
+        reloaded = HistoryManager(history_manager.config_manager)
+        for entry in reloaded.get_history():
+            assert reloaded.get_code(entry['id']) == "x = " + entry['description'][4:]
+
+        # The next successful compaction removes stores the log no longer uses
+        history_manager._record_count = 100
+        history_manager._cleanup_history()
+        stores = [p.name for p in history_manager.history_dir.glob("codes*.bin")]
+        assert stores == [history_manager.code_store_file.name]
+        reloaded = HistoryManager(history_manager.config_manager)
+        newest = reloaded.get_history(limit=1)[0]
+        assert reloaded.get_code(newest['id']) == "x = 12"
+
+    def test_get_code_from_blob_store(self, history_manager):
+        """Test that code is stored in the shared blob store"""
+        first = history_manager.save_command("first", "print('one')")
+        second = history_manager.save_command("second", "print('двa')")
+
+        assert history_manager.get_code(first) == "print('one')"
+        assert history_manager.get_code(second) == "print('двa')"
+        assert 'code' not in history_manager.get_command(first)
+        assert not list(history_manager.history_dir.glob("*.py"))
+
+        history_manager._flush_history()
+        reloaded = HistoryManager(history_manager.config_manager)
+        assert reloaded.get_code(second) == "print('двa')"
+
+    def test_appends_are_batched(self, history_manager):
+        """Test that appended records are written once the threshold is hit"""
+        history_manager._flush_threshold = 3
+        history_manager.save_command("first", "a = 1")
+        history_manager.save_command("second", "b = 2")
+        history_manager._flush_history()
+
+        history_manager.save_command("third", "c = 3")
+        history_manager.save_command("fourth", "d = 4")
+        assert len(history_manager.history_file.read_bytes().splitlines()) == 2
+
+        history_manager.save_command("fifth", "e = 5")
+        assert len(history_manager.history_file.read_bytes().splitlines()) == 5
+
+    def test_get_history_newest_first(self, history_manager):
+        """Test that history is returned newest first"""
+        ids = [history_manager.save_command(f"cmd {i}", "pass") for i in range(3)]
+
+        history = history_manager.get_history()
+        assert [entry['id'] for entry in history] == ids[::-1]
+        assert len(history_manager.get_history(limit=2)) == 2
+
+    def test_export_history_json(self, history_manager, temp_dir):
+        """Test that the JSON export inlines code, newest first"""
+        history_manager.save_command("first", "a = 1")
+        history_manager.save_command("second", "b = 2")
+
+        export_file = temp_dir / "export.json"
+        assert history_manager.export_history_json(str(export_file))
+
+        exported = json.loads(export_file.read_text())
+        assert [entry['code'] for entry in exported] == ["b = 2", "a = 1"]
+        assert 'code_offset' not in exported[0]
+
+        assert history_manager.export_history_json(str(export_file), pretty=False)
+        assert len(export_file.read_bytes().splitlines()) == 1
+        assert json.loads(export_file.read_text()) == exported
+
+    def test_migrates_legacy_history_file(self, history_manager):
+        """Test that a legacy command_history.json file is imported"""
+        legacy = [{'id': 'abc12345', 'description': 'old', 'code': 'pass',
+                   'timestamp': '2025-01-01T00:00:00', 'status': 'saved'}]
+        history_manager.history_file.unlink(missing_ok=True)
+        history_manager.legacy_history_file.write_text(json.dumps(legacy))
+
+        reloaded = HistoryManager(history_manager.config_manager)
+        assert reloaded.get_command('abc12345')['description'] == 'old'
+
+        reloaded.save_command("new", "pass")
+        reloaded._flush_history()
+        migrated = HistoryManager(history_manager.config_manager)
+        assert migrated.get_command('abc12345')['description'] == 'old'
+        assert migrated.get_history_count() == 2
+
+    def test_backup_and_restore(self, history_manager, temp_dir):
+        """Test that a system backup restores generated commands"""
+        generated = temp_dir / "generated"
+        generated.mkdir()
+        (generated / "cmd.py").write_text("x = 1")
+
+        backup_id = history_manager.backup_system_state()
+        assert backup_id
+
+        (generated / "cmd.py").write_text("x = 2")
+        assert history_manager.restore_system_backup(backup_id)
+        assert (generated / "cmd.py").read_text() == "x = 1"
+
+    def test_reload_config(self, history_manager, history_config):
+        """Test that path settings are re-read on explicit reload"""
+        history_config['paths.generated_dir'] = 'other'
+        assert history_manager._generated_dir.name == 'generated'
+
+        history_manager.reload_config()
+        assert history_manager._generated_dir.name == 'other'
+
+    def test_restore_replaces_stale_files(self, history_manager, temp_dir):
+        """Test that files created after a backup are gone after restore"""
+        generated = temp_dir / "generated"
+        generated.mkdir()
+        (generated / "cmd.py").write_text("x = 1")
+        backup_id = history_manager.backup_system_state()
+
+        (generated / "extra.py").write_text("y = 1")
+        assert history_manager.restore_system_backup(backup_id)
+        assert sorted(p.name for p in generated.iterdir()) == ["cmd.py"]
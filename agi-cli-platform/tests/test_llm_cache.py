@@ -0,0 +1,65 @@
+"""
+Unit tests for the LLM response cache
+"""
+
+from llm_cache import LLMCache, SemanticLLMCache, response_cache_key
+
+
+class TestLLMCache:
+    """Test cases for the LLM response cache"""
+
+    def test_lru_eviction_and_ttl(self):
+        """Test that the least recently used entry is evicted and stale ones expire"""
+        cache = LLMCache(max_entries=2, ttl_seconds=3600)
+        cache.set('a', "A")
+        cache.set('b', "B")
+        assert cache.get('a') == "A"
+
+        cache.set('c', "C")
+        assert cache.get('b') is None
+        assert cache.get('a') == "A"
+        assert cache.stats == {'hits': 2, 'misses': 1}
+
+        cache.ttl_seconds = -1
+        assert cache.get('c') is None
+        assert len(cache) == 1
+
+    def test_file_backend_bounded(self, temp_dir):
+        """Test that the cache file is shared between instances and trimmed to size"""
+        db_path = temp_dir / "llm_cache.sqlite3"
+        first = LLMCache(max_entries=2, db_path=db_path)
+        for key in ('a', 'b', 'c'):
+            first.set(key, key.upper())
+        first.close()
+
+        second = LLMCache(max_entries=2, db_path=db_path)
+        assert second.get('a') is None
+        assert [second.get('b'), second.get('c')] == ["B", "C"]
+        second.close()
+
+    def test_key_depends_on_settings_and_prompts(self):
+        """Test that the key changes with settings, system prompt and prompt"""
+        key = response_cache_key({'model': 'm'}, "sys", "hi")
+        assert key == response_cache_key({'model': 'm'}, "sys", "hi")
+        assert key != response_cache_key({'model': 'n'}, "sys", "hi")
+        assert key != response_cache_key({'model': 'm'}, None, "hi")
+
+
+class TestSemanticLLMCache:
+    """Test cases for the embedding-based response cache"""
+
+    def test_nearest_prompt_above_threshold(self):
+        """Test that similar prompts in the same namespace share a response"""
+        vectors = {'list files': [1.0, 0.0], 'show files': [0.95, 0.1], 'delete files': [0.0, 1.0]}
+        cache = SemanticLLMCache(vectors.__getitem__, threshold=0.92, max_entries=2)
+
+        cache.set('ns', cache.embed('list files'), "ls")
+        assert cache.get('ns', cache.embed('show files')) == "ls"
+        assert cache.get('ns', cache.embed('delete files')) is None
+        assert cache.get('other', cache.embed('list files')) is None
+        assert cache.stats == {'hits': 1, 'misses': 2}
+
+        cache.set('ns', cache.embed('delete files'), "rm")
+        cache.set('other', cache.embed('list files'), "dir")
+        assert len(cache) == 2
+        assert cache.get('ns', cache.embed('list files')) is None
@@ -3,6 +3,7 @@ Unit tests for LLM integration
 """
 
 import pytest
+import json
 import os
 from unittest.mock import Mock, patch, MagicMock
 import requests
@@ -21,9 +22,31 @@ class TestLLMIntegration:
         assert 'gemini' in llm.api_providers
         assert llm.use_direct_api is True
 
+    def test_session_retries_transient_errors(self, llm_integration):
+        """Test that provider calls share a pooled session that retries POSTs"""
+        adapter = llm_integration.session.get_adapter('https://generativelanguage.googleapis.com')
+        assert adapter is llm_integration.session.get_adapter('http://localhost:11434')
+
+        retry = adapter.max_retries
+        assert retry.total == 2
+        assert retry.is_retry('POST', 503)
+        assert not retry.is_retry('POST', 400)
+
+    def test_http_limits_from_config(self, config_manager, mock_config):
+        """Test that pool size and connect/read timeouts come from the config"""
+        mock_config['llm'].update(http_max_connections=64, connect_timeout=3)
+        llm = LLMIntegration(config_manager)
+
+        assert llm.session.get_adapter('https://api.openai.com')._pool_maxsize == 64
+        assert llm.http_timeout == (3, 30)
+
+        with patch('requests.Session.post') as mock_post:
+            llm.query("test")
+            assert mock_post.call_args.kwargs['timeout'] == (3, 30)
+
     def test_query_gemini_success(self, llm_integration):
         """Test successful Gemini API query"""
-        with patch('requests.post') as mock_post:
+        with patch('requests.Session.post') as mock_post:
             mock_response = Mock()
             mock_response.status_code = 200
             mock_response.json.return_value = {
@@ -42,7 +65,7 @@ class TestLLMIntegration:
 
     def test_query_gemini_with_system_prompt(self, llm_integration):
         """Test Gemini API query with system prompt"""
-        with patch('requests.post') as mock_post:
+        with patch('requests.Session.post') as mock_post:
             mock_response = Mock()
             mock_response.status_code = 200
             mock_response.json.return_value = {
@@ -60,16 +83,15 @@ class TestLLMIntegration:
             response = llm_integration.query(prompt, system_prompt)
             
             assert response == "Test response"
-            # Check that system prompt was included in the request
+            # Check that the system prompt is sent apart from the user text
             call_args = mock_post.call_args
             request_data = call_args[1]['json']
-            content_text = request_data['contents'][0]['parts'][0]['text']
-            assert "System:" in content_text
-            assert system_prompt in content_text
+            assert request_data['contents'][0]['parts'] == [{'text': prompt}]
+            assert request_data['systemInstruction'] == {'parts': [{'text': system_prompt}]}
 
     def test_query_gemini_api_error(self, llm_integration):
         """Test Gemini API error handling"""
-        with patch('requests.post') as mock_post:
+        with patch('requests.Session.post') as mock_post:
             mock_response = Mock()
             mock_response.status_code = 400
             mock_response.text = "Bad Request"
@@ -88,7 +110,7 @@ class TestLLMIntegration:
 
     def test_query_gemini_malformed_response(self, llm_integration):
         """Test Gemini API with malformed response"""
-        with patch('requests.post') as mock_post:
+        with patch('requests.Session.post') as mock_post:
             mock_response = Mock()
             mock_response.status_code = 200
             mock_response.json.return_value = {"invalid": "response"}
@@ -100,7 +122,7 @@ class TestLLMIntegration:
 
     def test_generate_code(self, llm_integration):
         """Test code generation"""
-        with patch('requests.post') as mock_post:
+        with patch('requests.Session.post') as mock_post:
             mock_response = Mock()
             mock_response.status_code = 200
             mock_response.json.return_value = {
@@ -121,12 +143,12 @@ class TestLLMIntegration:
             # Verify the system prompt for code generation was used
             call_args = mock_post.call_args
             request_data = call_args[1]['json']
-            content_text = request_data['contents'][0]['parts'][0]['text']
-            assert "Python code generator" in content_text
+            system_text = request_data['systemInstruction']['parts'][0]['text']
+            assert "Python code generator" in system_text
 
     def test_generate_code_with_markdown_cleanup(self, llm_integration):
         """Test code generation with markdown cleanup"""
-        with patch('requests.post') as mock_post:
+        with patch('requests.Session.post') as mock_post:
             mock_response = Mock()
             mock_response.status_code = 200
             mock_response.json.return_value = {
@@ -163,7 +185,7 @@ class TestLLMIntegration:
     def test_validate_code_with_llm(self, llm_integration):
         """Test LLM code validation"""
         # Test SAFE response
-        with patch('requests.post') as mock_post:
+        with patch('requests.Session.post') as mock_post:
             mock_response = Mock()
             mock_response.status_code = 200
             mock_response.json.return_value = {
@@ -179,7 +201,7 @@ class TestLLMIntegration:
             assert result is True
             
         # Test UNSAFE response in separate context
-        with patch('requests.post') as mock_post:
+        with patch('requests.Session.post') as mock_post:
             mock_response = Mock()
             mock_response.status_code = 200
             mock_response.json.return_value = {
@@ -196,7 +218,7 @@ class TestLLMIntegration:
 
     def test_improve_code(self, llm_integration):
         """Test code improvement"""
-        with patch('requests.post') as mock_post:
+        with patch('requests.Session.post') as mock_post:
             mock_response = Mock()
             mock_response.status_code = 200
             mock_response.json.return_value = {
@@ -218,13 +240,13 @@ class TestLLMIntegration:
             # Verify the system prompt for code improvement was used
             call_args = mock_post.call_args
             request_data = call_args[1]['json']
-            content_text = request_data['contents'][0]['parts'][0]['text']
-            assert "code improver" in content_text
-            assert error_message in content_text
+            system_text = request_data['systemInstruction']['parts'][0]['text']
+            assert "code improver" in system_text
+            assert error_message in request_data['contents'][0]['parts'][0]['text']
 
     def test_gemini_api_timeout(self, llm_integration):
         """Test Gemini API timeout handling"""
-        with patch('requests.post') as mock_post:
+        with patch('requests.Session.post') as mock_post:
             mock_post.side_effect = requests.exceptions.Timeout("Request timed out")
             
             response = llm_integration.query("test prompt")
@@ -233,7 +255,7 @@ class TestLLMIntegration:
 
     def test_gemini_api_connection_error(self, llm_integration):
         """Test Gemini API connection error handling"""
-        with patch('requests.post') as mock_post:
+        with patch('requests.Session.post') as mock_post:
             mock_post.side_effect = requests.exceptions.ConnectionError("Connection failed")
             
             response = llm_integration.query("test prompt")
@@ -246,7 +268,7 @@ class TestLLMIntegration:
         with patch.dict(os.environ, {api_key_env: 'test-key'}, clear=True):
             llm = LLMIntegration(config_manager)
             
-            with patch('requests.post') as mock_post:
+            with patch('requests.Session.post') as mock_post:
                 mock_response = Mock()
                 mock_response.status_code = 200
                 mock_response.json.return_value = {
@@ -260,6 +282,288 @@ class TestLLMIntegration:
                 assert response == "response"
 
 
+    def test_anthropic_system_prompt_is_cacheable_prefix(self, config_manager, mock_config):
+        """Test that the Anthropic system prompt is sent as a cached prefix"""
+        mock_config['llm']['providers'] = ['anthropic']
+        with patch.dict(os.environ, {'ANTHROPIC_API_KEY': 'test-key'}):
+            llm = LLMIntegration(config_manager)
+
+            with patch('requests.Session.post') as mock_post:
+                mock_response = Mock()
+                mock_response.status_code = 200
+                mock_response.json.return_value = {'content': [{'text': 'SAFE'}]}
+                mock_post.return_value = mock_response
+
+                assert llm.query("check this", "You are a validator") == "SAFE"
+
+                request_data = mock_post.call_args[1]['json']
+                assert request_data['messages'] == [{"role": "user", "content": "check this"}]
+                assert request_data['system'][0]['text'] == "You are a validator"
+                assert request_data['system'][0]['cache_control'] == {"type": "ephemeral"}
+
+    def test_external_fallback_runs_in_process(self, llm_integration):
+        """Test that the llm fallback uses the Python API instead of a subprocess"""
+        fake_llm = Mock()
+        model = fake_llm.get_model.return_value
+        model.prompt.return_value.text.return_value = " answer \n"
+
+        with patch.dict('sys.modules', {'llm': fake_llm}), \
+                patch('subprocess.run') as mock_run:
+            assert llm_integration._query_external_command("hi", "be brief") == "answer"
+            assert llm_integration._query_external_command("again") == "answer"
+
+        mock_run.assert_not_called()
+        fake_llm.get_model.assert_called_once()
+        model.prompt.assert_called_with("again", system=None)
+
+    def test_external_command_env(self, config_manager):
+        """Test that the llm command inherits the environment unless a key must be mapped"""
+        with patch.dict(os.environ, {'OPENAI_API_KEY': 'openai-key'}):
+            assert LLMIntegration(config_manager)._command_env is None
+
+        with patch.dict(os.environ, {'LLM_API_KEY': 'llm-key'}, clear=True):
+            llm = LLMIntegration(config_manager)
+            llm._llm_model = False
+
+            with patch('subprocess.run') as mock_run:
+                mock_run.return_value = Mock(returncode=0, stdout="answer\n")
+                assert llm._query_external_command("hi") == "answer"
+
+            assert mock_run.call_args.kwargs['env'] == {'LLM_API_KEY': 'llm-key',
+                                                        'OPENAI_API_KEY': 'llm-key'}
+
+    def test_prewarm_connections(self, config_manager, mock_config, monkeypatch):
+        """Test that startup warmup sends one HEAD per usable provider host"""
+        monkeypatch.delenv('OPENAI_API_KEY', raising=False)
+        mock_config['llm'].update(providers=['gemini', 'openai', 'local'], prewarm_connections=True,
+                                  local_endpoint='http://localhost:11434/api/generate')
+
+        with patch('requests.Session.head') as mock_head, \
+             patch('llm_integration.threading.Thread') as mock_thread:
+            # Run each warmup thread's target inline
+            mock_thread.side_effect = lambda target, args, daemon: Mock(start=lambda: target(*args))
+            LLMIntegration(config_manager)
+
+        warmed = [call.args[0] for call in mock_head.call_args_list]
+        assert warmed == ['https://generativelanguage.googleapis.com', 'http://localhost:11434']
+        assert all(call.kwargs['daemon'] for call in mock_thread.call_args_list)
+
+    def test_batch_query_async(self, llm_integration):
+        """Test that async batches keep the input order"""
+        with patch.object(llm_integration, 'query', side_effect=lambda p, s=None: f"{s}:{p}"):
+            results = llm_integration.batch_query([("a", None), ("b", "sys")])
+
+        assert results == ["None:a", "sys:b"]
+        assert llm_integration.batch_query([]) == []
+
+    def test_batch_query_openai_batch_api(self, config_manager, mock_config, monkeypatch):
+        """Test the OpenAI batch flow: upload, create, poll, then read results by custom_id"""
+        monkeypatch.setenv('OPENAI_API_KEY', 'test-openai-key')
+        mock_config['llm'].update(providers=['gemini', 'openai'], batch_poll_interval=0)
+        llm = LLMIntegration(config_manager)
+
+        def reply(payload, text=""):
+            return Mock(status_code=200, text=text, json=Mock(return_value=payload))
+
+        output = "\n".join(json.dumps(record) for record in [
+            {'custom_id': '1', 'response': {'status_code': 200, 'body': {
+                'choices': [{'message': {'content': ' second '}}]}}},
+            {'custom_id': '0', 'response': {'status_code': 500, 'body': {}}},
+        ])
+        posts = [reply({'id': 'file-1'}), reply({'id': 'batch-1'})]
+        gets = [reply({'id': 'batch-1', 'status': 'in_progress'}),
+                reply({'id': 'batch-1', 'status': 'completed', 'output_file_id': 'file-2'}),
+                reply({}, text=output)]
+
+        with patch('requests.Session.post', side_effect=posts) as mock_post, \
+             patch('requests.Session.get', side_effect=gets) as mock_get, \
+             patch('llm_integration.time.sleep'):
+            results = llm.batch_query([("first", None), ("second", "sys")], mode='batch_api')
+
+        assert results == [None, "second"]
+        uploaded = mock_post.call_args_list[0].kwargs['files']['file'][1].decode('utf-8')
+        lines = [json.loads(line) for line in uploaded.splitlines()]
+        assert [line['custom_id'] for line in lines] == ['0', '1']
+        assert lines[1]['body']['messages'][0] == {'role': 'system', 'content': 'sys'}
+        assert mock_post.call_args_list[1].kwargs['json']['input_file_id'] == 'file-1'
+        assert mock_get.call_args.args[0] == 'https://api.openai.com/v1/files/file-2/content'
+
+    def test_batch_api_without_provider(self, llm_integration):
+        """Test that batch_api mode yields no results when no provider supports it"""
+        assert llm_integration.batch_query([("a", None)], mode='batch_api') == [None]
+
+    @staticmethod
+    def _streaming_response(lines):
+        """Streaming HTTP response yielding the given raw lines"""
+        response = MagicMock(status_code=200)
+        response.__enter__.return_value = response
+        response.iter_lines.return_value = [line.encode('utf-8') for line in lines]
+        return response
+
+    def test_query_stream_gemini(self, llm_integration):
+        """Test that Gemini SSE chunks are yielded as they arrive"""
+        lines = [
+            'data: {"candidates": [{"content": {"parts": [{"text": "def "}]}}]}',
+            '',
+            'data: {"candidates": [{"content": {"parts": [{"text": "f(): pass"}]}}]}',
+        ]
+        with patch('requests.Session.post', return_value=self._streaming_response(lines)) as mock_post:
+            assert list(llm_integration.query_stream("write f", "sys")) == ["def ", "f(): pass"]
+
+        assert ':streamGenerateContent?key=' in mock_post.call_args.args[0]
+        assert mock_post.call_args.args[0].endswith('&alt=sse')
+        assert mock_post.call_args.kwargs['stream'] is True
+
+    def test_query_stream_anthropic_and_local(self, config_manager, mock_config, monkeypatch):
+        """Test the Anthropic event stream and the local NDJSON stream"""
+        monkeypatch.setenv('ANTHROPIC_API_KEY', 'test-anthropic-key')
+        mock_config['llm']['providers'] = ['anthropic']
+        llm = LLMIntegration(config_manager)
+        lines = [
+            'event: content_block_delta',
+            'data: {"type": "content_block_delta", "delta": {"type": "text_delta", "text": "Hi"}}',
+            'event: message_stop',
+            'data: {"type": "message_stop"}',
+        ]
+        with patch('requests.Session.post', return_value=self._streaming_response(lines)) as mock_post:
+            assert list(llm.query_stream("hello")) == ["Hi"]
+        assert mock_post.call_args.kwargs['json']['stream'] is True
+
+        mock_config['llm']['providers'] = ['local']
+        lines = ['{"response": "a", "done": false}', '{"response": "b", "done": true}']
+        with patch('requests.Session.post', return_value=self._streaming_response(lines)):
+            assert list(llm.query_stream("hello")) == ["a", "b"]
+
+    def test_generate_code_streams_to_callback(self, llm_integration):
+        """Test that generate_code forwards chunks and returns the cleaned code"""
+        lines = [
+            'data: {"candidates": [{"content": {"parts": [{"text": "```python\\nx = 1"}]}}]}',
+            'data: {"candidates": [{"content": {"parts": [{"text": "\\n```"}]}}]}',
+        ]
+        seen = []
+        with patch('requests.Session.post', return_value=self._streaming_response(lines)):
+            code = llm_integration.generate_code("set x", on_chunk=seen.append)
+
+        assert seen == ["```python\nx = 1", "\n```"]
+        assert code == "x = 1"
+
+    def test_query_stream_uses_semantic_cache(self, config_manager, mock_config):
+        """Test that streaming answers from, and fills, the same caches as query"""
+        vectors = {'list files': [1.0, 0.0], 'show files': [0.95, 0.1]}
+        mock_config['llm']['semantic_cache'] = True
+
+        with patch('llm_integration.load_sentence_encoder', return_value=vectors.__getitem__):
+            llm = LLMIntegration(config_manager)
+
+        lines = ['data: {"candidates": [{"content": {"parts": [{"text": "ls"}]}}]}']
+        with patch('requests.Session.post', return_value=self._streaming_response(lines)) as mock_post:
+            assert list(llm.query_stream("list files")) == ["ls"]
+            assert list(llm.query_stream("show files")) == ["ls"]
+            assert llm.query("show files") == "ls"
+            mock_post.assert_called_once()
+
+    def test_response_cache(self, config_manager, mock_config):
+        """Test that deterministic queries are answered from the cache"""
+        mock_config['llm']['temperature'] = 0
+        llm = LLMIntegration(config_manager)
+
+        with patch('requests.Session.post') as mock_post:
+            mock_response = Mock()
+            mock_response.status_code = 200
+            mock_response.json.return_value = {
+                'candidates': [{
+                    'content': {'parts': [{'text': 'SAFE'}]}
+                }]
+            }
+            mock_post.return_value = mock_response
+
+            assert llm.query("check", "system") == "SAFE"
+            assert llm.query("check", "system") == "SAFE"
+            assert llm.query("check", "other system") == "SAFE"
+
+            assert mock_post.call_count == 2
+            assert llm.get_cache_stats()['hits'] == 1
+
+            llm._cache.ttl_seconds = -1
+            llm.query("check", "system")
+            assert mock_post.call_count == 3
+
+    def test_response_cache_persists(self, config_manager, mock_config):
+        """Test that a new instance, as in a later CLI run, reuses stored responses"""
+        mock_config['llm']['temperature'] = 0
+
+        with patch('requests.Session.post') as mock_post:
+            mock_response = Mock()
+            mock_response.status_code = 200
+            mock_response.json.return_value = {
+                'candidates': [{
+                    'content': {'parts': [{'text': 'SAFE'}]}
+                }]
+            }
+            mock_post.return_value = mock_response
+
+            LLMIntegration(config_manager).query("check", "system")
+            assert LLMIntegration(config_manager).query("check", "system") == "SAFE"
+            mock_post.assert_called_once()
+
+            mock_config['llm']['cache_persistent'] = False
+            LLMIntegration(config_manager).query("check", "system")
+            assert mock_post.call_count == 2
+
+    def test_response_cache_disabled_when_sampling(self, llm_integration):
+        """Test that queries at a non-zero temperature always reach the API"""
+        with patch('requests.Session.post') as mock_post:
+            mock_response = Mock()
+            mock_response.status_code = 200
+            mock_response.json.return_value = {
+                'candidates': [{
+                    'content': {'parts': [{'text': 'response'}]}
+                }]
+            }
+            mock_post.return_value = mock_response
+
+            llm_integration.query("test")
+            llm_integration.query("test")
+
+            assert mock_post.call_count == 2
+            assert not llm_integration.get_cache_stats()['enabled']
+
+    def test_semantic_cache(self, config_manager, mock_config):
+        """Test that an opted-in semantic cache answers reworded prompts"""
+        vectors = {'list files': [1.0, 0.0], 'show files': [0.95, 0.1], 'delete files': [0.0, 1.0]}
+        mock_config['llm']['semantic_cache'] = True
+
+        with patch('llm_integration.load_sentence_encoder', return_value=vectors.__getitem__):
+            llm = LLMIntegration(config_manager)
+
+        with patch('requests.Session.post') as mock_post:
+            mock_response = Mock()
+            mock_response.status_code = 200
+            mock_response.json.return_value = {
+                'candidates': [{
+                    'content': {'parts': [{'text': 'ls'}]}
+                }]
+            }
+            mock_post.return_value = mock_response
+
+            assert llm.query("list files") == "ls"
+            assert llm.query("show files") == "ls"
+            mock_post.assert_called_once()
+
+            llm.query("delete files")
+            assert mock_post.call_count == 2
+            assert llm.get_cache_stats()['semantic'] == {'hits': 1, 'misses': 2, 'size': 2}
+
+    def test_semantic_cache_without_model(self, config_manager, mock_config):
+        """Test that a missing embedding model leaves queries uncached"""
+        mock_config['llm']['semantic_cache'] = True
+
+        with patch('llm_integration.load_sentence_encoder', return_value=None):
+            llm = LLMIntegration(config_manager)
+
+        assert 'semantic' not in llm.get_cache_stats()
+
+
 class TestLLMIntegrationLive:
     """Live API tests (only run with --live flag)"""
     
@@ -300,4 +604,4 @@ class TestLLMIntegrationLive:
         
         assert response is not None
         assert "def" in response
-        assert "add" in response.lower() or "sum" in response.lower() 
\ No newline at end of file
+        assert "add" in response.lower() or "sum" in response.lower() 
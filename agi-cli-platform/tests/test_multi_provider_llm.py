@@ -0,0 +1,67 @@
+"""
+Unit tests for multi-provider LLM integration
+"""
+
+import threading
+from unittest.mock import Mock
+
+from multi_provider_llm import LLMResponse, MultiProviderLLM
+
+
+def _response(provider, success=True):
+    """Provider response with the given outcome"""
+    return LLMResponse(content=f"from {provider}" if success else "", provider=provider,
+                       model="m", tokens_used=0, response_time=0.0, success=success,
+                       error=None if success else f"{provider} down")
+
+
+class TestMultiProviderLLM:
+    """Test cases for multi-provider LLM integration"""
+
+    def test_race_returns_first_success(self, config_manager, mock_config):
+        """Test that racing keeps the first successful answer without waiting on slower ones"""
+        mock_config['llm']['race_providers'] = True
+        llm = MultiProviderLLM(config_manager)
+        release = threading.Event()
+
+        def slow_query(prompt, system_prompt=None):
+            release.wait(5)
+            return _response('slow')
+
+        llm.providers = {'slow': Mock(), 'failing': Mock(), 'fast': Mock()}
+        llm.providers['slow'].query.side_effect = slow_query
+        llm.providers['failing'].query.return_value = _response('failing', success=False)
+        llm.providers['fast'].query.return_value = _response('fast')
+        llm.fallback_order = ['slow', 'failing', 'fast']
+
+        try:
+            assert llm.query("hi", "system") == "from fast"
+        finally:
+            release.set()
+        llm.providers['fast'].query.assert_called_once_with("hi", "system")
+
+    def test_race_reports_all_failures(self, config_manager, mock_config):
+        """Test that racing fails only once every provider has failed"""
+        mock_config['llm']['race_providers'] = True
+        llm = MultiProviderLLM(config_manager)
+        llm.providers = {'a': Mock(), 'b': Mock()}
+        llm.providers['a'].query.return_value = _response('a', success=False)
+        llm.providers['b'].query.side_effect = RuntimeError("boom")
+        llm.fallback_order = ['a', 'b']
+
+        response = llm.query_with_fallback("hi")
+        assert not response.success
+        assert response.error.startswith("All providers failed")
+
+    def test_generate_code_passes_response_to_on_chunk(self, config_manager):
+        """Test that generate_code hands the raw response to on_chunk as one chunk"""
+        llm = MultiProviderLLM(config_manager)
+        llm.providers = {'fast': Mock()}
+        llm.providers['fast'].query.return_value = LLMResponse(
+            content="```python\nx = 1\n```", provider='fast', model="m",
+            tokens_used=0, response_time=0.0, success=True)
+        llm.fallback_order = ['fast']
+
+        seen = []
+        assert llm.generate_code("set x", on_chunk=seen.append) == "x = 1"
+        assert seen == ["```python\nx = 1\n```"]
@@ -0,0 +1,83 @@
+"""
+Unit tests for plugin system
+"""
+
+import importlib.util
+import pytest
+from pathlib import Path
+from unittest.mock import Mock
+
+from config import ConfigManager
+from plugin_system import PluginSystem
+
+
+PLUGIN_SOURCE = '''
+class {cls}:
+    def __init__(self):
+        self.name = "{name}"
+        self.version = "1.0.0"
+        self.description = "Test plugin {name}"
+
+plugin_class = {cls}
+'''
+
+
+@pytest.fixture
+def plugin_system(temp_dir):
+    """Plugin system reading plugins from a temporary directory"""
+    plugin_config = {
+        'auto_load': True,
+        'auto_activate': False,
+        'plugin_dirs': [str(temp_dir / "plugins")],
+    }
+    manager = Mock(spec=ConfigManager)
+    manager.get.side_effect = lambda key, default=None: plugin_config if key == 'plugins' else default
+    return PluginSystem(manager)
+
+
+def write_plugin(plugin_dir, name):
+    """Write a minimal plugin module"""
+    cls = name.title().replace('_', '') + 'Plugin'
+    plugin_file = plugin_dir / f"{name}.py"
+    plugin_file.write_text(PLUGIN_SOURCE.format(cls=cls, name=name))
+    return plugin_file
+
+
+class TestPluginSystem:
+    """Test cases for plugin system"""
+
+    def test_load_plugins(self, plugin_system):
+        """Test that every plugin file in the plugin directories is loaded"""
+        plugin_dir = plugin_system.plugin_dirs[0]
+        names = [f"plugin_{i}" for i in range(5)]
+        for name in names:
+            write_plugin(plugin_dir, name)
+        (plugin_dir / "__init__.py").write_text("")
+
+        plugin_system.load_plugins()
+
+        assert sorted(plugin_system.loaded_plugins) == names
+        assert plugin_system.loaded_plugins['plugin_3'].description == "Test plugin plugin_3"
+
+    def test_broken_plugin_does_not_stop_loading(self, plugin_system):
+        """Test that a plugin failing to import is skipped"""
+        plugin_dir = plugin_system.plugin_dirs[0]
+        write_plugin(plugin_dir, "good")
+        (plugin_dir / "broken.py").write_text("raise RuntimeError('boom')")
+
+        plugin_system.load_plugins()
+
+        assert list(plugin_system.loaded_plugins) == ["good"]
+
+    def test_install_plugin_precompiles_bytecode(self, plugin_system):
+        """Test that installing a plugin writes its cached bytecode"""
+        plugin_system.install_plugin("greeter")
+
+        plugin_file = plugin_system.plugin_dirs[0] / "greeter.py"
+        assert plugin_file.exists()
+        assert Path(importlib.util.cache_from_source(str(plugin_file))).exists()
+
+    def test_install_plugin(self, plugin_system):
+        """Test that an installed plugin is loaded through its plugin_class"""
+        assert plugin_system.install_plugin("greeter")
+        assert type(plugin_system.loaded_plugins['greeter']).__name__ == "GreeterPlugin"